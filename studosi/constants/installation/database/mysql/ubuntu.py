@@ -0,0 +1,11 @@
+MARIADB_PACKAGES = (
+    "mariadb-server",
+    "mariadb-client",
+)
+MYSQL_PACKAGES = (
+    "mysql-server",
+    "mysql-client",
+)
+
+# Root's client credentials once root logs in with a password, readable by root only
+ROOT_DEFAULTS_FILE = "/etc/mysql/studosi-root.cnf"
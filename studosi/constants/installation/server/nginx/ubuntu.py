@@ -0,0 +1 @@
+NGINX_PACKAGES = ("nginx",)
@@ -4,6 +4,8 @@ import regex
 # region Patterns
 ABBREVIATION_TOKEN_PATTERN = r"[\p{L}\p{N}][\p{Lu}\p{N}]*"
 LINK_STRING_DELIMITER_PATTERN = r"\:\:"
+PROPERTY_PATTERN_LIST_DELIMITER_PATTERN = r"\,"
+PROPERTY_PATTERN_RANGE_PATTERN = r"(\d+)-(\d+)"
 PROPERTY_STRING_DELIMITER_PATTERN = r"\:"
 RELATED_SUBJECT_STRING_DELIMITER_PATTERN = r"\:"
 SHORT_ABBREVIATION_TOKEN_PATTERN = r"[\p{L}\p{N}]{1,3}[\p{Lu}\p{N}]*"
@@ -15,6 +17,10 @@ WHITESPACE_PATTERN = r"\s+"
 # region RegEx
 ABBREVIATION_TOKEN_REGEX = regex.compile(ABBREVIATION_TOKEN_PATTERN)
 LINK_STRING_DELIMITER_REGEX = re.compile(LINK_STRING_DELIMITER_PATTERN)
+PROPERTY_PATTERN_LIST_DELIMITER_REGEX = re.compile(
+    PROPERTY_PATTERN_LIST_DELIMITER_PATTERN
+)
+PROPERTY_PATTERN_RANGE_REGEX = re.compile(PROPERTY_PATTERN_RANGE_PATTERN)
 PROPERTY_STRING_DELIMITER_REGEX = re.compile(PROPERTY_STRING_DELIMITER_PATTERN)
 RELATED_SUBJECT_STRING_DELIMITER_REGEX = re.compile(
     RELATED_SUBJECT_STRING_DELIMITER_PATTERN
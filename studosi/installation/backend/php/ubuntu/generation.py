@@ -1,34 +1,94 @@
-from studosi.constants.installation.backend.php.ubuntu import PHP_ORIGIN
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from studosi.constants.installation.backend.php.ubuntu import (
+    PHP_EXTENSIONS,
+    PHP_PREREQUISITES,
+    PHP_REPOSITORIES,
+)
+from studosi.installation import guards
+from studosi.installation.patching import generate_ini_patch
+from studosi.installation.plan import ProvisioningPlan
 
-def generate_prep(use_sudo: bool = False):
+
+def get_packages(version: str = "8.0") -> Tuple[str, ...]:
+    php_prefix = f"php{version.strip()}"
+
+    return tuple(f"{php_prefix}-{extension}" for extension in PHP_EXTENSIONS)
+
+
+def get_ini_paths(
+    versions: Iterable[str] = ("8.0",), sapis: Iterable[str] = ("fpm", "cli")
+) -> List[str]:
+    return [
+        f"/etc/php/{version.strip()}/{sapi.strip()}/php.ini"
+        for version in versions
+        for sapi in sapis
+    ]
+
+
+def get_ini_edits(
+    file_uploads: bool = True,
+    allow_url_fopen: bool = True,
+    memory_limit: str = "256M",
+    upload_max_filesize: str = "100M",
+    cgi_fix_pathinfo: bool = False,
+    max_execution_time: int = 360,
+    date_timezone: str = "Europe/Zagreb",
+) -> Dict[str, str]:
+    return {
+        "file_uploads": "On" if file_uploads else "Off",
+        "allow_url_fopen": "On" if allow_url_fopen else "Off",
+        "memory_limit": memory_limit.strip(),
+        "upload_max_filesize": upload_max_filesize.strip(),
+        "cgi.fix_pathinfo": "1" if cgi_fix_pathinfo else "0",
+        "max_execution_time": str(max_execution_time),
+        "date.timezone": date_timezone.strip(),
+    }
+
+
+def generate_prep(use_sudo: bool = False, idempotent: bool = False):
     prefix = "sudo " if use_sudo else ""
 
+    if idempotent:
+        to_return = ""
+        to_return += guards.render_install_missing(
+            PHP_PREREQUISITES, use_sudo=use_sudo, update=False
+        )
+
+        for repository in PHP_REPOSITORIES:
+            to_return += guards.render_repository(repository, use_sudo=use_sudo)
+
+        return to_return
+
     to_return = ""
-    to_return += f"{prefix}apt install -y software-properties-common\n"
-    to_return += f"{prefix}add-apt-repository -y ppa:ondrej/php\n"
+
+    for package in PHP_PREREQUISITES:
+        to_return += f"{prefix}apt install -y {package}\n"
+
+    for repository in PHP_REPOSITORIES:
+        to_return += f"{prefix}add-apt-repository -y {repository}\n"
+
     to_return += f"{prefix}apt update -y\n"
 
     return to_return
 
 
-def generate_install(version: str = "8.0", use_sudo: bool = False):
+def generate_install(
+    version: str = "8.0", use_sudo: bool = False, idempotent: bool = False
+):
     prefix = "sudo " if use_sudo else ""
-    php_prefix = f"php{version.strip()}"
+
+    if idempotent:
+        return guards.render_install_missing(
+            get_packages(version=version), use_sudo=use_sudo, update=True
+        )
 
     to_return = ""
-    to_return += f"{prefix} apt install -y \\\n"
-    to_return += f"\t{php_prefix}-fpm \\\n"
-    to_return += f"\t{php_prefix}-common \\\n"
-    to_return += f"\t{php_prefix}-mbstring \\\n"
-    to_return += f"\t{php_prefix}-xmlrpc \\\n"
-    to_return += f"\t{php_prefix}-soap \\\n"
-    to_return += f"\t{php_prefix}-mysql \\\n"
-    to_return += f"\t{php_prefix}-gd \\\n"
-    to_return += f"\t{php_prefix}-xml \\\n"
-    to_return += f"\t{php_prefix}-cli \\\n"
-    to_return += f"\t{php_prefix}-zip \\\n"
-    to_return += f"\t{php_prefix}-curl\n"
+    to_return += f"{prefix}apt install -y \\\n"
+    to_return += " \\\n".join(
+        f"\t{package}" for package in get_packages(version=version)
+    )
+    to_return += "\n"
 
     return to_return
 
@@ -42,27 +102,68 @@ def generate_setup(
     cgi_fix_pathinfo: bool = False,
     max_execution_time: int = 360,
     date_timezone: str = "Europe/Zagreb",
+    sapis: Iterable[str] = ("fpm", "cli"),
     use_sudo: bool = True,
+    restart_service: bool = True,
+    changed_variable: Optional[str] = None,
 ):
     prefix = "sudo " if use_sudo else ""
 
-    path = f"/etc/php/{version}/fpm/php.ini"
-
-    replacement = (
-        "file_uploads = " + ("On" if file_uploads else "Off"),
-        "allow_url_fopen = " + ("On" if allow_url_fopen else "Off"),
-        f"memory_limit = {memory_limit.strip()}",
-        f"upload_max_filesize = {upload_max_filesize.strip()}",
-        "cgi.fix_pathinfo = " + ("0" if cgi_fix_pathinfo else "1"),
-        f"max_execution_time = {max_execution_time}",
-        f"date.timezone = {date_timezone.strip()}",
+    edits = get_ini_edits(
+        file_uploads=file_uploads,
+        allow_url_fopen=allow_url_fopen,
+        memory_limit=memory_limit,
+        upload_max_filesize=upload_max_filesize,
+        cgi_fix_pathinfo=cgi_fix_pathinfo,
+        max_execution_time=max_execution_time,
+        date_timezone=date_timezone,
     )
 
-    to_return = ""
+    to_return = generate_ini_patch(
+        paths=get_ini_paths(versions=(version,), sapis=sapis),
+        edits=edits,
+        use_sudo=use_sudo,
+        changed_variable=changed_variable,
+    )
 
-    for src, dest in zip(PHP_ORIGIN, replacement):
-        to_return += f'{prefix}sed -i "s/{src}/{dest}/g {path}\n'
+    if restart_service:
+        service_name = f"php{version.strip()}-fpm.service"
 
-    to_return += f"\n{prefix}systemctl restart nginx.service\n"
+        if changed_variable is None:
+            to_return += f"\n{prefix}systemctl restart {service_name}\n"
+        else:
+            to_return += f'\nif [ "${{{changed_variable}:-0}}" = 1 ]; then\n'
+            to_return += f"\t{prefix}systemctl restart {service_name}\n"
+            to_return += "fi\n"
 
     return to_return
+
+
+def plan_prep(plan: ProvisioningPlan):
+    plan.add_prerequisites(PHP_PREREQUISITES)
+
+    for repository in PHP_REPOSITORIES:
+        plan.add_repository(repository)
+
+    return plan
+
+
+def plan_install(plan: ProvisioningPlan, version: str = "8.0"):
+    return plan.add_packages(get_packages(version=version))
+
+
+def plan_setup(plan: ProvisioningPlan, version: str = "8.0", **kwargs):
+    service_name = f"php{version.strip()}-fpm"
+
+    plan.add_commands(
+        generate_setup(
+            version=version,
+            use_sudo=plan.use_sudo,
+            restart_service=False,
+            changed_variable=plan.get_changed_variable(service_name),
+            **kwargs,
+        ),
+        name="php_setup",
+    )
+
+    return plan.add_service(service_name, enable=True, restart=True)
@@ -0,0 +1,224 @@
+from typing import Dict, Optional, Union
+
+from studosi.installation.patching import generate_file_write, generate_ini_patch
+from studosi.installation.plan import ProvisioningPlan
+from studosi.utils.host_utils import get_cpu_count, get_memory_total
+from studosi.utils.size_utils import parse_size
+
+_PROCESS_MANAGERS = {
+    "static",
+    "dynamic",
+    "ondemand",
+}
+
+
+def compute_pool_settings(
+    memory_total: Optional[Union[int, str]] = None,
+    cpu_count: Optional[int] = None,
+    memory_limit: Union[int, str] = "256M",
+    unlimited_process_memory: Union[int, str] = "256M",
+    memory_share: float = 0.5,
+    reserved_memory: Union[int, str] = "512M",
+    pm: str = "dynamic",
+    max_requests: int = 500,
+) -> Dict[str, str]:
+    if pm not in _PROCESS_MANAGERS:
+        managers = list(sorted(_PROCESS_MANAGERS))
+        error_string = (
+            ", ".join((f"`{x}`" for x in managers[:-1])) + f" or {managers[-1]}"
+        )
+
+        raise KeyError(f"PHP-FPM pm must be one of: {error_string}")
+
+    memory_total = get_memory_total() if memory_total is None else memory_total
+    cpu_count = get_cpu_count() if cpu_count is None else max(1, cpu_count)
+
+    available = parse_size(memory_total) - parse_size(reserved_memory)
+    available = int(max(0, available) * memory_share)
+
+    memory_limit = str(memory_limit).strip()
+
+    # -1 lifts PHP's limit, so there's nothing to divide by but an estimate
+    if memory_limit == "-1":
+        process_memory = parse_size(unlimited_process_memory)
+    elif memory_limit.startswith("-"):
+        process_memory = 0
+    else:
+        process_memory = parse_size(memory_limit)
+
+    if process_memory <= 0:
+        raise ValueError(
+            "PHP memory_limit must be a positive size or -1 for no limit, got "
+            f"`{memory_limit}`"
+        )
+
+    max_children = max(2, available // process_memory)
+    min_spare_servers = min(max_children, max(1, cpu_count))
+    max_spare_servers = min(max_children, max(min_spare_servers, 2 * cpu_count))
+    start_servers = (min_spare_servers + max_spare_servers) // 2
+
+    to_return = {
+        "pm": pm,
+        "pm.max_children": str(max_children),
+        "pm.max_requests": str(max_requests),
+    }
+
+    if pm == "dynamic":
+        to_return["pm.start_servers"] = str(start_servers)
+        to_return["pm.min_spare_servers"] = str(min_spare_servers)
+        to_return["pm.max_spare_servers"] = str(max_spare_servers)
+    elif pm == "ondemand":
+        to_return["pm.process_idle_timeout"] = "10s"
+
+    return to_return
+
+
+def compute_opcache_settings(
+    memory_total: Optional[Union[int, str]] = None,
+    version: str = "8.0",
+    validate_timestamps: bool = False,
+    revalidate_freq: int = 60,
+    max_accelerated_files: int = 20000,
+    use_jit: bool = True,
+    preload: Optional[str] = None,
+    preload_user: str = "www-data",
+) -> Dict[str, str]:
+    memory_total = get_memory_total() if memory_total is None else memory_total
+
+    memory_consumption = min(
+        parse_size("512M"), max(parse_size("128M"), parse_size(memory_total) // 32)
+    )
+
+    to_return = {
+        "opcache.enable": "1",
+        "opcache.memory_consumption": str(memory_consumption // parse_size("1M")),
+        "opcache.interned_strings_buffer": "16",
+        "opcache.max_accelerated_files": str(max_accelerated_files),
+        "opcache.validate_timestamps": "1" if validate_timestamps else "0",
+        "opcache.revalidate_freq": str(revalidate_freq),
+        "realpath_cache_size": "4096K",
+        "realpath_cache_ttl": "600",
+    }
+
+    if use_jit and int(version.strip().split(".")[0]) >= 8:
+        to_return["opcache.jit"] = "tracing"
+        to_return["opcache.jit_buffer_size"] = "64M"
+
+    if preload is not None:
+        to_return["opcache.preload"] = preload
+        to_return["opcache.preload_user"] = preload_user
+
+    return to_return
+
+
+def generate_pool_tuning(
+    version: str = "8.0",
+    settings: Optional[Dict[str, str]] = None,
+    pool: str = "www",
+    use_sudo: bool = True,
+    changed_variable: Optional[str] = None,
+):
+    if settings is None:
+        settings = compute_pool_settings()
+
+    path = f"/etc/php/{version.strip()}/fpm/pool.d/{pool}.conf"
+
+    return generate_ini_patch(
+        paths=(path,),
+        edits=settings,
+        use_sudo=use_sudo,
+        changed_variable=changed_variable,
+    )
+
+
+def generate_opcache_tuning(
+    version: str = "8.0",
+    settings: Optional[Dict[str, str]] = None,
+    file_name: str = "99-studosi-opcache.ini",
+    use_sudo: bool = True,
+    changed_variable: Optional[str] = None,
+):
+    if settings is None:
+        settings = compute_opcache_settings(version=version)
+
+    path = f"/etc/php/{version.strip()}/fpm/conf.d/{file_name}"
+    content = "".join(f"{key} = {value}\n" for key, value in settings.items())
+
+    return generate_file_write(
+        path=path,
+        content=content,
+        use_sudo=use_sudo,
+        changed_variable=changed_variable,
+        delimiter="STUDOSI_OPCACHE",
+    )
+
+
+def generate_tuning(
+    version: str = "8.0",
+    memory_total: Optional[Union[int, str]] = None,
+    cpu_count: Optional[int] = None,
+    memory_limit: Union[int, str] = "256M",
+    pool_settings: Optional[Dict[str, str]] = None,
+    opcache_settings: Optional[Dict[str, str]] = None,
+    preload: Optional[str] = None,
+    use_sudo: bool = True,
+    reload_service: bool = True,
+    changed_variable: Optional[str] = None,
+):
+    prefix = "sudo " if use_sudo else ""
+
+    if pool_settings is None:
+        pool_settings = compute_pool_settings(
+            memory_total=memory_total,
+            cpu_count=cpu_count,
+            memory_limit=memory_limit,
+        )
+
+    if opcache_settings is None:
+        opcache_settings = compute_opcache_settings(
+            memory_total=memory_total, version=version, preload=preload
+        )
+
+    to_return = ""
+    to_return += generate_pool_tuning(
+        version=version,
+        settings=pool_settings,
+        use_sudo=use_sudo,
+        changed_variable=changed_variable,
+    )
+    to_return += "\n"
+    to_return += generate_opcache_tuning(
+        version=version,
+        settings=opcache_settings,
+        use_sudo=use_sudo,
+        changed_variable=changed_variable,
+    )
+
+    if reload_service:
+        service_name = f"php{version.strip()}-fpm.service"
+
+        if changed_variable is None:
+            to_return += f"\n{prefix}systemctl reload {service_name}\n"
+        else:
+            to_return += f'\nif [ "${{{changed_variable}:-0}}" = 1 ]; then\n'
+            to_return += f"\t{prefix}systemctl reload {service_name}\n"
+            to_return += "fi\n"
+
+    return to_return
+
+
+def plan_tuning(plan: ProvisioningPlan, version: str = "8.0", **kwargs):
+    service_name = f"php{version.strip()}-fpm"
+
+    plan.add_commands(
+        generate_tuning(
+            version=version,
+            use_sudo=plan.use_sudo,
+            reload_service=False,
+            changed_variable=plan.get_changed_variable(service_name),
+            **kwargs,
+        ),
+        name="php_tuning",
+    )
+
+    return plan.add_service(service_name, enable=True, restart=True)
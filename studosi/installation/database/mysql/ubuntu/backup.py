@@ -0,0 +1,442 @@
+from typing import Iterable, Optional, Tuple
+
+_COMPRESSORS = {
+    "zstd": ("zstd -q -c -{level}", "zstd -q -dc", ".zst", 3),
+    "gzip": ("gzip -c -{level}", "gzip -dc", ".gz", 6),
+    "none": ("cat", "cat", "", None),
+}
+
+_SYSTEM_SCHEMAS = (
+    "information_schema",
+    "mysql",
+    "performance_schema",
+    "sys",
+)
+
+
+def get_compressor(
+    compression: str = "zstd", level: Optional[int] = None
+) -> Tuple[str, str, str]:
+    if compression not in _COMPRESSORS:
+        compressors = list(sorted(_COMPRESSORS))
+        error_string = (
+            ", ".join((f"`{x}`" for x in compressors[:-1])) + f" or {compressors[-1]}"
+        )
+
+        raise KeyError(f"Backup compression must be one of: {error_string}")
+
+    compress, decompress, extension, default_level = _COMPRESSORS[compression]
+    level = default_level if level is None else level
+
+    return compress.format(level=level), decompress, extension
+
+
+def _render_client(use_sudo: bool = False, defaults_file: Optional[str] = None) -> str:
+    prefix = "sudo " if use_sudo else ""
+
+    to_return = ""
+    to_return += f'STUDOSI_MYSQL_PREFIX="{prefix}"\n'
+
+    if defaults_file is None:
+        to_return += 'STUDOSI_MYSQL_ARGS=""\n'
+    else:
+        to_return += f'STUDOSI_MYSQL_ARGS="--defaults-extra-file={defaults_file}"\n'
+
+    to_return += "export STUDOSI_MYSQL_PREFIX STUDOSI_MYSQL_ARGS\n"
+
+    return to_return
+
+
+def _render_schema_filter(
+    databases: Optional[Iterable[str]], column: str = "table_schema"
+) -> str:
+    if databases is not None:
+        return f"{column} IN (" + ", ".join(f"'{x}'" for x in databases) + ")"
+
+    return f"{column} NOT IN (" + ", ".join(f"'{x}'" for x in _SYSTEM_SCHEMAS) + ")"
+
+
+def generate_backup(
+    backup_root: str = "/var/backups/studosi/mysql",
+    databases: Optional[Iterable[str]] = None,
+    jobs: int = 4,
+    compression: str = "zstd",
+    compression_level: Optional[int] = None,
+    consistent: bool = True,
+    lock_timeout: int = 300,
+    retention_days: int = 7,
+    retention_count: int = 3,
+    use_sudo: bool = False,
+    defaults_file: Optional[str] = None,
+):
+    compress, _, extension = get_compressor(compression, compression_level)
+    databases = None if databases is None else list(databases)
+
+    to_return = ""
+    to_return += "#!/usr/bin/env bash\nset -euo pipefail\n\n"
+    to_return += _render_client(use_sudo=use_sudo, defaults_file=defaults_file)
+    to_return += (
+        f'STUDOSI_BACKUP_ROOT="${{STUDOSI_BACKUP_ROOT:-{backup_root.rstrip("/")}}}"\n'
+    )
+    to_return += f'STUDOSI_BACKUP_JOBS="${{STUDOSI_BACKUP_JOBS:-{max(1, jobs)}}}"\n'
+    to_return += 'STUDOSI_BACKUP_NAME="$(date -u +%Y%m%dT%H%M%SZ)"\n'
+    to_return += (
+        'STUDOSI_BACKUP_DIR="$STUDOSI_BACKUP_ROOT/$STUDOSI_BACKUP_NAME.partial"\n'
+    )
+    to_return += 'mkdir -p "$STUDOSI_BACKUP_DIR"\n'
+    to_return += "export STUDOSI_BACKUP_DIR\n\n"
+
+    to_return += "studosi_mysql() {\n"
+    to_return += "\t$STUDOSI_MYSQL_PREFIX mysql $STUDOSI_MYSQL_ARGS \"$@\"\n"
+    to_return += "}\n\n"
+
+    to_return += "studosi_mysqldump() {\n"
+    to_return += "\t$STUDOSI_MYSQL_PREFIX mysqldump $STUDOSI_MYSQL_ARGS \"$@\"\n"
+    to_return += "}\n\n"
+
+    to_return += "sql_string() {\n"
+    to_return += "\tlocal quote=\"'\" backslash='\\' value\n"
+    to_return += '\tvalue="${1//"$backslash"/"$backslash$backslash"}"\n'
+    to_return += '\tprintf "%s" "$quote${value//"$quote"/"$quote$quote"}$quote"\n'
+    to_return += "}\n\n"
+
+    to_return += "sql_identifier() {\n"
+    to_return += "\tlocal tick='`'\n"
+    to_return += '\tprintf "%s" "$tick${1//"$tick"/"$tick$tick"}$tick"\n'
+    to_return += "}\n\n"
+
+    to_return += "get_select() {\n"
+    to_return += '\tlocal database="$1" table="$2" name type\n'
+    to_return += '\tlocal columns="" expressions=""\n\n'
+    # Binary and bit values go out as literals that survive any connection charset
+    to_return += "\twhile IFS=$'\\t' read -r name type; do\n"
+    to_return += '\t\tname="$(sql_identifier "$name")"\n'
+    to_return += '\t\tcolumns+="${columns:+, }$name"\n'
+    to_return += '\t\tcase "$type" in\n'
+    to_return += (
+        "\t\t\t*binary | *blob | geometry* | point | linestring | polygon "
+        "| multi*)\n"
+    )
+    to_return += (
+        "\t\t\t\texpressions+=\"${expressions:+, }IF($name IS NULL, 'NULL', "
+        "CONCAT('X''', HEX($name), ''''))\" ;;\n"
+    )
+    to_return += (
+        "\t\t\tbit) expressions+=\"${expressions:+, }IF($name IS NULL, 'NULL', "
+        "CONCAT('b''', BIN($name + 0), ''''))\" ;;\n"
+    )
+    to_return += '\t\t\t*) expressions+="${expressions:+, }QUOTE($name)" ;;\n'
+    to_return += "\t\tesac\n"
+    to_return += "\tdone < <(\n"
+    to_return += (
+        '\t\tawk -F \'\\t\' -v database="$database" -v table="$table" '
+        "'$1 == database && $2 == table { print $3 \"\\t\" $4 }' \\\n"
+    )
+    to_return += '\t\t\t"$STUDOSI_BACKUP_DIR/columns.tsv"\n'
+    to_return += "\t)\n\n"
+    to_return += (
+        '\techo "SELECT CONCAT($(sql_string "INSERT INTO $(sql_identifier '
+        '"$table") ($columns) VALUES (")), \\\n'
+    )
+    to_return += "\t\tCONCAT_WS(', ', $expressions), ');') \\\n"
+    to_return += (
+        '\t\tFROM $(sql_identifier "$database").$(sql_identifier "$table");"\n'
+    )
+    to_return += "}\n\n"
+
+    # Every dump is framed by marker rows, so one session can answer all of them
+    to_return += 'STUDOSI_MARKER="studosi-$(date +%s%N)-$$-$RANDOM$RANDOM"\n\n'
+
+    # Like mydumper, a worker dumps all of its tables from one snapshot
+    to_return += "dump_worker() {\n"
+    to_return += '\tlocal worker="$1" session queries line database table index=0\n'
+    to_return += "\tlocal to_session from_session\n"
+    to_return += '\tlocal queue="$STUDOSI_BACKUP_DIR/.worker.$worker"\n\n'
+    to_return += "\ttrap '' PIPE\n"
+    to_return += '\tmkfifo "$queue.in" "$queue.out"\n'
+    to_return += (
+        "\tstudosi_mysql --unbuffered --quick --raw -N -B "
+        '<"$queue.in" >"$queue.out" &\n'
+    )
+    to_return += "\tsession=$!\n"
+    to_return += '\texec {to_session}>"$queue.in" {from_session}<"$queue.out"\n\n'
+    to_return += (
+        "\tif ! echo \"SET NAMES utf8mb4; SET SESSION time_zone = '+00:00'; "
+        "\\\n"
+    )
+    to_return += "\t\tSET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ; \\\n"
+    to_return += (
+        "\t\tSTART TRANSACTION WITH CONSISTENT SNAPSHOT; SELECT 'ready';\" "
+        '>&"$to_session" \\\n'
+    )
+    to_return += (
+        '\t\t|| ! read -r line <&"$from_session" || [ "$line" != ready ]; then\n'
+    )
+    to_return += '\t\techo failed >"$STUDOSI_BACKUP_DIR/.ready"\n'
+    to_return += "\t\treturn 1\n"
+    to_return += "\tfi\n"
+    to_return += '\techo ready >"$STUDOSI_BACKUP_DIR/.ready"\n\n'
+
+    # The queries are written in the background so a full result pipe can't stall
+    to_return += "\t{\n"
+    to_return += "\t\twhile IFS=$'\\t' read -r database table; do\n"
+    to_return += "\t\t\techo \"SELECT '$STUDOSI_MARKER $index';\"\n"
+    to_return += '\t\t\tget_select "$database" "$table"\n'
+    to_return += "\t\t\techo \"SELECT '$STUDOSI_MARKER';\"\n"
+    to_return += "\t\t\tindex=$((index + 1))\n"
+    to_return += '\t\tdone <"$queue"\n'
+    to_return += '\t\techo "COMMIT;"\n'
+    to_return += '\t} >&"$to_session" &\n'
+    to_return += "\tqueries=$!\n"
+    to_return += "\texec {to_session}>&-\n\n"
+
+    to_return += (
+        f"\tif ! awk -v marker=\"$STUDOSI_MARKER\" -v compress='{compress}' \\\n"
+    )
+    to_return += '\t\t-v worker="$worker" -v expected="$(wc -l <"$queue")" \'\n'
+    to_return += "\t\tindex($0, marker \" \") == 1 {\n"
+    to_return += (
+        '\t\t\tcmd = compress " >\\"$STUDOSI_BACKUP_DIR/.worker." worker "." '
+        'substr($0, length(marker) + 2) "\\""\n'
+    )
+    to_return += '\t\t\tprintf "" | cmd\n'
+    to_return += "\t\t\tnext\n"
+    to_return += "\t\t}\n"
+    to_return += "\t\t$0 == marker {\n"
+    to_return += "\t\t\tfailed += close(cmd) != 0\n"
+    to_return += '\t\t\tcmd = ""\n'
+    to_return += "\t\t\tdone++\n"
+    to_return += "\t\t\tnext\n"
+    to_return += "\t\t}\n"
+    to_return += '\t\tcmd != "" { print | cmd }\n'
+    to_return += "\t\tEND { exit failed || done != expected }\n"
+    to_return += '\t\' <&"$from_session"; then\n'
+    to_return += '\t\techo "[studosi] dump worker $worker failed" >&2\n'
+    to_return += "\t\treturn 1\n"
+    to_return += "\tfi\n\n"
+    to_return += '\twait "$queries"\n'
+    to_return += '\twait "$session"\n\n'
+
+    to_return += "\tindex=0\n"
+    to_return += "\twhile IFS=$'\\t' read -r database table; do\n"
+    to_return += (
+        '\t\tmv "$queue.$index" '
+        f'"$STUDOSI_BACKUP_DIR/$database/$table.sql{extension}"\n'
+    )
+    to_return += "\t\tindex=$((index + 1))\n"
+    to_return += '\tdone <"$queue"\n'
+    to_return += "}\n\n"
+    if consistent:
+        # Without --unbuffered the reply sits in the client's pipe buffer forever
+        to_return += "coproc STUDOSI_LOCK { studosi_mysql --unbuffered -N -B; }\n"
+        to_return += (
+            "echo \"FLUSH TABLES WITH READ LOCK; SELECT 'locked';\" "
+            '>&"${STUDOSI_LOCK[1]}"\n'
+        )
+        to_return += (
+            f"if ! read -r -t {max(1, lock_timeout)} studosi_locked "
+            '<&"${STUDOSI_LOCK[0]}" || [ "$studosi_locked" != locked ]; then\n'
+        )
+        to_return += (
+            '\techo "[studosi] failed to acquire the global read lock within '
+            f'{max(1, lock_timeout)} s" >&2\n'
+        )
+        to_return += "\texit 1\n"
+        to_return += "fi\n\n"
+
+    to_return += (
+        "studosi_mysql -N -B -e \"SELECT schema_name FROM "
+        "information_schema.schemata WHERE "
+        f"{_render_schema_filter(databases, column='schema_name')}\" \\\n"
+    )
+    to_return += '\t>"$STUDOSI_BACKUP_DIR/databases.txt"\n'
+    to_return += (
+        "studosi_mysql -N -B -e \"SELECT table_schema, table_name FROM "
+        "information_schema.tables WHERE table_type = 'BASE TABLE' AND "
+        f"{_render_schema_filter(databases)} "
+        'ORDER BY data_length + index_length DESC" \\\n'
+    )
+    to_return += '\t>"$STUDOSI_BACKUP_DIR/tables.tsv"\n'
+    to_return += (
+        "studosi_mysql -N -B -e \"SELECT table_schema, table_name, column_name, "
+        "data_type FROM information_schema.columns WHERE "
+        f"{_render_schema_filter(databases)} "
+        "AND COALESCE(generation_expression, '') = '' "
+        'ORDER BY table_schema, table_name, ordinal_position" \\\n'
+    )
+    to_return += '\t>"$STUDOSI_BACKUP_DIR/columns.tsv"\n\n'
+
+    to_return += "while read -r database; do\n"
+    to_return += '\tmkdir -p "$STUDOSI_BACKUP_DIR/$database"\n'
+    to_return += 'done <"$STUDOSI_BACKUP_DIR/databases.txt"\n\n'
+
+    to_return += 'mkfifo "$STUDOSI_BACKUP_DIR/.ready"\n'
+    to_return += 'exec {studosi_ready}<>"$STUDOSI_BACKUP_DIR/.ready"\n'
+    to_return += "studosi_workers=()\n\n"
+    to_return += (
+        "for ((studosi_worker = 0; studosi_worker < STUDOSI_BACKUP_JOBS; "
+        "studosi_worker++)); do\n"
+    )
+    to_return += (
+        '\tawk -v worker="$studosi_worker" -v jobs="$STUDOSI_BACKUP_JOBS" '
+        "'(NR - 1) % jobs == worker' \\\n"
+    )
+    to_return += (
+        '\t\t"$STUDOSI_BACKUP_DIR/tables.tsv" '
+        '>"$STUDOSI_BACKUP_DIR/.worker.$studosi_worker"\n'
+    )
+    to_return += '\tdump_worker "$studosi_worker" &\n'
+    to_return += '\tstudosi_workers+=("$!")\n'
+    to_return += "done\n\n"
+
+    to_return += 'for studosi_worker in "${studosi_workers[@]}"; do\n'
+    to_return += (
+        f"\tif ! read -r -t {max(1, lock_timeout)} studosi_state "
+        '<&"$studosi_ready" || [ "$studosi_state" != ready ]; then\n'
+    )
+    to_return += (
+        '\t\techo "[studosi] the dump workers failed to start their snapshots" '
+        ">&2\n"
+    )
+    to_return += '\t\tkill "${studosi_workers[@]}" 2>/dev/null || true\n'
+    to_return += "\t\texit 1\n"
+    to_return += "\tfi\n"
+    to_return += "done\n\n"
+
+    # DDL waits on the global read lock, so these match the workers' snapshots
+    to_return += "while read -r database; do\n"
+    to_return += (
+        "\tstudosi_mysqldump --no-data --routines --events --skip-triggers "
+        '--skip-lock-tables --databases "$database" \\\n'
+    )
+    to_return += (
+        f'\t\t| {compress} >"$STUDOSI_BACKUP_DIR/$database/schema.sql{extension}"\n'
+    )
+    to_return += (
+        "\tstudosi_mysqldump --no-data --no-create-info --no-create-db "
+        '--skip-routines --skip-lock-tables --triggers "$database" \\\n'
+    )
+    to_return += (
+        f'\t\t| {compress} >"$STUDOSI_BACKUP_DIR/$database/triggers.sql{extension}"\n'
+    )
+    to_return += 'done <"$STUDOSI_BACKUP_DIR/databases.txt"\n\n'
+
+    if consistent:
+        # The workers keep their snapshots, so writes resume before the dump ends
+        to_return += 'echo "UNLOCK TABLES;" >&"${STUDOSI_LOCK[1]}"\n'
+        to_return += 'studosi_lock_pid="$STUDOSI_LOCK_PID"\n'
+        to_return += 'studosi_lock_input="${STUDOSI_LOCK[1]}"\n'
+        to_return += "exec {studosi_lock_input}>&-\n"
+        to_return += 'wait "$studosi_lock_pid"\n\n'
+
+    to_return += "studosi_failed=0\n"
+    to_return += 'for studosi_worker in "${studosi_workers[@]}"; do\n'
+    to_return += '\twait "$studosi_worker" || studosi_failed=1\n'
+    to_return += "done\n\n"
+    to_return += 'if [ "$studosi_failed" != 0 ]; then\n'
+    to_return += '\techo "[studosi] backup failed, leaving $STUDOSI_BACKUP_DIR" >&2\n'
+    to_return += "\texit 1\n"
+    to_return += "fi\n\n"
+    to_return += 'rm -f "$STUDOSI_BACKUP_DIR/.ready" "$STUDOSI_BACKUP_DIR"/.worker.*\n'
+
+    to_return += "\n"
+    to_return += (
+        'mv "$STUDOSI_BACKUP_DIR" "$STUDOSI_BACKUP_ROOT/$STUDOSI_BACKUP_NAME"\n'
+    )
+    to_return += 'ln -sfn "$STUDOSI_BACKUP_NAME" "$STUDOSI_BACKUP_ROOT/latest"\n'
+    to_return += (
+        'echo "[studosi] backup written to '
+        '$STUDOSI_BACKUP_ROOT/$STUDOSI_BACKUP_NAME" >&2\n\n'
+    )
+
+    to_return += (
+        'find "$STUDOSI_BACKUP_ROOT" -mindepth 1 -maxdepth 1 -type d '
+        "-name '*.partial' -mtime +0 -exec rm -rf {} +\n"
+    )
+    to_return += (
+        'find "$STUDOSI_BACKUP_ROOT" -mindepth 1 -maxdepth 1 -type d '
+        "-name '[0-9]*T*Z' -printf '%f\\n' \\\n"
+    )
+    to_return += f"\t| sort -r | tail -n +{max(1, retention_count) + 1} \\\n"
+    to_return += "\t| while read -r studosi_old; do\n"
+    to_return += (
+        '\t\tif [ -n "$(find "$STUDOSI_BACKUP_ROOT/$studosi_old" -maxdepth 0 '
+        f'-mtime +{max(0, retention_days - 1)})" ]; then\n'
+    )
+    to_return += '\t\t\trm -rf "${STUDOSI_BACKUP_ROOT:?}/$studosi_old"\n'
+    to_return += "\t\tfi\n"
+    to_return += "\tdone\n"
+
+    return to_return
+
+
+def generate_restore(
+    backup_root: str = "/var/backups/studosi/mysql",
+    jobs: int = 4,
+    compression: str = "zstd",
+    use_sudo: bool = False,
+    defaults_file: Optional[str] = None,
+):
+    _, decompress, extension = get_compressor(compression)
+
+    to_return = ""
+    to_return += "#!/usr/bin/env bash\nset -euo pipefail\n\n"
+    to_return += _render_client(use_sudo=use_sudo, defaults_file=defaults_file)
+    to_return += (
+        f'STUDOSI_BACKUP_ROOT="${{STUDOSI_BACKUP_ROOT:-{backup_root.rstrip("/")}}}"\n'
+    )
+    to_return += f'STUDOSI_BACKUP_JOBS="${{STUDOSI_BACKUP_JOBS:-{max(1, jobs)}}}"\n'
+    to_return += 'STUDOSI_BACKUP_DIR="${1:-$STUDOSI_BACKUP_ROOT/latest}"\n'
+    to_return += 'STUDOSI_BACKUP_DIR="$(cd "$STUDOSI_BACKUP_DIR" && pwd -P)"\n'
+    to_return += "export STUDOSI_BACKUP_DIR\n\n"
+
+    to_return += "studosi_mysql() {\n"
+    to_return += "\t$STUDOSI_MYSQL_PREFIX mysql $STUDOSI_MYSQL_ARGS \"$@\"\n"
+    to_return += "}\n\n"
+
+    to_return += "restore_table() {\n"
+    to_return += '\tlocal path="$1" database\n'
+    to_return += '\tdatabase="$(basename "$(dirname "$path")")"\n'
+    to_return += "\t{\n"
+    to_return += (
+        "\t\techo \"SET NAMES utf8mb4; SET SESSION time_zone = '+00:00'; "
+        "SET SESSION sql_mode = 'NO_AUTO_VALUE_ON_ZERO'; \\\n"
+    )
+    to_return += (
+        "\t\t\tSET SESSION foreign_key_checks = 0; "
+        'SET SESSION unique_checks = 0; SET SESSION autocommit = 0;"\n'
+    )
+    to_return += f'\t\t{decompress} "$path"\n'
+    to_return += '\t\techo "COMMIT;"\n'
+    to_return += '\t} | studosi_mysql "$database"\n'
+    to_return += "}\n\n"
+
+    to_return += "export -f studosi_mysql restore_table\n\n"
+
+    to_return += "while read -r database; do\n"
+    to_return += (
+        f'\t{decompress} "$STUDOSI_BACKUP_DIR/$database/schema.sql{extension}" '
+        "| studosi_mysql\n"
+    )
+    to_return += 'done <"$STUDOSI_BACKUP_DIR/databases.txt"\n\n'
+
+    to_return += "while IFS=$'\\t' read -r database table; do\n"
+    to_return += (
+        f'\tprintf "%s\\0" "$STUDOSI_BACKUP_DIR/$database/$table.sql{extension}"\n'
+    )
+    to_return += 'done <"$STUDOSI_BACKUP_DIR/tables.tsv" \\\n'
+    to_return += (
+        '\t| xargs -0 -r -n 1 -P "$STUDOSI_BACKUP_JOBS" '
+        "bash -c 'restore_table \"$1\"' _\n\n"
+    )
+
+    to_return += "while read -r database; do\n"
+    to_return += (
+        f'\t{decompress} "$STUDOSI_BACKUP_DIR/$database/triggers.sql{extension}" '
+        '| studosi_mysql "$database"\n'
+    )
+    to_return += 'done <"$STUDOSI_BACKUP_DIR/databases.txt"\n\n'
+
+    to_return += 'echo "[studosi] restored $STUDOSI_BACKUP_DIR" >&2\n'
+
+    return to_return
@@ -1,21 +1,56 @@
-from typing import Optional
+import shlex
+from typing import Optional, Tuple
 
+from studosi.constants.installation.database.mysql.ubuntu import (
+    MARIADB_PACKAGES,
+    MYSQL_PACKAGES,
+    ROOT_DEFAULTS_FILE,
+)
+from studosi.installation import guards
+from studosi.installation.plan import ProvisioningPlan
 
-def generate_install(use_sudo: bool = False):
+
+def get_packages(use_mariadb: bool = True) -> Tuple[str, ...]:
+    return MARIADB_PACKAGES if use_mariadb else MYSQL_PACKAGES
+
+
+def generate_install(
+    use_sudo: bool = False, use_mariadb: bool = True, idempotent: bool = False
+):
     prefix = "sudo " if use_sudo else ""
 
+    if idempotent:
+        return guards.render_install_missing(
+            get_packages(use_mariadb=use_mariadb), use_sudo=use_sudo
+        )
+
     to_return = ""
     to_return += f"{prefix}apt install -y \\\n"
-    to_return += "\tmariadb-server \\\n"
-    to_return += "\tmariadb-client\n"
+    to_return += " \\\n".join(
+        f"\t{package}" for package in get_packages(use_mariadb=use_mariadb)
+    )
+    to_return += "\n"
 
     return to_return
 
 
-def generate_init(use_sudo: bool = False, use_mariadb: bool = True):
+def generate_init(
+    use_sudo: bool = False, use_mariadb: bool = True, idempotent: bool = False
+):
     prefix = "sudo " if use_sudo else ""
     service_name = "mariadb" if use_mariadb else "mysql"
 
+    if idempotent:
+        to_return = ""
+        to_return += guards.render_enable(
+            (f"{service_name}.service",), use_sudo=use_sudo
+        )
+        to_return += guards.render_restart(
+            f"{service_name}.service", use_sudo=use_sudo
+        )
+
+        return to_return
+
     to_return = ""
     to_return += f"{prefix}systemctl enable {service_name}.service\n"
     to_return += f"{prefix}systemctl restart {service_name}.service\n"
@@ -69,9 +104,292 @@ def generate_setup(
         'send "' + ("y" if remove_test_database_and_access_to_it else "n") + '\\r"\n'
     )
 
-    to_return += '"Reload privilege tables now? [Y/n]"\n'
+    to_return += 'expect "Reload privilege tables now? [Y/n]"\n'
     to_return += 'send "' + ("y" if reload_privilege_tables_now else "n") + '\\r"\n\n'
 
     to_return += f"{prefix}systemctl restart {service_name}.service\n"
 
     return to_return
+
+
+def quote_sql_string(value: str) -> str:
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def quote_option_value(value: str) -> str:
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _render_defaults_file(path: str, password: str, use_sudo: bool = False) -> str:
+    prefix = "sudo " if use_sudo else ""
+
+    to_return = ""
+    to_return += f"{prefix}install -m 600 /dev/null {shlex.quote(path)}\n"
+    to_return += f"{prefix}tee {shlex.quote(path)} >/dev/null <<'STUDOSI_CNF'\n"
+    to_return += "[client]\n"
+    to_return += "user=root\n"
+    to_return += f"password={quote_option_value(password)}\n"
+    to_return += "STUDOSI_CNF\n"
+
+    return to_return
+
+
+def _render_drop_users(condition: str) -> str:
+    # DROP USER works on every version, mysql.user is only a view on MariaDB 10.4+
+    to_return = ""
+    to_return += (
+        "SELECT GROUP_CONCAT(CONCAT(QUOTE(User), '@', QUOTE(Host))) INTO @users "
+        f"FROM mysql.user WHERE {condition};\n"
+    )
+    to_return += (
+        "SET @statement = IF(@users IS NULL, 'DO 0', CONCAT('DROP USER ', @users));\n"
+    )
+    to_return += "PREPARE statement FROM @statement;\n"
+    to_return += "EXECUTE statement;\n"
+    to_return += "DEALLOCATE PREPARE statement;\n"
+
+    return to_return
+
+
+def generate_secure_setup_sql(
+    set_root_password: bool = True,
+    new_root_password: Optional[str] = None,
+    remove_anonymous_users: bool = True,
+    disallow_root_login_remotely: bool = True,
+    remove_test_database_and_access_to_it: bool = True,
+    reload_privilege_tables_now: bool = True,
+    use_mariadb: bool = True,
+    before_mariadb_10_4: bool = False,
+) -> str:
+    to_return = ""
+
+    if set_root_password:
+        if new_root_password is None or len(new_root_password) == 0:
+            raise ValueError("Setting the root password needs a new_root_password")
+
+        password = quote_sql_string(new_root_password)
+
+        # Before 10.4 MariaDB can't chain plugins, so root switches to a password
+        if use_mariadb and before_mariadb_10_4:
+            to_return += (
+                "SET PASSWORD FOR 'root'@'localhost' = "
+                f"PASSWORD({password});\n"
+            )
+            to_return += (
+                "UPDATE mysql.user SET plugin = 'mysql_native_password' "
+                "WHERE User = 'root' AND Host = 'localhost';\n"
+            )
+            to_return += "FLUSH PRIVILEGES;\n"
+        # MariaDB keeps unix_socket login for root, so reruns still work with sudo
+        elif use_mariadb:
+            to_return += (
+                "ALTER USER 'root'@'localhost' IDENTIFIED VIA unix_socket OR "
+                f"mysql_native_password USING PASSWORD({password});\n"
+            )
+        else:
+            to_return += f"ALTER USER 'root'@'localhost' IDENTIFIED BY {password};\n"
+
+    if remove_anonymous_users:
+        to_return += _render_drop_users("User = ''")
+
+    if disallow_root_login_remotely:
+        to_return += _render_drop_users(
+            "User = 'root' AND Host NOT IN ('localhost', '127.0.0.1', '::1')"
+        )
+
+    if remove_test_database_and_access_to_it:
+        to_return += "DROP DATABASE IF EXISTS test;\n"
+        to_return += "DELETE FROM mysql.db WHERE Db = 'test' OR Db = 'test\\\\_%';\n"
+
+    if reload_privilege_tables_now:
+        to_return += "FLUSH PRIVILEGES;\n"
+
+    return to_return
+
+
+def generate_secure_setup_check_sql(
+    remove_anonymous_users: bool = True,
+    disallow_root_login_remotely: bool = True,
+    remove_test_database_and_access_to_it: bool = True,
+    **kwargs,
+) -> str:
+    checks = ["0"]
+
+    if remove_anonymous_users:
+        checks.append("(SELECT COUNT(*) FROM mysql.user WHERE User = '')")
+
+    if disallow_root_login_remotely:
+        checks.append(
+            "(SELECT COUNT(*) FROM mysql.user WHERE User = 'root' AND "
+            "Host NOT IN ('localhost', '127.0.0.1', '::1'))"
+        )
+
+    if remove_test_database_and_access_to_it:
+        checks.append(
+            "(SELECT COUNT(*) FROM information_schema.schemata "
+            "WHERE schema_name = 'test')"
+        )
+        checks.append(
+            "(SELECT COUNT(*) FROM mysql.db WHERE Db = 'test' OR Db = 'test\\\\_%')"
+        )
+
+    return "SELECT " + " + ".join(checks) + ";\n"
+
+
+def _render_secure_setup_sql(client: str, use_mariadb: bool = True, **kwargs) -> str:
+    if not use_mariadb or not kwargs.get("set_root_password", True):
+        to_return = ""
+        to_return += f"{client} <<'STUDOSI_SQL'\n"
+        to_return += generate_secure_setup_sql(use_mariadb=use_mariadb, **kwargs)
+        to_return += "STUDOSI_SQL\n"
+
+        return to_return
+
+    # Only the host knows its version, and older servers can't parse the 10.4 syntax
+    to_return = ""
+    to_return += (
+        f"studosi_mysql_version=\"$({client} --skip-column-names "
+        "--execute='SELECT VERSION()')\"\n"
+    )
+    to_return += (
+        "if printf '%s\\n' 10.4 \"${studosi_mysql_version%%-*}\" | sort -C -V; then\n"
+    )
+    to_return += f"\t{client} <<'STUDOSI_SQL'\n"
+    to_return += generate_secure_setup_sql(use_mariadb=True, **kwargs)
+    to_return += "STUDOSI_SQL\n"
+    to_return += "else\n"
+    to_return += f"\t{client} <<'STUDOSI_SQL'\n"
+    to_return += generate_secure_setup_sql(
+        use_mariadb=True, before_mariadb_10_4=True, **kwargs
+    )
+    to_return += "STUDOSI_SQL\n"
+    to_return += "fi\n"
+
+    return to_return
+
+
+def generate_secure_setup(
+    timeout: int = 10,
+    root_password: Optional[str] = None,
+    use_sudo: bool = False,
+    use_mariadb: bool = True,
+    defaults_file: Optional[str] = None,
+    idempotent: bool = False,
+    **kwargs,
+):
+    prefix = "sudo " if use_sudo else ""
+
+    new_root_password = None
+
+    if kwargs.get("set_root_password", True):
+        new_root_password = kwargs.get("new_root_password")
+
+    # MySQL and MariaDB before 10.4 drop socket login for root, so later runs need
+    # the password from a file
+    if (root_password or new_root_password) and defaults_file is None:
+        defaults_file = ROOT_DEFAULTS_FILE
+
+    to_return = ""
+
+    if defaults_file is not None:
+        quoted_defaults_file = shlex.quote(defaults_file)
+
+        # Before the first run root still logs in through the socket
+        to_return += f"if {prefix}test -f {quoted_defaults_file}; then\n"
+        to_return += (
+            "\tstudosi_mysql_defaults="
+            f"--defaults-extra-file={quoted_defaults_file}\n"
+        )
+        to_return += "else\n"
+        to_return += '\tstudosi_mysql_defaults=""\n'
+        to_return += "fi\n"
+
+    client = f"{prefix}mysql"
+
+    if defaults_file is not None:
+        client += ' ${studosi_mysql_defaults:+"$studosi_mysql_defaults"}'
+
+    client += f" --user=root --batch --connect-timeout={timeout}"
+
+    apply = ""
+
+    if root_password:
+        apply += _render_defaults_file(
+            defaults_file, root_password, use_sudo=use_sudo
+        )
+        apply += (
+            "studosi_mysql_defaults="
+            f"--defaults-extra-file={shlex.quote(defaults_file)}\n"
+        )
+
+    if (
+        defaults_file is not None
+        and new_root_password
+        and new_root_password != root_password
+    ):
+        # Root's login changes here, so the file has to follow before anything fails
+        apply += _render_secure_setup_sql(
+            client,
+            new_root_password=new_root_password,
+            remove_anonymous_users=False,
+            disallow_root_login_remotely=False,
+            remove_test_database_and_access_to_it=False,
+            reload_privilege_tables_now=False,
+            use_mariadb=use_mariadb,
+        )
+        apply += _render_defaults_file(
+            defaults_file, new_root_password, use_sudo=use_sudo
+        )
+        apply += (
+            "studosi_mysql_defaults="
+            f"--defaults-extra-file={shlex.quote(defaults_file)}\n"
+        )
+
+        kwargs = {**kwargs, "set_root_password": False}
+
+    apply += _render_secure_setup_sql(client, use_mariadb=use_mariadb, **kwargs)
+
+    if not idempotent:
+        return to_return + apply
+
+    # Every statement is safe to rerun, a check run only reports what would change
+    to_return += 'if [ "${STUDOSI_CHECK:-0}" = 1 ]; then\n'
+    to_return += (
+        f"\tstudosi_insecure=\"$({client} --skip-column-names <<'STUDOSI_SQL'\n"
+    )
+    to_return += generate_secure_setup_check_sql(**kwargs)
+    to_return += "STUDOSI_SQL\n"
+    to_return += ')"\n'
+    to_return += '\tif [ "$studosi_insecure" != 0 ]; then\n'
+    to_return += (
+        "\t\techo \"the database isn't hardened\" "
+        '>>"${STUDOSI_DRIFT_FILE:-/dev/stderr}"\n'
+    )
+    to_return += "\tfi\n"
+    to_return += "else\n"
+    to_return += apply
+    to_return += "fi\n"
+
+    return to_return
+
+
+def plan_install(plan: ProvisioningPlan, use_mariadb: bool = True):
+    return plan.add_packages(get_packages(use_mariadb=use_mariadb))
+
+
+def plan_init(plan: ProvisioningPlan, use_mariadb: bool = True):
+    service_name = "mariadb" if use_mariadb else "mysql"
+
+    return plan.add_service(service_name, enable=True, restart=True)
+
+
+def plan_setup(plan: ProvisioningPlan, use_mariadb: bool = True, **kwargs):
+    return plan.add_commands(
+        generate_secure_setup(
+            use_sudo=plan.use_sudo,
+            use_mariadb=use_mariadb,
+            idempotent=plan.idempotent,
+            **kwargs,
+        ),
+        name="database_setup",
+    )
@@ -0,0 +1,146 @@
+from typing import Dict, Optional, Union
+
+from studosi.installation.patching import generate_file_write
+from studosi.installation.plan import ProvisioningPlan
+from studosi.utils.host_utils import get_cpu_count, get_memory_total
+from studosi.utils.size_utils import format_size, parse_size
+
+_DURABILITY_POLICIES = {
+    "full": "1",
+    "balanced": "2",
+    "fast": "0",
+}
+
+
+def compute_settings(
+    memory_total: Optional[Union[int, str]] = None,
+    cpu_count: Optional[int] = None,
+    max_connections: int = 151,
+    memory_share: float = 0.5,
+    reserved_memory: Union[int, str] = "512M",
+    durability: str = "full",
+    long_query_time: float = 1.0,
+    slow_query_log_file: str = "/var/log/mysql/mariadb-slow.log",
+) -> Dict[str, str]:
+    if durability not in _DURABILITY_POLICIES:
+        policies = list(sorted(_DURABILITY_POLICIES))
+        error_string = (
+            ", ".join((f"`{x}`" for x in policies[:-1])) + f" or {policies[-1]}"
+        )
+
+        raise KeyError(f"MariaDB durability must be one of: {error_string}")
+
+    memory_total = get_memory_total() if memory_total is None else memory_total
+    memory_total = parse_size(memory_total)
+    cpu_count = get_cpu_count() if cpu_count is None else max(1, cpu_count)
+
+    chunk = parse_size("128M")
+    available = int(max(0, memory_total - parse_size(reserved_memory)) * memory_share)
+    buffer_pool_size = max(chunk, available // chunk * chunk)
+
+    buffer_pool_instances = min(
+        64, cpu_count, max(1, buffer_pool_size // parse_size("1G"))
+    )
+    log_file_size = min(
+        parse_size("2G"), max(parse_size("48M"), buffer_pool_size // 4)
+    )
+    tmp_table_size = min(
+        parse_size("256M"), max(parse_size("16M"), memory_total // 64)
+    )
+    thread_cache_size = min(100, 8 + max_connections // 100)
+
+    return {
+        "innodb_buffer_pool_size": format_size(buffer_pool_size, "M"),
+        # Ignored since MariaDB 10.5, `loose-` keeps newer servers starting
+        "loose-innodb_buffer_pool_instances": str(buffer_pool_instances),
+        "innodb_log_file_size": format_size(log_file_size, "M"),
+        "innodb_flush_log_at_trx_commit": _DURABILITY_POLICIES[durability],
+        "innodb_flush_method": "O_DIRECT",
+        "innodb_file_per_table": "1",
+        "max_connections": str(max_connections),
+        "thread_cache_size": str(thread_cache_size),
+        "table_open_cache": "4000",
+        "tmp_table_size": format_size(tmp_table_size, "M"),
+        "max_heap_table_size": format_size(tmp_table_size, "M"),
+        "slow_query_log": "1",
+        "slow_query_log_file": slow_query_log_file,
+        "long_query_time": f"{long_query_time:g}",
+    }
+
+
+def get_configuration_path(
+    use_mariadb: bool = True, file_name: str = "60-studosi-tuning.cnf"
+) -> str:
+    folder = "mariadb.conf.d" if use_mariadb else "mysql.conf.d"
+
+    return f"/etc/mysql/{folder}/{file_name}"
+
+
+def render_configuration(settings: Optional[Dict[str, str]] = None) -> str:
+    if settings is None:
+        settings = compute_settings()
+
+    to_return = "[mysqld]\n"
+
+    for key, value in settings.items():
+        to_return += f"{key} = {value}\n"
+
+    return to_return
+
+
+def generate_tuning(
+    memory_total: Optional[Union[int, str]] = None,
+    cpu_count: Optional[int] = None,
+    max_connections: int = 151,
+    settings: Optional[Dict[str, str]] = None,
+    use_sudo: bool = False,
+    use_mariadb: bool = True,
+    restart_service: bool = True,
+    changed_variable: Optional[str] = None,
+):
+    prefix = "sudo " if use_sudo else ""
+    service_name = "mariadb" if use_mariadb else "mysql"
+
+    if settings is None:
+        settings = compute_settings(
+            memory_total=memory_total,
+            cpu_count=cpu_count,
+            max_connections=max_connections,
+        )
+
+    path = get_configuration_path(use_mariadb=use_mariadb)
+
+    to_return = generate_file_write(
+        path=path,
+        content=render_configuration(settings=settings),
+        use_sudo=use_sudo,
+        changed_variable=changed_variable,
+        delimiter="STUDOSI_MYSQL",
+    )
+
+    if restart_service:
+        if changed_variable is None:
+            to_return += f"\n{prefix}systemctl restart {service_name}.service\n"
+        else:
+            to_return += f'\nif [ "${{{changed_variable}:-0}}" = 1 ]; then\n'
+            to_return += f"\t{prefix}systemctl restart {service_name}.service\n"
+            to_return += "fi\n"
+
+    return to_return
+
+
+def plan_tuning(plan: ProvisioningPlan, use_mariadb: bool = True, **kwargs):
+    service_name = "mariadb" if use_mariadb else "mysql"
+
+    plan.add_commands(
+        generate_tuning(
+            use_sudo=plan.use_sudo,
+            use_mariadb=use_mariadb,
+            restart_service=False,
+            changed_variable=plan.get_changed_variable(service_name),
+            **kwargs,
+        ),
+        name="database_tuning",
+    )
+
+    return plan.add_service(service_name, enable=True, restart=True)
@@ -0,0 +1,13 @@
+from typing import Iterable, Optional
+
+
+class StepCycle(Exception):
+    def __init__(self, step_names: Optional[Iterable[str]] = None):
+        message = "Cycle detected in the provisioning step graph"
+
+        if step_names is not None:
+            message += " between steps " + ", ".join(
+                f"`{x}`" for x in sorted(step_names)
+            )
+
+        super().__init__(message)
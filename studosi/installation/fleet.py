@@ -0,0 +1,329 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from studosi.installation.graph import StepGraph
+from studosi.installation.stack import (
+    STACK_STEPS,
+    get_stack_kwargs,
+    get_step_kwargs,
+    plan_step,
+)
+
+HOST_SETTINGS = {
+    "php_version": "8.0",
+    "use_mysql": False,
+    "no_sudo": False,
+    "idempotent": False,
+    "parallel": False,
+    "timed": False,
+    "tune_php": False,
+    "php_preload": None,
+    "memory_total": None,
+    "cpu_count": None,
+    "tune_database": False,
+    "max_connections": 151,
+    "secure_database": False,
+    "database_root_password": None,
+    "database_defaults_file": None,
+    "configure_nginx": False,
+    "materijali_root": "/var/www/materijali",
+    "server_name": "_",
+}
+
+# Kept out of settings.json, the scripts that need them are written owner only
+_SECRET_SETTINGS = ("database_root_password",)
+
+# The machine that renders a fleet isn't the host, so these can't fall back to it
+_HOST_RESOURCE_SETTINGS = {
+    "tune_php": ("memory_total", "cpu_count"),
+    "tune_database": ("memory_total", "cpu_count"),
+    "configure_nginx": ("cpu_count",),
+}
+
+
+def load_inventory(path: Union[Path, str]) -> Dict[str, Any]:
+    path = Path(path)
+
+    with open(path, mode="r", encoding="utf8") as f:
+        text = f.read()
+
+    if path.suffix.lower() in (".yml", ".yaml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError(
+                "Reading YAML inventories requires PyYAML, install it with "
+                "`pip install pyyaml` or use a JSON inventory"
+            )
+
+        inventory = yaml.safe_load(text)
+    else:
+        inventory = json.loads(text)
+
+    if not isinstance(inventory, dict):
+        raise KeyError(f"Inventory {path} must be a mapping with a `hosts` key")
+
+    return inventory
+
+
+def _check_settings(settings: Dict[str, Any], owner: str):
+    for key in settings:
+        if key not in HOST_SETTINGS:
+            keys = list(HOST_SETTINGS)
+            error_string = (
+                ", ".join((f"`{x}`" for x in keys[:-1])) + f" or {keys[-1]}"
+            )
+
+            raise KeyError(
+                f"Setting `{key}` of {owner} must be one of: {error_string}"
+            )
+
+
+def _check_host_resources(settings: Dict[str, Any], name: str):
+    for option, keys in _HOST_RESOURCE_SETTINGS.items():
+        if not settings.get(option, False):
+            continue
+
+        missing = [x for x in keys if settings.get(x) is None]
+
+        if len(missing) != 0:
+            raise KeyError(
+                f"Host `{name}` sets `{option}` so it needs "
+                + " and ".join(f"`{x}`" for x in missing)
+                + ", the rendering machine's resources aren't the host's"
+            )
+
+
+def _iterate_hosts(hosts: Any) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    if isinstance(hosts, dict):
+        for name, host in hosts.items():
+            yield str(name), dict() if host is None else dict(host)
+    else:
+        for host in hosts:
+            if isinstance(host, str):
+                yield host, dict()
+            else:
+                host = dict(host)
+
+                if "name" not in host:
+                    raise KeyError(f"Inventory host {host} has no `name`")
+
+                yield str(host.pop("name")), host
+
+
+def resolve_hosts(
+    inventory: Dict[str, Any], limit: Optional[Iterable[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    defaults = dict(inventory.get("defaults") or dict())
+    groups = {
+        str(name): dict(group or dict())
+        for name, group in (inventory.get("groups") or dict()).items()
+    }
+    limit = None if limit is None else set(limit)
+
+    _check_settings(defaults, "the inventory defaults")
+
+    for name, group in groups.items():
+        _check_settings(group, f"group `{name}`")
+
+    to_return = dict()
+
+    for name, host in _iterate_hosts(inventory.get("hosts") or dict()):
+        if len(name) == 0 or name in (".", "..") or "/" in name or "\\" in name:
+            raise ValueError(f"Host name `{name}` can't be used as a folder name")
+
+        if name in to_return:
+            raise KeyError(f"Inventory contains host `{name}` more than once")
+
+        host_groups = host.pop("groups", None) or list()
+        host_groups = [host_groups] if isinstance(host_groups, str) else host_groups
+
+        _check_settings(host, f"host `{name}`")
+
+        settings = {**HOST_SETTINGS, **defaults}
+
+        for group in host_groups:
+            if group not in groups:
+                raise KeyError(f"Host `{name}` belongs to unknown group `{group}`")
+
+            settings.update(groups[group])
+
+        settings.update(host)
+
+        if limit is None or name in limit:
+            _check_host_resources(settings, name)
+            to_return[name] = settings
+
+    if limit is not None:
+        missing = limit.difference(to_return)
+
+        if len(missing) != 0:
+            raise KeyError(
+                "Inventory doesn't contain hosts "
+                + ", ".join(f"`{x}`" for x in sorted(missing))
+            )
+
+    return to_return
+
+
+def has_secrets(settings: Dict[str, Any]) -> bool:
+    return any(settings.get(x) is not None for x in _SECRET_SETTINGS)
+
+
+def get_fragment_keys(settings: Dict[str, Any]) -> Dict[str, str]:
+    stack_kwargs = get_stack_kwargs(settings)
+    step_kwargs = get_step_kwargs(stack_kwargs)
+
+    return {
+        name: json.dumps(
+            {
+                "use_sudo": stack_kwargs["use_sudo"],
+                "idempotent": stack_kwargs["idempotent"],
+                "timed": stack_kwargs["timed"],
+                **step_kwargs[name],
+            },
+            sort_keys=True,
+        )
+        for name in STACK_STEPS
+    }
+
+
+def render_fragment(name: str, key: str) -> str:
+    return plan_step(name, **json.loads(key)).render(header=False)
+
+
+def render_fragments(
+    fragment_keys: Iterable[Tuple[str, str]],
+    jobs: int = 1,
+    cache: Optional[Dict[Tuple[str, str], str]] = None,
+) -> Dict[Tuple[str, str], str]:
+    cache = dict() if cache is None else cache
+    to_render = [x for x in dict.fromkeys(fragment_keys) if x not in cache]
+
+    if jobs > 1 and len(to_render) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(to_render))) as executor:
+            scripts = executor.map(
+                render_fragment,
+                [name for name, _ in to_render],
+                [key for _, key in to_render],
+                chunksize=max(1, len(to_render) // (4 * jobs)),
+            )
+            cache.update(zip(to_render, scripts))
+    else:
+        for name, key in to_render:
+            cache[(name, key)] = render_fragment(name, key)
+
+    return cache
+
+
+def assemble_host(
+    settings: Dict[str, Any], fragments: Dict[str, str]
+) -> Dict[str, str]:
+    idempotent = settings.get("idempotent", False)
+    timed = settings.get("timed", False)
+    graph = StepGraph(idempotent=idempotent, timed=timed)
+
+    for name, depends_on in STACK_STEPS.items():
+        graph.add_step(name, fragments[name], depends_on=depends_on)
+
+    if settings.get("parallel", False):
+        script = graph.render()
+    else:
+        script = graph.render_sequential()
+
+    public_settings = {
+        key: value for key, value in settings.items() if key not in _SECRET_SETTINGS
+    }
+
+    to_return = {
+        "provision.sh": script,
+        "settings.json": json.dumps(public_settings, indent=2, sort_keys=True) + "\n",
+    }
+
+    for step in graph.steps:
+        step_graph = StepGraph(idempotent=idempotent, timed=timed)
+        step_graph.add_step(step.name, step.script)
+        to_return[f"steps/{step.name}.sh"] = step_graph.render_sequential()
+
+    return to_return
+
+
+def render_fleet(
+    hosts: Dict[str, Dict[str, Any]],
+    jobs: Optional[int] = None,
+    cache: Optional[Dict[Tuple[str, str], str]] = None,
+) -> Dict[str, Dict[str, str]]:
+    jobs = (os.cpu_count() or 1) if jobs is None else max(1, jobs)
+
+    host_keys = {name: get_fragment_keys(settings) for name, settings in hosts.items()}
+    cache = render_fragments(
+        (
+            (step_name, key)
+            for fragment_keys in host_keys.values()
+            for step_name, key in fragment_keys.items()
+        ),
+        jobs=jobs,
+        cache=cache,
+    )
+
+    return {
+        name: assemble_host(
+            settings,
+            {
+                step_name: cache[(step_name, key)]
+                for step_name, key in host_keys[name].items()
+            },
+        )
+        for name, settings in hosts.items()
+    }
+
+
+def _write_if_changed(path: Path, content: str, private: bool = False) -> bool:
+    if path.suffix == ".sh":
+        mode = 0o700 if private else 0o755
+    else:
+        mode = 0o600 if private else 0o644
+
+    if os.path.exists(path):
+        with open(path, mode="r", encoding="utf8") as f:
+            if f.read() == content:
+                os.chmod(path, mode)
+                return False
+    else:
+        os.makedirs(path.parent, exist_ok=True)
+
+    # The mode is set before writing, so a secret is never readable by others
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    os.fchmod(descriptor, mode)
+
+    with open(descriptor, mode="w", encoding="utf8") as f:
+        f.write(content)
+
+    return True
+
+
+def write_fleet(
+    rendered: Dict[str, Dict[str, str]],
+    output: Union[Path, str],
+    jobs: Optional[int] = None,
+    private_hosts: Optional[Iterable[str]] = None,
+) -> List[Path]:
+    output = Path(output)
+    jobs = 4 * (os.cpu_count() or 1) if jobs is None else max(1, jobs)
+    private_hosts = set() if private_hosts is None else set(private_hosts)
+
+    files = [
+        (output / host / file_name, content, host in private_hosts)
+        for host, host_files in rendered.items()
+        for file_name, content in host_files.items()
+    ]
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        written = executor.map(lambda x: _write_if_changed(*x), files)
+
+        return [
+            path for (path, _, _), was_written in zip(files, written) if was_written
+        ]
@@ -0,0 +1,219 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from studosi.installation import guards, timing
+from studosi.installation.exceptions import StepCycle
+from studosi.installation.plan import ProvisioningPlan
+
+_STEP_NAME_REGEX = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+class Step:
+    def __init__(
+        self,
+        name: str,
+        script: str,
+        depends_on: Optional[Iterable[str]] = None,
+    ):
+        if _STEP_NAME_REGEX.fullmatch(name) is None:
+            raise ValueError(
+                f"Step name `{name}` must be a valid shell identifier "
+                "(letters, digits and underscores)"
+            )
+
+        self.name = name
+        self.script = script.strip("\n")
+        self.depends_on: Tuple[str, ...] = tuple(
+            dict.fromkeys(() if depends_on is None else depends_on)
+        )
+
+
+class StepGraph:
+    def __init__(self, idempotent: bool = False, timed: bool = False):
+        self.idempotent = idempotent
+        self.timed = timed
+
+        self._steps: Dict[str, Step] = dict()
+
+    @property
+    def steps(self) -> List[Step]:
+        return list(self._steps.values())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._steps
+
+    def __getitem__(self, name: str) -> Step:
+        return self._steps[name]
+
+    def add_step(
+        self,
+        name: str,
+        script: str,
+        depends_on: Optional[Iterable[str]] = None,
+    ) -> Step:
+        if name in self._steps:
+            raise KeyError(f"StepGraph already contains a step named `{name}`")
+
+        step = Step(name=name, script=script, depends_on=depends_on)
+        self._steps[name] = step
+
+        return step
+
+    def add_plan(
+        self,
+        name: str,
+        plan: ProvisioningPlan,
+        depends_on: Optional[Iterable[str]] = None,
+    ) -> Step:
+        return self.add_step(
+            name=name, script=plan.render(header=False), depends_on=depends_on
+        )
+
+    def validate(self):
+        for step in self._steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self._steps:
+                    raise KeyError(
+                        f"Step `{step.name}` depends on unknown step `{dependency}`"
+                    )
+
+                if dependency == step.name:
+                    raise StepCycle((step.name,))
+
+    def levels(self) -> List[List[str]]:
+        self.validate()
+
+        remaining = {
+            name: set(step.depends_on) for name, step in self._steps.items()
+        }
+        to_return = list()
+
+        while len(remaining) != 0:
+            level = [name for name, deps in remaining.items() if len(deps) == 0]
+
+            if len(level) == 0:
+                raise StepCycle(remaining)
+
+            for name in level:
+                del remaining[name]
+
+            for deps in remaining.values():
+                deps.difference_update(level)
+
+            to_return.append(level)
+
+        return to_return
+
+    def topological_order(self) -> List[str]:
+        return [name for level in self.levels() for name in level]
+
+    def render_dry_run(self) -> str:
+        to_return = ""
+
+        for i, level in enumerate(self.levels(), start=1):
+            to_return += f"wave {i}:\n"
+
+            for name in level:
+                depends_on = self._steps[name].depends_on
+                to_return += f"\t{name}"
+
+                if len(depends_on) != 0:
+                    to_return += " <- " + ", ".join(depends_on)
+
+                to_return += "\n"
+
+        return to_return
+
+    def _render_step(self, name: str) -> str:
+        to_return = ""
+
+        if self.timed:
+            to_return += f"STUDOSI_STEP_NAME={name}\n"
+
+        to_return += self._steps[name].script or ":"
+
+        return to_return
+
+    def render_sequential(self, header: bool = True) -> str:
+        to_return = ""
+
+        if header:
+            to_return += "#!/usr/bin/env bash\nset -euo pipefail\n\n"
+
+            if self.idempotent:
+                to_return += guards.render_preamble() + "\n"
+
+            if self.timed:
+                to_return += timing.render_preamble() + "\n"
+
+        to_return += "\n".join(
+            f"# step: {name}\n{self._render_step(name)}\n"
+            for name in self.topological_order()
+        )
+
+        if header and self.idempotent:
+            to_return += "\n" + guards.render_epilogue()
+
+        return to_return
+
+    def render(self, header: bool = True) -> str:
+        levels = self.levels()
+
+        to_return = ""
+
+        if header:
+            to_return += "#!/usr/bin/env bash\nset -euo pipefail\n\n"
+
+        to_return += "if [ \"${1:-}\" = \"--dry-run\" ]; then\n"
+        to_return += "cat <<'STUDOSI_GRAPH'\n"
+        to_return += self.render_dry_run()
+        to_return += "STUDOSI_GRAPH\n"
+        to_return += "exit 0\n"
+        to_return += "fi\n\n"
+
+        if self.idempotent:
+            to_return += guards.render_preamble() + "\n"
+
+        if self.timed:
+            to_return += timing.render_preamble() + "\n"
+
+        to_return += (
+            'STUDOSI_STEP_LOG_DIR="${STUDOSI_STEP_LOG_DIR:-$(mktemp -d)}"\n'
+            'mkdir -p "$STUDOSI_STEP_LOG_DIR"\n\n'
+        )
+
+        for name in self.topological_order():
+            to_return += f"step_{name}() {{\n"
+            to_return += f"{self._render_step(name)}\n"
+            to_return += "}\n\n"
+
+        to_return += "run_wave() {\n"
+        to_return += "\tlocal pids=() names=() failed=0 name i\n\n"
+        to_return += '\tfor name in "$@"; do\n'
+        to_return += '\t\techo "[studosi] ${name}: started" >&2\n'
+        to_return += (
+            '\t\t(set -euo pipefail; "step_${name}") '
+            '>"${STUDOSI_STEP_LOG_DIR}/${name}.log" 2>&1 &\n'
+        )
+        to_return += '\t\tpids+=("$!")\n'
+        to_return += '\t\tnames+=("$name")\n'
+        to_return += "\tdone\n\n"
+        to_return += '\tfor i in "${!pids[@]}"; do\n'
+        to_return += '\t\tif wait "${pids[$i]}"; then\n'
+        to_return += '\t\t\techo "[studosi] ${names[$i]}: done" >&2\n'
+        to_return += "\t\telse\n"
+        to_return += '\t\t\techo "[studosi] ${names[$i]}: failed" >&2\n'
+        to_return += '\t\t\ttail -n 20 "${STUDOSI_STEP_LOG_DIR}/${names[$i]}.log" >&2\n'
+        to_return += "\t\t\tfailed=1\n"
+        to_return += "\t\tfi\n"
+        to_return += "\tdone\n\n"
+        to_return += '\treturn "$failed"\n'
+        to_return += "}\n\n"
+
+        for level in levels:
+            to_return += "run_wave " + " ".join(level) + "\n"
+
+        if self.idempotent:
+            to_return += "\n" + guards.render_epilogue()
+
+        return to_return
@@ -0,0 +1,161 @@
+import re
+from typing import Iterable, Optional
+
+_NON_IDENTIFIER_REGEX = re.compile(r"[^A-Za-z0-9_]")
+
+
+def get_changed_variable(service: str) -> str:
+    service = str(service).strip()
+
+    if service.endswith(".service"):
+        service = service[: -len(".service")]
+
+    return "STUDOSI_CHANGED_" + _NON_IDENTIFIER_REGEX.sub("_", service)
+
+
+def get_repository_pattern(repository: str) -> str:
+    repository = str(repository).strip()
+
+    if repository.startswith("ppa:"):
+        return repository[len("ppa:") :]
+
+    return repository
+
+
+def _indent(script: str, indent: int) -> str:
+    return "".join(
+        ("\t" * indent + line if len(line) != 0 else line) + "\n"
+        for line in script.splitlines()
+    )
+
+
+def render_drift(message: str, indent: int = 0) -> str:
+    return _indent(f'echo "{message}" >>"${{STUDOSI_DRIFT_FILE:-/dev/stderr}}"', indent)
+
+
+def render_preamble() -> str:
+    to_return = ""
+    to_return += 'STUDOSI_CHECK="${STUDOSI_CHECK:-0}"\n'
+    to_return += 'if [ "${1:-}" = "--check" ]; then\n'
+    to_return += "\tSTUDOSI_CHECK=1\n"
+    to_return += "fi\n"
+    to_return += 'STUDOSI_DRIFT_FILE="$(mktemp)"\n'
+    to_return += "trap 'rm -f \"$STUDOSI_DRIFT_FILE\"' EXIT\n"
+
+    return to_return
+
+
+def render_epilogue() -> str:
+    to_return = ""
+    to_return += 'if [ "$STUDOSI_CHECK" = 1 ]; then\n'
+    to_return += '\tif [ -s "$STUDOSI_DRIFT_FILE" ]; then\n'
+    to_return += "\t\tsed 's/^/[studosi] drift: /' \"$STUDOSI_DRIFT_FILE\" >&2\n"
+    to_return += "\t\texit 1\n"
+    to_return += "\tfi\n"
+    to_return += '\techo "[studosi] no drift" >&2\n'
+    to_return += "fi\n"
+
+    return to_return
+
+
+def render_guarded(
+    condition: str,
+    command: str,
+    description: str,
+    changed_variable: Optional[str] = None,
+) -> str:
+    to_return = ""
+    to_return += f"if ! {condition}; then\n"
+    to_return += '\tif [ "${STUDOSI_CHECK:-0}" = 1 ]; then\n'
+    to_return += render_drift(description, indent=2)
+    to_return += "\telse\n"
+    to_return += _indent(command, 2)
+
+    if changed_variable is not None:
+        to_return += f"\t\t{changed_variable}=1\n"
+
+    to_return += "\tfi\n"
+    to_return += "fi\n"
+
+    return to_return
+
+
+def render_install_missing(
+    packages: Iterable[str],
+    use_sudo: bool = False,
+    update: bool = True,
+) -> str:
+    prefix = "sudo " if use_sudo else ""
+    packages = list(packages)
+
+    if len(packages) == 0:
+        return ""
+
+    to_return = ""
+    to_return += 'studosi_missing=""\n'
+    to_return += "for studosi_package in " + " ".join(packages) + "; do\n"
+    to_return += (
+        "\tif [ \"$(dpkg-query -W -f='${Status}' \"$studosi_package\" 2>/dev/null)\" "
+        '!= "install ok installed" ]; then\n'
+    )
+    to_return += '\t\tstudosi_missing="$studosi_missing $studosi_package"\n'
+    to_return += "\tfi\n"
+    to_return += "done\n"
+    to_return += 'if [ -n "$studosi_missing" ]; then\n'
+    to_return += '\tif [ "${STUDOSI_CHECK:-0}" = 1 ]; then\n'
+    to_return += render_drift("missing packages:$studosi_missing", indent=2)
+    to_return += "\telse\n"
+
+    if update:
+        to_return += f"\t\t{prefix}apt update -y\n"
+
+    to_return += f"\t\t{prefix}apt install -y $studosi_missing\n"
+    to_return += "\tfi\n"
+    to_return += "fi\n"
+
+    return to_return
+
+
+def render_repository(repository: str, use_sudo: bool = False) -> str:
+    prefix = "sudo " if use_sudo else ""
+    pattern = get_repository_pattern(repository)
+
+    return render_guarded(
+        condition=(
+            f'grep -rqsF "{pattern}" /etc/apt/sources.list /etc/apt/sources.list.d/'
+        ),
+        command=f"{prefix}add-apt-repository -y -n {repository}",
+        description=f"missing repository {repository}",
+    )
+
+
+def render_enable(services: Iterable[str], use_sudo: bool = False) -> str:
+    prefix = "sudo " if use_sudo else ""
+
+    return "".join(
+        render_guarded(
+            condition=f"systemctl is-enabled --quiet {service}",
+            command=f"{prefix}systemctl enable {service}",
+            description=f"{service} isn't enabled",
+        )
+        for service in services
+    )
+
+
+def render_restart(service: str, use_sudo: bool = False) -> str:
+    prefix = "sudo " if use_sudo else ""
+    changed_variable = get_changed_variable(service)
+
+    to_return = ""
+    to_return += (
+        f'if [ "${{{changed_variable}:-0}}" = 1 ] '
+        f"|| ! systemctl is-active --quiet {service}; then\n"
+    )
+    to_return += '\tif [ "${STUDOSI_CHECK:-0}" = 1 ]; then\n'
+    to_return += render_drift(f"{service} isn't running", indent=2)
+    to_return += "\telse\n"
+    to_return += f"\t\t{prefix}systemctl restart {service}\n"
+    to_return += "\tfi\n"
+    to_return += "fi\n"
+
+    return to_return
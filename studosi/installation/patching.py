@@ -0,0 +1,250 @@
+import difflib
+import os
+from pathlib import Path
+import re
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from studosi.installation.guards import render_drift
+
+_INI_LINE_REGEX = re.compile(r"^(\s*;)?\s*([^\s=;\[][^=]*?)\s*=\s*(.*?)\s*$")
+
+
+def _parse_ini_line(line: str) -> Optional[Tuple[bool, str, str]]:
+    match = _INI_LINE_REGEX.match(line)
+
+    if match is None:
+        return None
+
+    return match.group(1) is not None, match.group(2), match.group(3)
+
+
+def patch_ini_text(text: str, edits: Dict[str, str]) -> str:
+    lines = text.splitlines()
+    active = dict()
+    commented = dict()
+
+    for i, line in enumerate(lines):
+        parsed = _parse_ini_line(line)
+
+        if parsed is None or parsed[1] not in edits:
+            continue
+
+        is_commented, key, _ = parsed
+        target = commented if is_commented else active
+
+        if key not in target:
+            target[key] = i
+
+    to_append = list()
+
+    for key, value in edits.items():
+        value = str(value)
+
+        if key in active:
+            if _parse_ini_line(lines[active[key]])[2] != value:
+                lines[active[key]] = f"{key} = {value}"
+        elif key in commented:
+            lines[commented[key]] = f"{key} = {value}"
+        else:
+            to_append.append(f"{key} = {value}")
+
+    to_return = "\n".join(lines + to_append)
+
+    if len(to_return) != 0 and (text.endswith("\n") or len(to_append) != 0):
+        to_return += "\n"
+
+    return to_return
+
+
+def get_diff(original: str, patched: str, path: Union[Path, str] = "") -> str:
+    return "".join(
+        difflib.unified_diff(
+            original.splitlines(keepends=True),
+            patched.splitlines(keepends=True),
+            fromfile=f"{path}",
+            tofile=f"{path}",
+        )
+    )
+
+
+def patch_ini_file(
+    path: Union[Path, str],
+    edits: Dict[str, str],
+    dry_run: bool = False,
+) -> str:
+    path = Path(path)
+
+    with open(path, mode="r", encoding="utf8", newline="") as f:
+        original = f.read()
+
+    patched = patch_ini_text(original, edits)
+
+    if patched == original:
+        return ""
+
+    if not dry_run:
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}."
+        )
+
+        try:
+            with os.fdopen(file_descriptor, mode="w", encoding="utf8", newline="") as f:
+                f.write(patched)
+
+            os.chmod(temporary_path, os.stat(path).st_mode & 0o7777)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    return get_diff(original, patched, path=path)
+
+
+def patch_ini_files(
+    paths: Iterable[Union[Path, str]],
+    edits: Dict[str, str],
+    dry_run: bool = False,
+    skip_missing: bool = True,
+) -> Dict[str, str]:
+    to_return = dict()
+
+    for path in paths:
+        if skip_missing and not os.path.exists(path):
+            continue
+
+        to_return[str(path)] = patch_ini_file(path=path, edits=edits, dry_run=dry_run)
+
+    return to_return
+
+
+def _escape_awk_string(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_awk_program(edits: Dict[str, str]) -> str:
+    to_return = "BEGIN {\n"
+
+    for i, (key, value) in enumerate(edits.items(), start=1):
+        to_return += (
+            f'\twant["{_escape_awk_string(key)}"] = '
+            f'"{_escape_awk_string(value)}"; order[{i}] = '
+            f'"{_escape_awk_string(key)}"\n'
+        )
+
+    to_return += f"\tcount = {len(edits)}\n"
+    to_return += "}\n"
+    to_return += "{ lines[NR] = $0 }\n"
+    to_return += "END {\n"
+    to_return += "\tfor (i = 1; i <= NR; i++) {\n"
+    to_return += "\t\tline = lines[i]\n"
+    to_return += "\t\tif (line !~ /=/) continue\n"
+    to_return += "\t\tis_commented = line ~ /^[ \\t]*;/\n"
+    to_return += '\t\tsub(/^[ \\t]*;?[ \\t]*/, "", line)\n'
+    to_return += "\t\tkey = line\n"
+    to_return += '\t\tsub(/[ \\t]*=.*$/, "", key)\n'
+    to_return += "\t\tif (!(key in want)) continue\n"
+    to_return += "\t\tif (!is_commented && !(key in active)) {\n"
+    to_return += "\t\t\tactive[key] = i\n"
+    to_return += "\t\t\tvalue = line\n"
+    to_return += '\t\t\tsub(/^[^=]*=[ \\t]*/, "", value)\n'
+    to_return += '\t\t\tsub(/[ \\t]*$/, "", value)\n'
+    to_return += "\t\t\tcurrent[key] = value\n"
+    to_return += "\t\t} else if (is_commented && !(key in commented)) {\n"
+    to_return += "\t\t\tcommented[key] = i\n"
+    to_return += "\t\t}\n"
+    to_return += "\t}\n"
+    to_return += "\tfor (j = 1; j <= count; j++) {\n"
+    to_return += "\t\tkey = order[j]\n"
+    to_return += "\t\tif (key in active) {\n"
+    to_return += "\t\t\tif (current[key] != want[key]) replace[active[key]] = key\n"
+    to_return += "\t\t} else if (key in commented) {\n"
+    to_return += "\t\t\treplace[commented[key]] = key\n"
+    to_return += "\t\t}\n"
+    to_return += "\t}\n"
+    to_return += "\tfor (i = 1; i <= NR; i++) {\n"
+    to_return += '\t\tif (i in replace) print replace[i] " = " want[replace[i]]\n'
+    to_return += "\t\telse print lines[i]\n"
+    to_return += "\t}\n"
+    to_return += "\tfor (j = 1; j <= count; j++) {\n"
+    to_return += "\t\tkey = order[j]\n"
+    to_return += '\t\tif (!(key in active) && !(key in commented)) print key " = " want[key]\n'
+    to_return += "\t}\n"
+    to_return += "}\n"
+
+    return to_return
+
+
+def generate_ini_patch(
+    paths: Iterable[str],
+    edits: Dict[str, str],
+    use_sudo: bool = False,
+    changed_variable: Optional[str] = None,
+):
+    prefix = "sudo " if use_sudo else ""
+    paths: List[str] = list(paths)
+
+    if len(paths) == 0 or len(edits) == 0:
+        return ""
+
+    program = render_awk_program(edits=edits).replace("'", "'\\''")
+
+    to_return = ""
+    to_return += f"studosi_ini_program='{program}'\n"
+    to_return += "for studosi_ini_file in " + " ".join(paths) + "; do\n"
+    to_return += '\t[ -f "$studosi_ini_file" ] || continue\n'
+    to_return += '\tstudosi_ini_patched="$(mktemp)"\n'
+    to_return += (
+        '\tawk "$studosi_ini_program" "$studosi_ini_file" >"$studosi_ini_patched"\n'
+    )
+    to_return += '\tif ! cmp -s "$studosi_ini_file" "$studosi_ini_patched"; then\n'
+    to_return += '\t\tif [ "${STUDOSI_CHECK:-0}" = 1 ]; then\n'
+    to_return += render_drift("$studosi_ini_file differs", indent=3)
+    to_return += "\t\telse\n"
+    to_return += '\t\t\tdiff -u "$studosi_ini_file" "$studosi_ini_patched" || true\n'
+    to_return += f'\t\t\t{prefix}cp "$studosi_ini_patched" "$studosi_ini_file"\n'
+
+    if changed_variable is not None:
+        to_return += f"\t\t\t{changed_variable}=1\n"
+
+    to_return += "\t\tfi\n"
+    to_return += "\tfi\n"
+    to_return += '\trm -f "$studosi_ini_patched"\n'
+    to_return += "done\n"
+
+    return to_return
+
+
+def generate_file_write(
+    path: str,
+    content: str,
+    use_sudo: bool = False,
+    changed_variable: Optional[str] = None,
+    delimiter: str = "STUDOSI_FILE",
+):
+    prefix = "sudo " if use_sudo else ""
+
+    if not content.endswith("\n"):
+        content += "\n"
+
+    to_return = ""
+    to_return += 'studosi_file="$(mktemp)"\n'
+    to_return += f"cat >\"$studosi_file\" <<'{delimiter}'\n"
+    to_return += content
+    to_return += f"{delimiter}\n"
+    to_return += f'if ! cmp -s "$studosi_file" {path}; then\n'
+    to_return += '\tif [ "${STUDOSI_CHECK:-0}" = 1 ]; then\n'
+    to_return += render_drift(f"{path} differs", indent=2)
+    to_return += "\telse\n"
+    to_return += f'\t\tdiff -u {path} "$studosi_file" 2>/dev/null || true\n'
+    to_return += f'\t\t{prefix}cp "$studosi_file" {path}\n'
+    to_return += f"\t\t{prefix}chmod 644 {path}\n"
+
+    if changed_variable is not None:
+        to_return += f"\t\t{changed_variable}=1\n"
+
+    to_return += "\tfi\n"
+    to_return += "fi\n"
+    to_return += 'rm -f "$studosi_file"\n'
+
+    return to_return
@@ -0,0 +1,236 @@
+from typing import Iterable, List, Optional
+
+from studosi.installation import guards, timing
+
+
+def _extend_unique(target: List[str], values: Iterable[str]):
+    for value in values:
+        value = str(value).strip()
+
+        if len(value) != 0 and value not in target:
+            target.append(value)
+
+
+_UNIT_SUFFIXES = (
+    ".service",
+    ".socket",
+    ".target",
+    ".timer",
+)
+
+
+def _to_service_name(service: str) -> str:
+    service = str(service).strip()
+
+    if any(service.endswith(suffix) for suffix in _UNIT_SUFFIXES):
+        return service
+
+    return f"{service}.service"
+
+
+class ProvisioningPlan:
+    def __init__(
+        self, use_sudo: bool = False, idempotent: bool = False, timed: bool = False
+    ):
+        self.use_sudo = use_sudo
+        self.idempotent = idempotent
+        self.timed = timed
+
+        self._prerequisites: List[str] = list()
+        self._repositories: List[str] = list()
+        self._packages: List[str] = list()
+        self._commands: List[str] = list()
+        self._command_names: List[str] = list()
+        self._enabled_services: List[str] = list()
+        self._restarted_services: List[str] = list()
+
+    @property
+    def prefix(self) -> str:
+        return "sudo " if self.use_sudo else ""
+
+    @staticmethod
+    def get_changed_variable(service: str) -> str:
+        return guards.get_changed_variable(_to_service_name(service))
+
+    # region Properties
+    @property
+    def prerequisites(self) -> List[str]:
+        return list(self._prerequisites)
+
+    @property
+    def repositories(self) -> List[str]:
+        return list(self._repositories)
+
+    @property
+    def packages(self) -> List[str]:
+        return list(self._packages)
+
+    @property
+    def commands(self) -> List[str]:
+        return list(self._commands)
+
+    @property
+    def enabled_services(self) -> List[str]:
+        return list(self._enabled_services)
+
+    @property
+    def restarted_services(self) -> List[str]:
+        return list(self._restarted_services)
+
+    # endregion
+
+    def add_prerequisites(self, packages: Iterable[str]):
+        _extend_unique(self._prerequisites, packages)
+
+        return self
+
+    def add_repository(self, repository: str):
+        _extend_unique(self._repositories, (repository,))
+
+        return self
+
+    def add_packages(self, packages: Iterable[str]):
+        _extend_unique(self._packages, packages)
+
+        return self
+
+    def add_commands(self, script: str, name: Optional[str] = None):
+        script = script.strip("\n")
+
+        if len(script) != 0:
+            self._commands.append(script)
+            self._command_names.append(
+                f"commands_{len(self._commands)}" if name is None else name
+            )
+
+        return self
+
+    def add_service(self, service: str, enable: bool = True, restart: bool = True):
+        service = _to_service_name(service)
+
+        if enable:
+            _extend_unique(self._enabled_services, (service,))
+
+        if restart:
+            _extend_unique(self._restarted_services, (service,))
+
+        return self
+
+    @staticmethod
+    def _render_apt_install(prefix: str, packages: List[str]) -> str:
+        return f"{prefix}apt install -y \\\n" + " \\\n".join(
+            f"\t{package}" for package in packages
+        )
+
+    def render_prerequisites(self) -> str:
+        if len(self._prerequisites) == 0:
+            return ""
+
+        if self.idempotent:
+            return guards.render_install_missing(
+                self._prerequisites, use_sudo=self.use_sudo, update=False
+            )
+
+        return self._render_apt_install(self.prefix, self._prerequisites) + "\n"
+
+    def render_repositories(self) -> str:
+        if self.idempotent:
+            return "".join(
+                guards.render_repository(repository, use_sudo=self.use_sudo)
+                for repository in self._repositories
+            )
+
+        return "".join(
+            f"{self.prefix}add-apt-repository -y -n {repository}\n"
+            for repository in self._repositories
+        )
+
+    def render_install(self) -> str:
+        if len(self._packages) == 0 and len(self._repositories) == 0:
+            return ""
+
+        if self.idempotent:
+            return guards.render_install_missing(
+                self._packages, use_sudo=self.use_sudo, update=True
+            )
+
+        to_return = f"{self.prefix}apt update -y\n"
+
+        if len(self._packages) != 0:
+            to_return += self._render_apt_install(self.prefix, self._packages) + "\n"
+
+        return to_return
+
+    def render_commands(self) -> str:
+        if len(self._commands) == 0:
+            return ""
+
+        if self.timed:
+            return "\n".join(
+                timing.render_phase(name, command + "\n")
+                for name, command in zip(self._command_names, self._commands)
+            )
+
+        return "\n\n".join(self._commands) + "\n"
+
+    def render_services(self) -> str:
+        if self.idempotent:
+            return guards.render_enable(
+                self._enabled_services, use_sudo=self.use_sudo
+            ) + "".join(
+                guards.render_restart(service, use_sudo=self.use_sudo)
+                for service in self._restarted_services
+            )
+
+        to_return = ""
+
+        if len(self._enabled_services) != 0:
+            to_return += (
+                f"{self.prefix}systemctl enable "
+                + " ".join(self._enabled_services)
+                + "\n"
+            )
+
+        if len(self._restarted_services) != 0:
+            to_return += (
+                f"{self.prefix}systemctl restart "
+                + " ".join(self._restarted_services)
+                + "\n"
+            )
+
+        return to_return
+
+    def render(self, header: bool = True) -> str:
+        sections = (
+            ("apt_prerequisites", self.render_prerequisites()),
+            ("apt_repositories", self.render_repositories()),
+            ("apt_install", self.render_install()),
+            ("commands", self.render_commands()),
+            ("services", self.render_services()),
+        )
+
+        if self.timed:
+            sections = tuple(
+                (name, section)
+                if name == "commands" or len(section) == 0
+                else (name, timing.render_phase(name, section))
+                for name, section in sections
+            )
+
+        to_return = ""
+
+        if header:
+            to_return += "#!/usr/bin/env bash\nset -euo pipefail\n\n"
+
+            if self.idempotent:
+                to_return += guards.render_preamble() + "\n"
+
+            if self.timed:
+                to_return += timing.render_preamble() + "\n"
+
+        to_return += "\n".join(section for _, section in sections if len(section) != 0)
+
+        if header and self.idempotent:
+            to_return += "\n" + guards.render_epilogue()
+
+        return to_return
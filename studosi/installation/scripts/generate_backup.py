@@ -0,0 +1,155 @@
+import argparse
+from pathlib import Path
+
+from studosi.installation.database.mysql.ubuntu.backup import (
+    generate_backup,
+    generate_restore,
+)
+from studosi.installation.scripts.generate_stack import save_script
+
+
+def decorate_backup(parser: argparse.ArgumentParser):
+    backup_group = parser.add_argument_group("Backup")
+
+    backup_group.add_argument(
+        "--backup_root",
+        type=str,
+        default="/var/backups/studosi/mysql",
+        help="The folder every backup gets a timestamped subfolder in",
+    )
+
+    backup_group.add_argument(
+        "--databases",
+        type=str,
+        nargs="+",
+        default=None,
+        help="The databases to back up. Defaults to all non-system databases",
+    )
+
+    backup_group.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help=(
+            "The number of dump sessions, each with its own snapshot, or of "
+            "tables restored concurrently"
+        ),
+    )
+
+    backup_group.add_argument(
+        "--compression",
+        type=str,
+        choices=("zstd", "gzip", "none"),
+        default="zstd",
+        help="The compressor every dump is piped through",
+    )
+
+    backup_group.add_argument(
+        "--compression_level",
+        type=int,
+        default=None,
+        help="The compression level, defaults to 3 for zstd and 6 for gzip",
+    )
+
+    backup_group.add_argument(
+        "--inconsistent",
+        action="store_true",
+        help=(
+            "Don't take a global read lock while the dump sessions start their "
+            "snapshots, so every session dumps from a different point in time"
+        ),
+    )
+
+    backup_group.add_argument(
+        "--lock_timeout",
+        type=int,
+        default=300,
+        help=(
+            "Seconds to wait for the global read lock, and then for the dump "
+            "sessions' snapshots, before failing"
+        ),
+    )
+
+    backup_group.add_argument(
+        "--retention_days",
+        type=int,
+        default=7,
+        help="Backups older than this many days get deleted",
+    )
+
+    backup_group.add_argument(
+        "--retention_count",
+        type=int,
+        default=3,
+        help="The number of newest backups that are never deleted",
+    )
+
+    backup_group.add_argument(
+        "--defaults_file",
+        type=str,
+        default=None,
+        help="A MySQL option file with the credentials, e.g. `/root/.my.cnf`",
+    )
+
+    backup_group.add_argument(
+        "--use_sudo",
+        action="store_true",
+        help="Prefix the mysql and mysqldump commands with sudo",
+    )
+
+    return backup_group
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--output_folder",
+        type=str,
+        required=True,
+        help="The folder backup.sh and restore.sh will be written to",
+    )
+
+    return io_group
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    decorate_backup(parser=parser)
+    decorate_io(parser=parser)
+
+    args = parser.parse_args()
+
+    output_folder = Path(args.output_folder)
+
+    save_script(
+        script=generate_backup(
+            backup_root=args.backup_root,
+            databases=args.databases,
+            jobs=args.jobs,
+            compression=args.compression,
+            compression_level=args.compression_level,
+            consistent=not args.inconsistent,
+            lock_timeout=args.lock_timeout,
+            retention_days=args.retention_days,
+            retention_count=args.retention_count,
+            use_sudo=args.use_sudo,
+            defaults_file=args.defaults_file,
+        ),
+        output=output_folder / "backup.sh",
+    )
+    save_script(
+        script=generate_restore(
+            backup_root=args.backup_root,
+            jobs=args.jobs,
+            compression=args.compression,
+            use_sudo=args.use_sudo,
+            defaults_file=args.defaults_file,
+        ),
+        output=output_folder / "restore.sh",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+from studosi.constants.installation.database.mysql.ubuntu import ROOT_DEFAULTS_FILE
+from studosi.installation.stack import get_stack_kwargs, graph_stack, plan_stack
+
+
+def decorate_stack(parser: argparse.ArgumentParser):
+    stack_group = parser.add_argument_group("Stack")
+
+    stack_group.add_argument(
+        "--php_version",
+        type=str,
+        default="8.0",
+        help="The PHP version that will be installed",
+    )
+
+    stack_group.add_argument(
+        "--use_mysql",
+        action="store_true",
+        help="Install MySQL instead of MariaDB",
+    )
+
+    stack_group.add_argument(
+        "--tune_php",
+        action="store_true",
+        help="Tune the PHP-FPM pool and OPcache for this host's memory and CPUs",
+    )
+
+    stack_group.add_argument(
+        "--php_preload",
+        type=str,
+        default=None,
+        help=(
+            "With --tune_php, the OPcache preload script, e.g. the preload.php "
+            "written by export_php"
+        ),
+    )
+
+    stack_group.add_argument(
+        "--memory_total",
+        type=str,
+        default=None,
+        help="The target host memory, e.g. `8G`. Defaults to this host's memory",
+    )
+
+    stack_group.add_argument(
+        "--cpu_count",
+        type=int,
+        default=None,
+        help="The target host CPU count. Defaults to this host's CPU count",
+    )
+
+    stack_group.add_argument(
+        "--tune_database",
+        action="store_true",
+        help="Write a MariaDB performance drop-in sized for the target host",
+    )
+
+    stack_group.add_argument(
+        "--max_connections",
+        type=int,
+        default=151,
+        help="The number of database connections the tuning should expect",
+    )
+
+    stack_group.add_argument(
+        "--secure_database",
+        action="store_true",
+        help=(
+            "Harden the database like mysql_secure_installation, with SQL in one "
+            "non-interactive client session"
+        ),
+    )
+
+    stack_group.add_argument(
+        "--database_root_password",
+        type=str,
+        default=None,
+        help=(
+            "With --secure_database, the new root password. It ends up in the "
+            "rendered script, omit it to keep root on unix_socket login only. "
+            "On MySQL and MariaDB before 10.4 root then logs in with the "
+            "--database_defaults_file"
+        ),
+    )
+
+    stack_group.add_argument(
+        "--database_defaults_file",
+        type=str,
+        default=None,
+        help=(
+            "The root only option file the root password is kept in for later "
+            f"runs, {ROOT_DEFAULTS_FILE} by default"
+        ),
+    )
+
+    stack_group.add_argument(
+        "--configure_nginx",
+        action="store_true",
+        help="Write a tuned nginx.conf and a studosi site server block",
+    )
+
+    stack_group.add_argument(
+        "--materijali_root",
+        type=str,
+        default="/var/www/materijali",
+        help="The folder nginx serves materijali files from",
+    )
+
+    stack_group.add_argument(
+        "--server_name",
+        type=str,
+        default="_",
+        help="The nginx server_name of the studosi site",
+    )
+
+    stack_group.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Render a runner that executes independent steps concurrently",
+    )
+
+    stack_group.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Print the step graph instead of the script",
+    )
+
+    stack_group.add_argument(
+        "--idempotent",
+        action="store_true",
+        help=(
+            "Skip satisfied steps and restart services only on config changes. "
+            "The rendered script then accepts `--check` to only report drift"
+        ),
+    )
+
+    stack_group.add_argument(
+        "--timed",
+        action="store_true",
+        help=(
+            "Log the start, end, duration and exit code of every provisioning "
+            "phase as JSON lines to $STUDOSI_TIMING_LOG"
+        ),
+    )
+
+    stack_group.add_argument(
+        "--no_sudo",
+        action="store_true",
+        help="Don't prefix privileged commands with sudo",
+    )
+
+    return stack_group
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="The file the script will be written to, stdout if omitted",
+    )
+
+    return io_group
+
+
+def save_script(
+    script: str, output: Optional[Union[Path, str]] = None, private: bool = False
+):
+    if output is None:
+        print(script, end="")
+    else:
+        output_path = Path(output)
+
+        if not os.path.exists(output_path.parent):
+            os.makedirs(output_path.parent)
+
+        mode = 0o700 if private else 0o755
+        descriptor = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        os.fchmod(descriptor, mode)
+
+        with open(descriptor, mode="w", encoding="utf8") as f:
+            f.write(script)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    decorate_stack(parser=parser)
+    decorate_io(parser=parser)
+
+    args = parser.parse_args()
+    stack_kwargs = get_stack_kwargs(vars(args))
+
+    if args.parallel or args.dry_run:
+        graph = graph_stack(**stack_kwargs)
+
+        if args.dry_run:
+            print(graph.render_dry_run(), end="")
+            return
+
+        script = graph.render()
+    else:
+        script = plan_stack(**stack_kwargs).render()
+
+    save_script(
+        script=script,
+        output=args.output,
+        private=args.database_root_password is not None,
+    )
+
+
+if __name__ == "__main__":
+    main()
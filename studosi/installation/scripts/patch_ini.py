@@ -0,0 +1,62 @@
+import argparse
+import sys
+
+from studosi.installation.patching import patch_ini_files
+
+
+def decorate_patch(parser: argparse.ArgumentParser):
+    patch_group = parser.add_argument_group("Patch")
+
+    patch_group.add_argument(
+        "--files",
+        type=str,
+        nargs="+",
+        required=True,
+        help="The ini files that will be patched. Missing files are skipped",
+    )
+
+    patch_group.add_argument(
+        "--set",
+        type=str,
+        nargs="+",
+        required=True,
+        dest="edits",
+        help="The edits to apply. List of strings in the format: `key=value`",
+    )
+
+    patch_group.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Only print the diff, don't write any file",
+    )
+
+    return patch_group
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    decorate_patch(parser=parser)
+
+    args = parser.parse_args()
+
+    edits = dict()
+
+    for edit in args.edits:
+        if "=" not in edit:
+            parser.error(f"Edit `{edit}` isn't in the format `key=value`")
+
+        key, value = edit.split("=", 1)
+        edits[key.strip()] = value.strip()
+
+    diffs = patch_ini_files(paths=args.files, edits=edits, dry_run=args.dry_run)
+
+    for path, diff in diffs.items():
+        if len(diff) == 0:
+            print(f"{path}: unchanged", file=sys.stderr)
+        else:
+            print(diff, end="")
+
+
+if __name__ == "__main__":
+    main()
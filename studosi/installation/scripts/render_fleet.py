@@ -0,0 +1,78 @@
+import argparse
+import time
+
+from studosi.installation.fleet import (
+    has_secrets,
+    load_inventory,
+    render_fleet,
+    resolve_hosts,
+    write_fleet,
+)
+
+
+def decorate_fleet(parser: argparse.ArgumentParser):
+    fleet_group = parser.add_argument_group("Fleet")
+
+    fleet_group.add_argument(
+        "--inventory",
+        type=str,
+        required=True,
+        help="The YAML or JSON inventory of hosts, groups and defaults",
+    )
+
+    fleet_group.add_argument(
+        "--limit",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Only render the given hosts",
+    )
+
+    fleet_group.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of rendering processes. Defaults to the CPU count",
+    )
+
+    return fleet_group
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="The folder that will get one subfolder of scripts per host",
+    )
+
+    return io_group
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    decorate_fleet(parser=parser)
+    decorate_io(parser=parser)
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    hosts = resolve_hosts(load_inventory(args.inventory), limit=args.limit)
+    cache = dict()
+    rendered = render_fleet(hosts, jobs=args.jobs, cache=cache)
+    private_hosts = [name for name, settings in hosts.items() if has_secrets(settings)]
+    written = write_fleet(rendered, output=args.output, private_hosts=private_hosts)
+
+    print(
+        f"Rendered {len(hosts)} hosts from {len(cache)} unique fragments, "
+        f"wrote {len(written)} changed files in "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
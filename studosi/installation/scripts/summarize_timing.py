@@ -0,0 +1,63 @@
+import argparse
+import json
+
+from studosi.installation.timing import iterate_records, render_summary, summarize
+
+
+def decorate_summary(parser: argparse.ArgumentParser):
+    summary_group = parser.add_argument_group("Summary")
+
+    summary_group.add_argument(
+        "--logs",
+        type=str,
+        nargs="+",
+        required=True,
+        help="The JSON lines timing logs or glob patterns, e.g. `logs/*.jsonl`",
+    )
+
+    summary_group.add_argument(
+        "--group_by",
+        type=str,
+        nargs="+",
+        default=("step", "phase"),
+        help="The record keys phases are grouped by: run, host, script, step, phase",
+    )
+
+    summary_group.add_argument(
+        "--top",
+        type=int,
+        default=None,
+        help="Only show the given number of slowest groups",
+    )
+
+    summary_group.add_argument(
+        "--format",
+        type=str,
+        choices=("text", "json"),
+        default="text",
+        help="The summary output format",
+    )
+
+    return summary_group
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    decorate_summary(parser=parser)
+
+    args = parser.parse_args()
+
+    rows = summarize(iterate_records(args.logs), group_by=tuple(args.group_by))
+
+    if args.top is not None:
+        rows = rows[: args.top]
+
+    if args.format == "json":
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print(render_summary(rows), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import tempfile
+from typing import Optional, Tuple
+
+from studosi.installation import guards
+from studosi.installation.patching import generate_file_write
+from studosi.installation.plan import ProvisioningPlan
+from studosi.utils.host_utils import get_cpu_count
+
+
+def get_php_socket(php_version: str = "8.0") -> str:
+    return f"/run/php/php{php_version.strip()}-fpm.sock"
+
+
+def render_nginx_conf(
+    cpu_count: Optional[int] = None,
+    worker_connections: int = 4096,
+    keepalive_timeout: int = 30,
+    keepalive_requests: int = 1000,
+    client_max_body_size: str = "100m",
+    gzip_comp_level: int = 5,
+    fastcgi_cache_path: Optional[str] = "/var/cache/nginx/fastcgi",
+    fastcgi_cache_size: str = "256m",
+    user: Optional[str] = "www-data",
+    pid: str = "/run/nginx.pid",
+    error_log: str = "/var/log/nginx/error.log",
+    access_log: str = "/var/log/nginx/access.log",
+    mime_types: str = "/etc/nginx/mime.types",
+    includes: Tuple[str, ...] = (
+        "/etc/nginx/conf.d/*.conf",
+        "/etc/nginx/sites-enabled/*",
+    ),
+) -> str:
+    cpu_count = get_cpu_count() if cpu_count is None else max(1, cpu_count)
+
+    to_return = ""
+
+    if user is not None:
+        to_return += f"user {user};\n"
+
+    to_return += f"worker_processes {cpu_count};\n"
+    to_return += f"worker_rlimit_nofile {2 * worker_connections};\n"
+    to_return += f"pid {pid};\n"
+    to_return += f"error_log {error_log};\n\n"
+
+    to_return += "events {\n"
+    to_return += f"\tworker_connections {worker_connections};\n"
+    to_return += "\tmulti_accept on;\n"
+    to_return += "}\n\n"
+
+    to_return += "http {\n"
+    to_return += "\tsendfile on;\n"
+    to_return += "\tsendfile_max_chunk 1m;\n"
+    to_return += "\ttcp_nopush on;\n"
+    to_return += "\ttcp_nodelay on;\n"
+    to_return += f"\tkeepalive_timeout {keepalive_timeout};\n"
+    to_return += f"\tkeepalive_requests {keepalive_requests};\n"
+    to_return += "\ttypes_hash_max_size 2048;\n"
+    to_return += "\tserver_tokens off;\n"
+    to_return += f"\tclient_max_body_size {client_max_body_size};\n\n"
+
+    to_return += f"\tinclude {mime_types};\n"
+    to_return += "\tdefault_type application/octet-stream;\n\n"
+
+    to_return += f"\taccess_log {access_log};\n\n"
+
+    to_return += "\tgzip on;\n"
+    to_return += "\tgzip_static on;\n"
+    to_return += "\tgzip_vary on;\n"
+    to_return += "\tgzip_proxied any;\n"
+    to_return += f"\tgzip_comp_level {gzip_comp_level};\n"
+    to_return += "\tgzip_min_length 256;\n"
+    to_return += (
+        "\tgzip_types text/plain text/css text/xml application/json "
+        "application/javascript application/xml image/svg+xml;\n\n"
+    )
+
+    to_return += "\topen_file_cache max=10000 inactive=60s;\n"
+    to_return += "\topen_file_cache_valid 120s;\n"
+    to_return += "\topen_file_cache_min_uses 2;\n"
+    to_return += "\topen_file_cache_errors on;\n"
+
+    if fastcgi_cache_path is not None:
+        to_return += (
+            f"\n\tfastcgi_cache_path {fastcgi_cache_path} levels=1:2 "
+            f"keys_zone=studosi:64m max_size={fastcgi_cache_size} inactive=60m "
+            "use_temp_path=off;\n"
+        )
+        to_return += '\tfastcgi_cache_key "$scheme$request_method$host$request_uri";\n'
+
+    if len(includes) != 0:
+        to_return += "\n"
+
+    for include in includes:
+        to_return += f"\tinclude {include};\n"
+
+    to_return += "}\n"
+
+    return to_return
+
+
+def render_site(
+    php_version: str = "8.0",
+    php_socket: Optional[str] = None,
+    materijali_root: str = "/var/www/materijali",
+    materijali_location: str = "/materijali/",
+    root: str = "/var/www/studosi/public",
+    server_name: str = "_",
+    listen: int = 80,
+    materijali_max_age: int = 30 * 24 * 60 * 60,
+    meta_max_age: int = 60 * 60,
+    use_fastcgi_cache: bool = True,
+    fastcgi_cache_valid: str = "10m",
+    fastcgi_params: str = "fastcgi_params",
+) -> str:
+    php_socket = get_php_socket(php_version) if php_socket is None else php_socket
+    materijali_location = "/" + materijali_location.strip("/") + "/"
+    materijali_root = materijali_root.rstrip("/") + "/"
+
+    to_return = ""
+    to_return += "server {\n"
+    to_return += f"\tlisten {listen};\n"
+    to_return += f"\tlisten [::]:{listen};\n"
+    to_return += f"\tserver_name {server_name};\n\n"
+
+    to_return += f"\troot {root};\n"
+    to_return += "\tindex index.php index.html;\n\n"
+
+    if use_fastcgi_cache:
+        to_return += "\tset $skip_cache 0;\n\n"
+        to_return += "\tif ($request_method !~ ^(GET|HEAD)$) {\n"
+        to_return += "\t\tset $skip_cache 1;\n"
+        to_return += "\t}\n\n"
+        to_return += '\tif ($http_cookie ~* "PHPSESSID") {\n'
+        to_return += "\t\tset $skip_cache 1;\n"
+        to_return += "\t}\n\n"
+
+    to_return += f"\tlocation {materijali_location} {{\n"
+    to_return += f"\t\talias {materijali_root};\n"
+    # expires would send a second Cache-Control header next to this one
+    to_return += (
+        f'\t\tadd_header Cache-Control "public, max-age={materijali_max_age}";\n\n'
+    )
+    to_return += "\t\tlocation ~ /meta\\.json$ {\n"
+    to_return += f'\t\t\tadd_header Cache-Control "public, max-age={meta_max_age}";\n'
+    to_return += "\t\t}\n"
+    to_return += "\t}\n\n"
+
+    to_return += "\tlocation / {\n"
+    to_return += "\t\ttry_files $uri $uri/ /index.php?$query_string;\n"
+    to_return += "\t}\n\n"
+
+    to_return += "\tlocation ~ \\.php$ {\n"
+    to_return += "\t\ttry_files $uri =404;\n"
+    to_return += f"\t\tinclude {fastcgi_params};\n"
+    to_return += (
+        "\t\tfastcgi_param SCRIPT_FILENAME $realpath_root$fastcgi_script_name;\n"
+    )
+    to_return += f"\t\tfastcgi_pass unix:{php_socket};\n"
+    to_return += "\t\tfastcgi_keep_conn on;\n"
+
+    if use_fastcgi_cache:
+        to_return += "\n\t\tfastcgi_cache studosi;\n"
+        to_return += f"\t\tfastcgi_cache_valid 200 301 302 {fastcgi_cache_valid};\n"
+        to_return += "\t\tfastcgi_cache_bypass $skip_cache;\n"
+        to_return += "\t\tfastcgi_no_cache $skip_cache;\n"
+        to_return += "\t\tfastcgi_cache_use_stale error timeout updating http_500;\n"
+        to_return += "\t\tfastcgi_cache_lock on;\n"
+        to_return += "\t\tadd_header X-Cache-Status $upstream_cache_status;\n"
+
+    to_return += "\t}\n\n"
+
+    to_return += "\tlocation ~ /\\.(?!well-known) {\n"
+    to_return += "\t\tdeny all;\n"
+    to_return += "\t}\n"
+    to_return += "}\n"
+
+    return to_return
+
+
+def generate_configuration(
+    nginx_conf: Optional[str] = None,
+    site: Optional[str] = None,
+    site_name: str = "studosi",
+    fastcgi_cache_path: Optional[str] = "/var/cache/nginx/fastcgi",
+    disable_default_site: bool = True,
+    use_sudo: bool = True,
+    reload_service: bool = True,
+    changed_variable: Optional[str] = None,
+):
+    prefix = "sudo " if use_sudo else ""
+
+    if nginx_conf is None:
+        nginx_conf = render_nginx_conf(fastcgi_cache_path=fastcgi_cache_path)
+
+    if site is None:
+        site = render_site()
+
+    site_path = f"/etc/nginx/sites-available/{site_name}"
+    enabled_path = f"/etc/nginx/sites-enabled/{site_name}"
+    default_path = "/etc/nginx/sites-enabled/default"
+
+    to_return = ""
+    to_return += generate_file_write(
+        path="/etc/nginx/nginx.conf",
+        content=nginx_conf,
+        use_sudo=use_sudo,
+        changed_variable=changed_variable,
+        delimiter="STUDOSI_NGINX",
+    )
+    to_return += "\n"
+    to_return += generate_file_write(
+        path=site_path,
+        content=site,
+        use_sudo=use_sudo,
+        changed_variable=changed_variable,
+        delimiter="STUDOSI_NGINX",
+    )
+    to_return += "\n"
+
+    to_return += guards.render_guarded(
+        condition=f'[ "$(readlink {enabled_path})" = "{site_path}" ]',
+        command=f"{prefix}ln -sf {site_path} {enabled_path}",
+        description=f"{enabled_path} isn't enabled",
+        changed_variable=changed_variable,
+    )
+
+    if disable_default_site:
+        to_return += guards.render_guarded(
+            condition=f"[ ! -e {default_path} ]",
+            command=f"{prefix}rm -f {default_path}",
+            description=f"{default_path} is still enabled",
+            changed_variable=changed_variable,
+        )
+
+    if fastcgi_cache_path is not None:
+        to_return += guards.render_guarded(
+            condition=f"[ -d {fastcgi_cache_path} ]",
+            command=f"{prefix}mkdir -p {fastcgi_cache_path}",
+            description=f"{fastcgi_cache_path} is missing",
+        )
+
+    to_return += f'\nif [ "${{STUDOSI_CHECK:-0}}" != 1 ]; then\n'
+    to_return += f"\t{prefix}nginx -t\n"
+    to_return += "fi\n"
+
+    if reload_service:
+        if changed_variable is None:
+            to_return += f"\n{prefix}systemctl reload nginx.service\n"
+        else:
+            to_return += f'\nif [ "${{{changed_variable}:-0}}" = 1 ]; then\n'
+            to_return += f"\t{prefix}systemctl reload nginx.service\n"
+            to_return += "fi\n"
+
+    return to_return
+
+
+def plan_configuration(plan: ProvisioningPlan, **kwargs):
+    plan.add_commands(
+        generate_configuration(
+            use_sudo=plan.use_sudo,
+            reload_service=False,
+            changed_variable=plan.get_changed_variable("nginx"),
+            **kwargs,
+        ),
+        name="nginx_configuration",
+    )
+
+    return plan.add_service("nginx", enable=True, restart=True)
+
+
+def validate_configuration(
+    nginx_conf_kwargs: Optional[dict] = None,
+    site: Optional[str] = None,
+    nginx_binary: Optional[str] = None,
+) -> Optional[Tuple[bool, str]]:
+    nginx_binary = shutil.which("nginx") if nginx_binary is None else nginx_binary
+
+    if nginx_binary is None:
+        return None
+
+    nginx_conf_kwargs = dict() if nginx_conf_kwargs is None else dict(nginx_conf_kwargs)
+    site = render_site() if site is None else site
+
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        temporary_path = Path(temporary_folder)
+
+        for file_name in ("mime.types", "fastcgi_params"):
+            source = Path("/etc/nginx") / file_name
+
+            if os.path.exists(source):
+                shutil.copyfile(source, temporary_path / file_name)
+            else:
+                (temporary_path / file_name).write_text("", encoding="utf8")
+
+        (temporary_path / "site.conf").write_text(site, encoding="utf8")
+
+        nginx_conf_kwargs.update(
+            {
+                "user": None,
+                "pid": str(temporary_path / "nginx.pid"),
+                "error_log": str(temporary_path / "error.log"),
+                "access_log": str(temporary_path / "access.log"),
+                "mime_types": str(temporary_path / "mime.types"),
+                "includes": (str(temporary_path / "site.conf"),),
+            }
+        )
+
+        if nginx_conf_kwargs.get("fastcgi_cache_path", "") is not None:
+            nginx_conf_kwargs["fastcgi_cache_path"] = str(temporary_path / "cache")
+
+        conf_path = temporary_path / "nginx.conf"
+        conf_path.write_text(render_nginx_conf(**nginx_conf_kwargs), encoding="utf8")
+
+        result = subprocess.run(
+            (nginx_binary, "-t", "-q", "-p", temporary_folder, "-c", str(conf_path)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+
+    return result.returncode == 0, result.stdout
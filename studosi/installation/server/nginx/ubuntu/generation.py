@@ -1,14 +1,37 @@
-def generate_install(use_sudo: bool = False):
+from studosi.constants.installation.server.nginx.ubuntu import NGINX_PACKAGES
+from studosi.installation import guards
+from studosi.installation.plan import ProvisioningPlan
+
+
+def generate_install(use_sudo: bool = False, idempotent: bool = False):
     prefix = "sudo " if use_sudo else ""
 
-    return f"{prefix}apt install nginx\n"
+    if idempotent:
+        return guards.render_install_missing(NGINX_PACKAGES, use_sudo=use_sudo)
+
+    return f"{prefix}apt install -y " + " ".join(NGINX_PACKAGES) + "\n"
 
 
-def generate_init(use_sudo: bool = False):
+def generate_init(use_sudo: bool = False, idempotent: bool = False):
     prefix = "sudo " if use_sudo else ""
 
+    if idempotent:
+        to_return = ""
+        to_return += guards.render_enable(("nginx.service",), use_sudo=use_sudo)
+        to_return += guards.render_restart("nginx.service", use_sudo=use_sudo)
+
+        return to_return
+
     to_return = ""
     to_return += f"{prefix}systemctl enable nginx.service\n"
     to_return += f"{prefix}systemctl restart nginx.service\n"
 
     return to_return
+
+
+def plan_install(plan: ProvisioningPlan):
+    return plan.add_packages(NGINX_PACKAGES)
+
+
+def plan_init(plan: ProvisioningPlan):
+    return plan.add_service("nginx", enable=True, restart=True)
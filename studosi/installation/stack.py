@@ -0,0 +1,310 @@
+from typing import Any, Dict, Optional
+
+from studosi.installation.backend.php.ubuntu import generation as php_generation
+from studosi.installation.backend.php.ubuntu import tuning as php_tuning
+from studosi.installation.database.mysql.ubuntu import generation as mysql_generation
+from studosi.installation.database.mysql.ubuntu import tuning as mysql_tuning
+from studosi.installation.graph import StepGraph
+from studosi.installation.plan import ProvisioningPlan
+from studosi.installation.server.nginx.ubuntu import (
+    configuration as nginx_configuration,
+)
+from studosi.installation.server.nginx.ubuntu import generation as nginx_generation
+
+
+def _plan_php_tuning(
+    plan: ProvisioningPlan,
+    php_version: str,
+    php_setup: Dict[str, Any],
+    php_tuning_kwargs: Optional[Dict[str, Any]],
+):
+    if php_tuning_kwargs is None:
+        return plan
+
+    php_tuning_kwargs = dict(php_tuning_kwargs)
+    php_tuning_kwargs.setdefault("memory_limit", php_setup.get("memory_limit", "256M"))
+
+    return php_tuning.plan_tuning(plan, version=php_version, **php_tuning_kwargs)
+
+
+def _plan_nginx_configuration(
+    plan: ProvisioningPlan,
+    php_version: str,
+    nginx_conf_kwargs: Optional[Dict[str, Any]],
+    nginx_site_kwargs: Optional[Dict[str, Any]],
+):
+    if nginx_conf_kwargs is None and nginx_site_kwargs is None:
+        return plan
+
+    nginx_conf_kwargs = dict() if nginx_conf_kwargs is None else nginx_conf_kwargs
+    nginx_site_kwargs = dict() if nginx_site_kwargs is None else nginx_site_kwargs
+
+    nginx_site_kwargs = {"php_version": php_version, **nginx_site_kwargs}
+
+    return nginx_configuration.plan_configuration(
+        plan,
+        nginx_conf=nginx_configuration.render_nginx_conf(**nginx_conf_kwargs),
+        site=nginx_configuration.render_site(**nginx_site_kwargs),
+        fastcgi_cache_path=nginx_conf_kwargs.get(
+            "fastcgi_cache_path", "/var/cache/nginx/fastcgi"
+        ),
+    )
+
+
+def plan_stack(
+    php_version: str = "8.0",
+    use_mariadb: bool = True,
+    use_sudo: bool = True,
+    idempotent: bool = False,
+    timed: bool = False,
+    php_setup: Optional[Dict[str, Any]] = None,
+    php_tuning_kwargs: Optional[Dict[str, Any]] = None,
+    nginx_conf_kwargs: Optional[Dict[str, Any]] = None,
+    nginx_site_kwargs: Optional[Dict[str, Any]] = None,
+    database_tuning_kwargs: Optional[Dict[str, Any]] = None,
+    database_setup_kwargs: Optional[Dict[str, Any]] = None,
+    plan: Optional[ProvisioningPlan] = None,
+) -> ProvisioningPlan:
+    if plan is None:
+        plan = ProvisioningPlan(use_sudo=use_sudo, idempotent=idempotent, timed=timed)
+
+    if php_setup is None:
+        php_setup = dict()
+
+    nginx_generation.plan_install(plan)
+    nginx_generation.plan_init(plan)
+    _plan_nginx_configuration(plan, php_version, nginx_conf_kwargs, nginx_site_kwargs)
+
+    php_generation.plan_prep(plan)
+    php_generation.plan_install(plan, version=php_version)
+    php_generation.plan_setup(plan, version=php_version, **php_setup)
+    _plan_php_tuning(plan, php_version, php_setup, php_tuning_kwargs)
+
+    mysql_generation.plan_install(plan, use_mariadb=use_mariadb)
+    mysql_generation.plan_init(plan, use_mariadb=use_mariadb)
+
+    if database_setup_kwargs is not None:
+        mysql_generation.plan_setup(
+            plan, use_mariadb=use_mariadb, **database_setup_kwargs
+        )
+
+    if database_tuning_kwargs is not None:
+        mysql_tuning.plan_tuning(
+            plan, use_mariadb=use_mariadb, **database_tuning_kwargs
+        )
+
+    return plan
+
+
+def plan_packages_step(
+    plan: ProvisioningPlan, php_version: str = "8.0", use_mariadb: bool = True
+) -> ProvisioningPlan:
+    php_generation.plan_prep(plan)
+    nginx_generation.plan_install(plan)
+    php_generation.plan_install(plan, version=php_version)
+    mysql_generation.plan_install(plan, use_mariadb=use_mariadb)
+
+    return plan
+
+
+def plan_nginx_step(
+    plan: ProvisioningPlan,
+    php_version: str = "8.0",
+    nginx_conf_kwargs: Optional[Dict[str, Any]] = None,
+    nginx_site_kwargs: Optional[Dict[str, Any]] = None,
+) -> ProvisioningPlan:
+    nginx_generation.plan_init(plan)
+
+    return _plan_nginx_configuration(
+        plan, php_version, nginx_conf_kwargs, nginx_site_kwargs
+    )
+
+
+def plan_php_step(
+    plan: ProvisioningPlan,
+    php_version: str = "8.0",
+    php_setup: Optional[Dict[str, Any]] = None,
+    php_tuning_kwargs: Optional[Dict[str, Any]] = None,
+) -> ProvisioningPlan:
+    php_setup = dict() if php_setup is None else php_setup
+
+    php_generation.plan_setup(plan, version=php_version, **php_setup)
+
+    return _plan_php_tuning(plan, php_version, php_setup, php_tuning_kwargs)
+
+
+def plan_database_step(
+    plan: ProvisioningPlan,
+    use_mariadb: bool = True,
+    database_tuning_kwargs: Optional[Dict[str, Any]] = None,
+    database_setup_kwargs: Optional[Dict[str, Any]] = None,
+) -> ProvisioningPlan:
+    mysql_generation.plan_init(plan, use_mariadb=use_mariadb)
+
+    if database_setup_kwargs is not None:
+        mysql_generation.plan_setup(
+            plan, use_mariadb=use_mariadb, **database_setup_kwargs
+        )
+
+    if database_tuning_kwargs is not None:
+        mysql_tuning.plan_tuning(
+            plan, use_mariadb=use_mariadb, **database_tuning_kwargs
+        )
+
+    return plan
+
+
+STACK_STEPS = {
+    "packages": (),
+    "nginx": ("packages",),
+    "php": ("packages",),
+    "database": ("packages",),
+}
+
+
+def get_stack_kwargs(settings: Dict[str, Any]) -> Dict[str, Any]:
+    php_tuning_kwargs = None
+
+    if settings.get("tune_php", False):
+        php_tuning_kwargs = {
+            "memory_total": settings.get("memory_total"),
+            "cpu_count": settings.get("cpu_count"),
+            "preload": settings.get("php_preload"),
+        }
+
+    nginx_conf_kwargs = None
+    nginx_site_kwargs = None
+
+    if settings.get("configure_nginx", False):
+        nginx_conf_kwargs = {"cpu_count": settings.get("cpu_count")}
+        nginx_site_kwargs = {
+            "materijali_root": settings.get("materijali_root", "/var/www/materijali"),
+            "server_name": settings.get("server_name", "_"),
+        }
+
+    database_tuning_kwargs = None
+
+    if settings.get("tune_database", False):
+        database_tuning_kwargs = {
+            "memory_total": settings.get("memory_total"),
+            "cpu_count": settings.get("cpu_count"),
+            "max_connections": settings.get("max_connections", 151),
+        }
+
+    database_setup_kwargs = None
+
+    if settings.get("secure_database", False):
+        root_password = settings.get("database_root_password")
+        database_setup_kwargs = {
+            "set_root_password": root_password is not None,
+            "new_root_password": root_password,
+            "defaults_file": settings.get("database_defaults_file"),
+        }
+
+    return {
+        "php_version": str(settings.get("php_version", "8.0")),
+        "use_mariadb": not settings.get("use_mysql", False),
+        "use_sudo": not settings.get("no_sudo", False),
+        "idempotent": settings.get("idempotent", False),
+        "timed": settings.get("timed", False),
+        "php_tuning_kwargs": php_tuning_kwargs,
+        "nginx_conf_kwargs": nginx_conf_kwargs,
+        "nginx_site_kwargs": nginx_site_kwargs,
+        "database_tuning_kwargs": database_tuning_kwargs,
+        "database_setup_kwargs": database_setup_kwargs,
+    }
+
+
+def get_step_kwargs(stack_kwargs: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    php_version = stack_kwargs.get("php_version", "8.0")
+    use_mariadb = stack_kwargs.get("use_mariadb", True)
+
+    return {
+        "packages": {"php_version": php_version, "use_mariadb": use_mariadb},
+        "nginx": {
+            "php_version": php_version,
+            "nginx_conf_kwargs": stack_kwargs.get("nginx_conf_kwargs"),
+            "nginx_site_kwargs": stack_kwargs.get("nginx_site_kwargs"),
+        },
+        "php": {
+            "php_version": php_version,
+            "php_setup": stack_kwargs.get("php_setup"),
+            "php_tuning_kwargs": stack_kwargs.get("php_tuning_kwargs"),
+        },
+        "database": {
+            "use_mariadb": use_mariadb,
+            "database_tuning_kwargs": stack_kwargs.get("database_tuning_kwargs"),
+            "database_setup_kwargs": stack_kwargs.get("database_setup_kwargs"),
+        },
+    }
+
+
+def plan_step(
+    name: str,
+    use_sudo: bool = True,
+    idempotent: bool = False,
+    timed: bool = False,
+    **kwargs,
+) -> ProvisioningPlan:
+    if name not in _STEP_PLANNERS:
+        step_names = list(_STEP_PLANNERS)
+        error_string = (
+            ", ".join((f"`{x}`" for x in step_names[:-1])) + f" or {step_names[-1]}"
+        )
+
+        raise KeyError(f"Stack step must be one of: {error_string}")
+
+    plan = ProvisioningPlan(use_sudo=use_sudo, idempotent=idempotent, timed=timed)
+
+    return _STEP_PLANNERS[name](plan, **kwargs)
+
+
+_STEP_PLANNERS = {
+    "packages": plan_packages_step,
+    "nginx": plan_nginx_step,
+    "php": plan_php_step,
+    "database": plan_database_step,
+}
+
+
+def graph_stack(
+    php_version: str = "8.0",
+    use_mariadb: bool = True,
+    use_sudo: bool = True,
+    idempotent: bool = False,
+    timed: bool = False,
+    php_setup: Optional[Dict[str, Any]] = None,
+    php_tuning_kwargs: Optional[Dict[str, Any]] = None,
+    nginx_conf_kwargs: Optional[Dict[str, Any]] = None,
+    nginx_site_kwargs: Optional[Dict[str, Any]] = None,
+    database_tuning_kwargs: Optional[Dict[str, Any]] = None,
+    database_setup_kwargs: Optional[Dict[str, Any]] = None,
+    graph: Optional[StepGraph] = None,
+) -> StepGraph:
+    if graph is None:
+        graph = StepGraph(idempotent=idempotent, timed=timed)
+
+    step_kwargs = get_step_kwargs(
+        {
+            "php_version": php_version,
+            "use_mariadb": use_mariadb,
+            "php_setup": php_setup,
+            "php_tuning_kwargs": php_tuning_kwargs,
+            "nginx_conf_kwargs": nginx_conf_kwargs,
+            "nginx_site_kwargs": nginx_site_kwargs,
+            "database_tuning_kwargs": database_tuning_kwargs,
+            "database_setup_kwargs": database_setup_kwargs,
+        }
+    )
+
+    for name, depends_on in STACK_STEPS.items():
+        plan = plan_step(
+            name,
+            use_sudo=use_sudo,
+            idempotent=idempotent,
+            timed=timed,
+            **step_kwargs[name],
+        )
+        graph.add_plan(name, plan, depends_on=depends_on)
+
+    return graph
@@ -0,0 +1,163 @@
+import glob
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+_GROUP_KEYS = (
+    "run",
+    "host",
+    "script",
+    "step",
+    "phase",
+)
+
+
+def render_preamble(log_path: str = "studosi-timing.jsonl") -> str:
+    to_return = ""
+    to_return += f'STUDOSI_TIMING_LOG="${{STUDOSI_TIMING_LOG:-{log_path}}}"\n'
+    to_return += (
+        'STUDOSI_RUN_ID="${STUDOSI_RUN_ID:-$(date -u +%Y%m%dT%H%M%SZ)-$$}"\n'
+    )
+    to_return += 'STUDOSI_HOST="${STUDOSI_HOST:-$(hostname)}"\n'
+    to_return += 'STUDOSI_SCRIPT="$(basename "$0")"\n'
+    to_return += 'STUDOSI_STEP_NAME="${STUDOSI_STEP_NAME:-main}"\n'
+    to_return += 'STUDOSI_PHASE=""\n'
+    to_return += 'mkdir -p "$(dirname "$STUDOSI_TIMING_LOG")"\n\n'
+
+    to_return += "studosi_phase_begin() {\n"
+    to_return += '\tSTUDOSI_PHASE="$1"\n'
+    to_return += '\tSTUDOSI_PHASE_START="$(date +%s%N)"\n'
+    to_return += "}\n\n"
+
+    to_return += "studosi_phase_end() {\n"
+    to_return += "\tlocal end\n"
+    to_return += '\t[ -n "$STUDOSI_PHASE" ] || return 0\n'
+    to_return += '\tend="$(date +%s%N)"\n'
+    to_return += (
+        "\tprintf '{\"run\":\"%s\",\"host\":\"%s\",\"script\":\"%s\","
+        '"step":"%s","phase":"%s","start_ms":%d,"end_ms":%d,'
+        "\"duration_ms\":%d,\"exit_code\":%d}\\n' \\\n"
+    )
+    to_return += (
+        '\t\t"$STUDOSI_RUN_ID" "$STUDOSI_HOST" "$STUDOSI_SCRIPT" '
+        '"$STUDOSI_STEP_NAME" "$STUDOSI_PHASE" \\\n'
+    )
+    to_return += (
+        '\t\t"$((STUDOSI_PHASE_START / 1000000))" "$((end / 1000000))" '
+        '"$(((end - STUDOSI_PHASE_START) / 1000000))" "${1:-0}" \\\n'
+    )
+    to_return += '\t\t>>"$STUDOSI_TIMING_LOG"\n'
+    to_return += '\tSTUDOSI_PHASE=""\n'
+    to_return += "}\n\n"
+
+    to_return += "set -o errtrace\n"
+    to_return += "trap 'studosi_phase_end \"$?\"' ERR\n"
+
+    return to_return
+
+
+def render_phase(name: str, script: str) -> str:
+    to_return = ""
+    to_return += f"studosi_phase_begin {name}\n"
+    to_return += script
+
+    if not script.endswith("\n"):
+        to_return += "\n"
+
+    to_return += "studosi_phase_end\n"
+
+    return to_return
+
+
+def iterate_records(paths: Iterable[Union[Path, str]]) -> Iterator[Dict[str, Any]]:
+    for path in paths:
+        for file_path in sorted(glob.glob(str(path))) or (str(path),):
+            if not os.path.isfile(file_path):
+                continue
+
+            with open(file_path, mode="r", encoding="utf8") as f:
+                for line in f:
+                    line = line.strip()
+
+                    if len(line) == 0:
+                        continue
+
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+
+def _percentile(values: List[int], percentile: float) -> int:
+    index = max(0, math.ceil(percentile / 100 * len(values)) - 1)
+
+    return values[index]
+
+
+def summarize(
+    records: Iterable[Dict[str, Any]],
+    group_by: Tuple[str, ...] = ("step", "phase"),
+) -> List[Dict[str, Any]]:
+    for key in group_by:
+        if key not in _GROUP_KEYS:
+            error_string = (
+                ", ".join((f"`{x}`" for x in _GROUP_KEYS[:-1]))
+                + f" or {_GROUP_KEYS[-1]}"
+            )
+
+            raise KeyError(f"Timing group key must be one of: {error_string}")
+
+    groups = dict()
+
+    for record in records:
+        group = groups.setdefault(
+            tuple(record.get(key) for key in group_by),
+            {"durations": list(), "failures": 0, "hosts": set(), "runs": set()},
+        )
+        group["durations"].append(int(record.get("duration_ms", 0)))
+        group["failures"] += int(record.get("exit_code", 0) != 0)
+        group["hosts"].add(record.get("host"))
+        group["runs"].add(record.get("run"))
+
+    to_return = list()
+
+    for key, group in groups.items():
+        durations = sorted(group["durations"])
+
+        to_return.append(
+            {
+                **dict(zip(group_by, key)),
+                "count": len(durations),
+                "hosts": len(group["hosts"]),
+                "runs": len(group["runs"]),
+                "failures": group["failures"],
+                "total_ms": sum(durations),
+                "mean_ms": sum(durations) // len(durations),
+                "p50_ms": _percentile(durations, 50),
+                "p95_ms": _percentile(durations, 95),
+                "max_ms": durations[-1],
+            }
+        )
+
+    return sorted(to_return, key=lambda x: x["total_ms"], reverse=True)
+
+
+def render_summary(rows: List[Dict[str, Any]]) -> str:
+    if len(rows) == 0:
+        return "No timing records\n"
+
+    columns = list(rows[0])
+    cells = [columns] + [[str(row[column]) for column in columns] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(columns))]
+
+    to_return = ""
+
+    for row in cells:
+        to_return += (
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+            + "\n"
+        )
+
+    return to_return
@@ -0,0 +1,228 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple, Union
+import zipfile
+
+from studosi.materijali import profiling
+from studosi.materijali.manifest import update_manifest
+
+STORED_EXTENSIONS = (
+    ".pdf",
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".gif",
+    ".webp",
+    ".zip",
+    ".gz",
+    ".br",
+    ".bz2",
+    ".xz",
+    ".zst",
+    ".7z",
+    ".rar",
+    ".mp3",
+    ".mp4",
+    ".docx",
+    ".xlsx",
+    ".pptx",
+)
+
+STATE_FILE_NAME = "bundles.json"
+
+_GENERATED_SUFFIXES = (
+    ".gz",
+    ".br",
+)
+
+_UNSAFE_FILE_NAME_REGEX = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def get_subject_files(manifest: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    paths = {entry["path"] for entry in manifest["files"]}
+    to_return = dict()
+
+    for entry in manifest["files"]:
+        if "/" not in entry["path"] or entry["subject"] is None:
+            continue
+
+        # Precompressed siblings are a serving detail, not materials
+        if entry["path"].endswith(_GENERATED_SUFFIXES) and entry["path"][:-3] in paths:
+            continue
+
+        to_return.setdefault(entry["subject"], list()).append(entry)
+
+    return to_return
+
+
+def get_bundle_file_name(abbreviation: str) -> str:
+    safe_abbreviation = _UNSAFE_FILE_NAME_REGEX.sub("_", abbreviation)
+
+    # Abbreviations come from meta.json, they mustn't leave the output folder
+    if safe_abbreviation != abbreviation or safe_abbreviation.startswith("."):
+        safe_abbreviation = (
+            safe_abbreviation.lstrip(".")
+            + "-"
+            + hashlib.sha256(abbreviation.encode("utf8")).hexdigest()[:8]
+        )
+
+    return f"{safe_abbreviation}.zip"
+
+
+def get_fingerprint(entries: List[Dict[str, Any]], compression_level: int) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(f"{compression_level}\n".encode("utf8"))
+
+    for entry in sorted(entries, key=lambda x: x["path"]):
+        hasher.update(
+            f"{entry['path']}\0{entry['size']}\0{entry['hash']}\n".encode("utf8")
+        )
+
+    return hasher.hexdigest()
+
+
+def write_bundle(
+    root_folder: Union[Path, str],
+    abbreviation: str,
+    entries: List[Dict[str, Any]],
+    path: Union[Path, str],
+    compression_level: int = 6,
+) -> int:
+    root_folder = os.fspath(root_folder)
+    path = Path(path)
+    folder_name = get_bundle_file_name(abbreviation)[: -len(".zip")]
+
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}."
+    )
+
+    try:
+        with os.fdopen(file_descriptor, mode="wb") as f:
+            with zipfile.ZipFile(f, mode="w", allowZip64=True) as archive:
+                for entry in sorted(entries, key=lambda x: x["path"]):
+                    if entry["path"].lower().endswith(STORED_EXTENSIONS):
+                        compress_type = zipfile.ZIP_STORED
+                    else:
+                        compress_type = zipfile.ZIP_DEFLATED
+
+                    archive.write(
+                        os.path.join(root_folder, entry["path"]),
+                        arcname=f"{folder_name}/{entry['path'].split('/', 1)[1]}",
+                        compress_type=compress_type,
+                        compresslevel=compression_level,
+                    )
+
+            size = f.tell()
+
+        # mkstemp creates owner-only files, bundles are served to everyone
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+    profiling.count("bundles_written")
+    profiling.count("bundle_bytes_written", size)
+
+    return size
+
+
+def _load_state(path: Path) -> Dict[str, str]:
+    if not os.path.isfile(path):
+        return dict()
+
+    with open(path, mode="r", encoding="utf8") as f:
+        return dict(json.load(f).get("bundles", dict()))
+
+
+def _save_state(path: Path, bundles: Dict[str, str]):
+    with open(path, mode="w+", encoding="utf8") as f:
+        json.dump(
+            {"bundles": dict(sorted(bundles.items()))},
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+        f.write("\n")
+
+
+def build_bundles(
+    root_folder: Union[Path, str],
+    output_folder: Union[Path, str],
+    manifest_file_name: str = "manifest.json",
+    compression_level: int = 6,
+    jobs: Optional[int] = None,
+    full: bool = False,
+    dry_run: bool = False,
+    **kwargs,
+) -> Dict[str, Any]:
+    output_folder = Path(output_folder)
+    jobs = min(32, (os.cpu_count() or 1) + 4) if jobs is None else max(1, jobs)
+    state_path = output_folder / STATE_FILE_NAME
+
+    manifest = update_manifest(
+        root_folder, file_name=manifest_file_name, save=not dry_run, **kwargs
+    )
+
+    with profiling.timer("fingerprint"):
+        subject_files = get_subject_files(manifest)
+        fingerprints = {
+            abbreviation: get_fingerprint(entries, compression_level)
+            for abbreviation, entries in subject_files.items()
+        }
+
+    previous = dict() if full else _load_state(state_path)
+
+    stale: List[Tuple[str, List[Dict[str, Any]]]] = [
+        (abbreviation, entries)
+        for abbreviation, entries in subject_files.items()
+        if previous.get(abbreviation) != fingerprints[abbreviation]
+        or not (output_folder / get_bundle_file_name(abbreviation)).is_file()
+    ]
+    removed = sorted(x for x in _load_state(state_path) if x not in fingerprints)
+
+    to_return = {
+        "built": sorted(x[0] for x in stale),
+        "removed": removed,
+        "fresh": len(subject_files) - len(stale),
+    }
+
+    profiling.count("bundles_fresh", to_return["fresh"])
+
+    if dry_run:
+        return to_return
+
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    def build_bundle(stale_bundle: Tuple[str, List[Dict[str, Any]]]) -> int:
+        abbreviation, entries = stale_bundle
+
+        return write_bundle(
+            root_folder,
+            abbreviation,
+            entries,
+            output_folder / get_bundle_file_name(abbreviation),
+            compression_level=compression_level,
+        )
+
+    with profiling.timer("bundle"):
+        # Biggest subjects first so one doesn't end up alone in the last batch
+        stale.sort(key=lambda x: sum(entry["size"] for entry in x[1]), reverse=True)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(build_bundle, stale))
+
+    for abbreviation in removed:
+        try:
+            os.unlink(output_folder / get_bundle_file_name(abbreviation))
+        except FileNotFoundError:
+            pass
+
+    _save_state(state_path, fingerprints)
+
+    return to_return
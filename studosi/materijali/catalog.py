@@ -0,0 +1,541 @@
+import json
+import mmap
+import os
+from pathlib import Path
+import struct
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.exceptions import CatalogFormatError
+from studosi.materijali.subject import Subject, SubjectMeta
+
+CATALOG_MAGIC = b"STCATLG\0"
+CATALOG_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIIQQQ")
+_STRING_ENTRY = struct.Struct("<II")
+_INDEX_ENTRY = struct.Struct("<IQI")
+_RECORD_HEADER = struct.Struct("<IIIII")
+_ROW = struct.Struct("<6H")
+_COUNT = struct.Struct("<I")
+_PAIR = struct.Struct("<II")
+
+_NONE = 0xFFFFFFFF
+
+_STRUCTURED_KEYS = (
+    SubjectMeta._default_name_key,
+    SubjectMeta._default_abbreviation_key,
+    SubjectMeta._default_properties_key,
+    SubjectMeta._default_links_key,
+    SubjectMeta._default_related_subjects_key,
+)
+
+
+def load_metas(
+    root_folder: Union[Path, str], meta_file_name: str = "meta.json"
+) -> Dict[str, SubjectMeta]:
+    to_return = dict()
+
+    with os.scandir(root_folder) as entries:
+        for entry in sorted(entries, key=lambda x: x.name):
+            if not entry.is_dir(follow_symlinks=False) or entry.name.startswith("."):
+                continue
+
+            meta_path = os.path.join(entry.path, meta_file_name)
+
+            if not os.path.isfile(meta_path):
+                continue
+
+            with open(meta_path, mode="r", encoding="utf8") as f:
+                to_return[entry.name] = SubjectMeta.loads(f.read())
+
+    profiling.count("metas_loaded", len(to_return))
+
+    return to_return
+
+
+def _get_vocabularies() -> List[List[str]]:
+    return [
+        list(Subject.programs),
+        list(Subject.studies),
+        list(Subject.courses),
+        list(Subject.modules),
+        list(Subject.semesters),
+        list(Subject.groups),
+    ]
+
+
+def _is_string_table(value: Any) -> bool:
+    return isinstance(value, dict) and all(
+        isinstance(key, str)
+        and isinstance(inner, dict)
+        and all(isinstance(x, str) and isinstance(y, str) for x, y in inner.items())
+        for key, inner in value.items()
+    )
+
+
+def _is_properties(value: Any, depth: int = 5) -> bool:
+    if depth == 0:
+        return (
+            isinstance(value, (list, set, tuple))
+            and len(value) != 0
+            and all(isinstance(x, str) for x in value)
+        )
+
+    return (
+        isinstance(value, dict)
+        and len(value) != 0
+        and all(
+            isinstance(key, str) and _is_properties(inner, depth=depth - 1)
+            for key, inner in value.items()
+        )
+    )
+
+
+class _CatalogWriter:
+    def __init__(self):
+        self.strings: List[str] = list()
+        self.string_ids: Dict[str, int] = dict()
+        self.vocabularies = _get_vocabularies()
+        self.vocabulary_ids = [
+            {value: i for i, value in enumerate(vocabulary)}
+            for vocabulary in self.vocabularies
+        ]
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+
+        string_id = self.string_ids.get(value)
+
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = string_id
+
+        return string_id
+
+    def vocabulary_id(self, column: int, value: str) -> int:
+        ids = self.vocabulary_ids[column]
+        vocabulary_id = ids.get(value)
+
+        if vocabulary_id is None:
+            vocabulary_id = len(self.vocabularies[column])
+
+            if vocabulary_id >= 0xFFFF:
+                raise CatalogFormatError("Too many distinct property values")
+
+            self.vocabularies[column].append(value)
+            ids[value] = vocabulary_id
+
+        return vocabulary_id
+
+    def encode_string_table(self, value: Dict[str, Dict[str, str]]) -> bytes:
+        to_return = _COUNT.pack(len(value))
+
+        for key, inner in value.items():
+            to_return += _PAIR.pack(self.intern(key), len(inner))
+
+            for inner_key, inner_value in inner.items():
+                to_return += _PAIR.pack(
+                    self.intern(inner_key), self.intern(inner_value)
+                )
+
+        return to_return
+
+    def encode_subject(self, meta: SubjectMeta) -> bytes:
+        config = meta.config
+        extra = {
+            key: value for key, value in config.items() if key not in _STRUCTURED_KEYS
+        }
+        checks = (
+            lambda x: x is None or isinstance(x, str),
+            lambda x: x is None or isinstance(x, str),
+            _is_properties,
+            _is_string_table,
+            _is_string_table,
+        )
+        present = 0
+
+        # Anything that doesn't fit the typed layout round-trips through JSON
+        for i, (key, check) in enumerate(zip(_STRUCTURED_KEYS, checks)):
+            if key not in config:
+                continue
+
+            if check(config[key]):
+                present |= 1 << i
+            else:
+                extra[key] = config[key]
+
+        def get(i: int, default: Any = None) -> Any:
+            return config[_STRUCTURED_KEYS[i]] if present & (1 << i) else default
+
+        rows = list()
+
+        if present & (1 << 2):
+            for row in meta.iter_property_rows():
+                rows.append(
+                    _ROW.pack(*(self.vocabulary_id(i, x) for i, x in enumerate(row)))
+                )
+
+        to_return = _RECORD_HEADER.pack(
+            self.intern(get(0)),
+            self.intern(get(1)),
+            self.intern(
+                None
+                if len(extra) == 0
+                else json.dumps(extra, ensure_ascii=False, separators=(",", ":"))
+            ),
+            present,
+            len(rows),
+        )
+        to_return += b"".join(rows)
+        to_return += self.encode_string_table(get(3, dict()))
+        to_return += self.encode_string_table(get(4, dict()))
+
+        return to_return
+
+
+def dumps_catalog(metas: Dict[str, SubjectMeta]) -> bytes:
+    writer = _CatalogWriter()
+    keys = sorted(metas)
+
+    with profiling.timer("encode"):
+        records = [writer.encode_subject(metas[key]) for key in keys]
+        key_ids = [writer.intern(key) for key in keys]
+
+        vocabulary_section = b"".join(
+            _COUNT.pack(len(vocabulary))
+            + b"".join(_COUNT.pack(writer.intern(x)) for x in vocabulary)
+            for vocabulary in writer.vocabularies
+        )
+
+        encoded_strings = [x.encode("utf8") for x in writer.strings]
+        string_entries = list()
+        string_offset = 0
+
+        for encoded in encoded_strings:
+            string_entries.append(_STRING_ENTRY.pack(string_offset, len(encoded)))
+            string_offset += len(encoded)
+
+        strings_section = b"".join(string_entries) + b"".join(encoded_strings)
+
+    strings_offset = _HEADER.size
+    vocabulary_offset = strings_offset + len(strings_section)
+    index_offset = vocabulary_offset + len(vocabulary_section)
+    record_offset = index_offset + _INDEX_ENTRY.size * len(records)
+
+    index_entries = list()
+
+    for key_id, record in zip(key_ids, records):
+        index_entries.append(_INDEX_ENTRY.pack(key_id, record_offset, len(record)))
+        record_offset += len(record)
+
+    return (
+        _HEADER.pack(
+            CATALOG_MAGIC,
+            CATALOG_VERSION,
+            len(writer.strings),
+            len(records),
+            strings_offset,
+            vocabulary_offset,
+            index_offset,
+        )
+        + strings_section
+        + vocabulary_section
+        + b"".join(index_entries)
+        + b"".join(records)
+    )
+
+
+def save_catalog(metas: Dict[str, SubjectMeta], path: Union[Path, str]) -> int:
+    path = Path(path)
+    dumped = dumps_catalog(metas)
+
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}."
+    )
+
+    try:
+        with os.fdopen(file_descriptor, mode="wb") as f:
+            f.write(dumped)
+
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+    profiling.count("catalog_bytes_written", len(dumped))
+
+    return len(dumped)
+
+
+class Catalog:
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        self._buffer = buffer
+
+        if len(buffer) < _HEADER.size:
+            raise CatalogFormatError("Catalog is shorter than its header")
+
+        (
+            magic,
+            version,
+            self._string_count,
+            self._subject_count,
+            self._strings_offset,
+            vocabulary_offset,
+            self._index_offset,
+        ) = _HEADER.unpack_from(buffer, 0)
+
+        if magic != CATALOG_MAGIC:
+            raise CatalogFormatError("File is not a studosi catalog")
+
+        if version != CATALOG_VERSION:
+            raise CatalogFormatError(
+                f"Catalog version {version} isn't supported, expected "
+                f"{CATALOG_VERSION}"
+            )
+
+        # Records come last, so the last one ending in the buffer means nothing's cut
+        index_end = self._index_offset + _INDEX_ENTRY.size * self._subject_count
+        end = index_end
+
+        if self._subject_count != 0 and index_end <= len(buffer):
+            _, offset, length = _INDEX_ENTRY.unpack_from(
+                buffer, index_end - _INDEX_ENTRY.size
+            )
+            end = offset + length
+
+        if index_end > len(buffer) or end != len(buffer):
+            raise CatalogFormatError("Catalog is truncated or has trailing data")
+
+        self._string_blob_offset = (
+            self._strings_offset + _STRING_ENTRY.size * self._string_count
+        )
+        self._string_cache: Dict[int, str] = dict()
+
+        self._vocabularies: List[List[str]] = list()
+        offset = vocabulary_offset
+
+        for _ in range(6):
+            (count,) = _COUNT.unpack_from(buffer, offset)
+            offset += _COUNT.size
+            self._vocabularies.append(
+                [
+                    self._string(x)
+                    for x in struct.unpack_from(f"<{count}I", buffer, offset)
+                ]
+            )
+            offset += _COUNT.size * count
+
+    @staticmethod
+    def open(path: Union[Path, str]) -> "Catalog":
+        with open(path, mode="rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise CatalogFormatError("Catalog is empty")
+
+            return Catalog(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._subject_count
+
+    def _key(self, i: int) -> str:
+        return self._string(
+            _INDEX_ENTRY.unpack_from(
+                self._buffer, self._index_offset + i * _INDEX_ENTRY.size
+            )[0]
+        )
+
+    def _find(self, key: str) -> Optional[int]:
+        # Binary search over the index so only log(n) keys get decoded
+        low, high = 0, self._subject_count
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self._subject_count and self._key(low) == key:
+            return low
+
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._key(i) for i in range(self._subject_count))
+
+    def keys(self) -> List[str]:
+        return list(self)
+
+    def items(self) -> Iterator[Tuple[str, SubjectMeta]]:
+        for i in range(self._subject_count):
+            yield self._key(i), self._decode(i)
+
+    def __getitem__(self, key: str) -> SubjectMeta:
+        i = self._find(key)
+
+        if i is None:
+            raise KeyError(f"Catalog doesn't contain a subject `{key}`")
+
+        return self._decode(i)
+
+    def get(self, key: str) -> Optional[SubjectMeta]:
+        i = self._find(key)
+
+        return None if i is None else self._decode(i)
+
+    def select(
+        self,
+        program: Optional[str] = None,
+        study: Optional[str] = None,
+        course: Optional[str] = None,
+        module: Optional[str] = None,
+        semester: Optional[str] = None,
+        group: Optional[str] = None,
+    ) -> List[str]:
+        query = (program, study, course, module, semester, group)
+
+        # Patterns are matched once per vocabulary entry, rows are only compared ids
+        matching = [
+            None
+            if value is None
+            else {
+                i
+                for i, pattern in enumerate(vocabulary)
+                if SubjectMeta.property_pattern_matches(pattern, value)
+            }
+            for vocabulary, value in zip(self._vocabularies, query)
+        ]
+        to_return = list()
+
+        for i in range(self._subject_count):
+            _, offset, _ = _INDEX_ENTRY.unpack_from(
+                self._buffer, self._index_offset + i * _INDEX_ENTRY.size
+            )
+            row_count = _RECORD_HEADER.unpack_from(self._buffer, offset)[4]
+            offset += _RECORD_HEADER.size
+
+            for row in _ROW.iter_unpack(
+                self._buffer[offset : offset + _ROW.size * row_count]
+            ):
+                if all(ids is None or x in ids for ids, x in zip(matching, row)):
+                    to_return.append(self._key(i))
+                    break
+
+        return to_return
+
+    def _string(self, string_id: int) -> Optional[str]:
+        if string_id == _NONE:
+            return None
+
+        to_return = self._string_cache.get(string_id)
+
+        if to_return is None:
+            if string_id >= self._string_count:
+                raise CatalogFormatError(f"String id {string_id} is out of range")
+
+            offset, length = _STRING_ENTRY.unpack_from(
+                self._buffer, self._strings_offset + string_id * _STRING_ENTRY.size
+            )
+            start = self._string_blob_offset + offset
+            to_return = bytes(self._buffer[start : start + length]).decode("utf8")
+            self._string_cache[string_id] = to_return
+
+        return to_return
+
+    def _decode_string_table(
+        self, offset: int
+    ) -> Tuple[Dict[str, Dict[str, str]], int]:
+        to_return = dict()
+
+        (count,) = _COUNT.unpack_from(self._buffer, offset)
+        offset += _COUNT.size
+
+        for _ in range(count):
+            key_id, inner_count = _PAIR.unpack_from(self._buffer, offset)
+            offset += _PAIR.size
+            inner = dict()
+
+            for _ in range(inner_count):
+                inner_key, inner_value = _PAIR.unpack_from(self._buffer, offset)
+                offset += _PAIR.size
+                inner[self._string(inner_key)] = self._string(inner_value)
+
+            to_return[self._string(key_id)] = inner
+
+        return to_return, offset
+
+    def _decode(self, i: int) -> SubjectMeta:
+        _, offset, _ = _INDEX_ENTRY.unpack_from(
+            self._buffer, self._index_offset + i * _INDEX_ENTRY.size
+        )
+        name, abbreviation, extra, present, row_count = _RECORD_HEADER.unpack_from(
+            self._buffer, offset
+        )
+        offset += _RECORD_HEADER.size
+
+        properties = dict()
+
+        for row in _ROW.iter_unpack(
+            self._buffer[offset : offset + _ROW.size * row_count]
+        ):
+            program, study, course, module, semester, group = (
+                vocabulary[x] for vocabulary, x in zip(self._vocabularies, row)
+            )
+            properties.setdefault(program, dict()).setdefault(study, dict()).setdefault(
+                course, dict()
+            ).setdefault(module, dict()).setdefault(semester, list()).append(group)
+
+        offset += _ROW.size * row_count
+
+        links, offset = self._decode_string_table(offset)
+        related, offset = self._decode_string_table(offset)
+
+        config = {
+            key: value
+            for i, (key, value) in enumerate(
+                zip(
+                    _STRUCTURED_KEYS,
+                    (
+                        self._string(name),
+                        self._string(abbreviation),
+                        properties,
+                        links,
+                        related,
+                    ),
+                )
+            )
+            if present & (1 << i)
+        }
+
+        if extra != _NONE:
+            config.update(json.loads(self._string(extra)))
+
+        return SubjectMeta(config=config, copy_config=False)
+
+
+def catalog_to_json(catalog: Catalog) -> Dict[str, Dict[str, Any]]:
+    return {key: meta.config for key, meta in catalog.items()}
+
+
+def json_to_catalog(dumped: Dict[str, Dict[str, Any]]) -> bytes:
+    return dumps_catalog(
+        {key: SubjectMeta(config=config) for key, config in dumped.items()}
+    )
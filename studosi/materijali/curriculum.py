@@ -0,0 +1,365 @@
+import hashlib
+import itertools
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.subject import (
+    PROPERTY_WILDCARD,
+    PropertyRow,
+    Subject,
+    SubjectMeta,
+)
+
+VIEWS_VERSION = 1
+
+INDEX_FILE_NAME = "index.json"
+STATE_FILE_NAME = ".views.json"
+
+ViewKey = Tuple[str, str, str, str]
+
+
+def get_view_name(key: ViewKey) -> str:
+    return ".".join(key) + ".json"
+
+
+def _dumps(value: Any) -> str:
+    return (
+        json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=False)
+        + "\n"
+    )
+
+
+def _write_atomic(path: Path, content: str):
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}."
+    )
+
+    try:
+        with os.fdopen(file_descriptor, mode="w", encoding="utf8") as f:
+            profiling.count("bytes_written", f.write(content))
+
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def _load_state(path: Path) -> Dict[str, Any]:
+    if os.path.isfile(path):
+        with open(path, mode="r", encoding="utf8") as f:
+            state = json.load(f)
+
+        if state.get("version") == VIEWS_VERSION:
+            return state
+
+    return {"version": VIEWS_VERSION, "subjects": dict(), "views": dict()}
+
+
+def scan_subjects(
+    root_folder: Union[Path, str],
+    previous: Dict[str, Dict[str, Any]],
+    meta_file_name: str = "meta.json",
+) -> Dict[str, Dict[str, Any]]:
+    to_return = dict()
+
+    with os.scandir(root_folder) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False) or entry.name.startswith("."):
+                continue
+
+            meta_path = os.path.join(entry.path, meta_file_name)
+
+            try:
+                mtime_ns = os.stat(meta_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+
+            previous_subject = previous.get(entry.name)
+
+            if (
+                previous_subject is not None
+                and previous_subject["mtime_ns"] == mtime_ns
+            ):
+                to_return[entry.name] = previous_subject
+                profiling.count("subjects_reused")
+                continue
+
+            with open(meta_path, mode="r", encoding="utf8") as f:
+                meta = SubjectMeta.loads(f.read())
+
+            to_return[entry.name] = {
+                "mtime_ns": mtime_ns,
+                "name": meta.name,
+                "abbreviation": meta.abbreviation,
+                "rows": sorted(list(row) for row in meta.iter_property_rows()),
+            }
+            profiling.count("subjects_parsed")
+
+    return to_return
+
+
+def get_row_view_keys(
+    row: Sequence[str], known_keys: Set[ViewKey]
+) -> Set[ViewKey]:
+    key = tuple(row[:4])
+
+    if not any(SubjectMeta.is_property_pattern(x) for x in key):
+        return {key}
+
+    # Wildcards have no curriculum to expand over, they join views that exist
+    if PROPERTY_WILDCARD in key:
+        return {x for x in known_keys if SubjectMeta.property_row_matches(key, x)}
+
+    return set(
+        itertools.product(*(SubjectMeta.expand_property_pattern(x) for x in key))
+    )
+
+
+def get_known_view_keys(rows: Iterable[Sequence[str]]) -> Set[ViewKey]:
+    to_return = set()
+
+    for row in rows:
+        if PROPERTY_WILDCARD not in row[:4]:
+            to_return |= get_row_view_keys(row, set())
+
+    return to_return
+
+
+def resolve_property_rows(
+    meta: SubjectMeta, known_keys: Optional[Set[ViewKey]] = None
+) -> Set[PropertyRow]:
+    to_return = set()
+
+    for row in meta.iter_property_rows():
+        to_return.update(
+            (*key, semester, group)
+            for key in get_row_view_keys(row, known_keys or set())
+            for semester in SubjectMeta.expand_property_pattern(
+                row[4], vocabulary=Subject.semesters
+            )
+            for group in SubjectMeta.expand_property_pattern(
+                row[5], vocabulary=Subject.groups
+            )
+        )
+
+    return to_return
+
+
+def _iter_rows(subjects: Dict[str, Dict[str, Any]]) -> Iterable[List[str]]:
+    for subject in subjects.values():
+        yield from subject["rows"]
+
+
+def _expand_view_field(
+    value: str, known_values: Set[str], vocabulary: Iterable[str]
+) -> List[str]:
+    if not SubjectMeta.is_property_pattern(value):
+        return [value]
+
+    # Like with view keys, a wildcard joins what the view's other rows use
+    if value == PROPERTY_WILDCARD and len(known_values) != 0:
+        return sorted(known_values)
+
+    return SubjectMeta.expand_property_pattern(value, vocabulary=vocabulary)
+
+
+def expand_members(
+    members: List[Tuple[str, Dict[str, Any], str, str]]
+) -> List[Tuple[str, Dict[str, Any], str, str]]:
+    known_semesters = {
+        x[2] for x in members if not SubjectMeta.is_property_pattern(x[2])
+    }
+    known_groups = {x[3] for x in members if not SubjectMeta.is_property_pattern(x[3])}
+
+    to_return = list()
+    seen = set()
+
+    for folder, subject, semester_pattern, group_pattern in members:
+        for semester in _expand_view_field(
+            semester_pattern, known_semesters, Subject.semesters
+        ):
+            for group in _expand_view_field(
+                group_pattern, known_groups, Subject.groups
+            ):
+                if (folder, semester, group) not in seen:
+                    seen.add((folder, semester, group))
+                    to_return.append((folder, subject, semester, group))
+
+    return to_return
+
+
+def _get_view_keys(
+    subject: Optional[Dict[str, Any]], known_keys: Set[ViewKey]
+) -> Set[ViewKey]:
+    if subject is None:
+        return set()
+
+    return {
+        key for row in subject["rows"] for key in get_row_view_keys(row, known_keys)
+    }
+
+
+def _semester_sort_key(semester: str) -> Tuple[int, Any]:
+    try:
+        return 0, int(semester)
+    except ValueError:
+        return 1, semester
+
+
+def build_view(
+    key: ViewKey, members: List[Tuple[str, Dict[str, Any], str, str]]
+) -> Dict[str, Any]:
+    program, study, course, module = key
+    semesters = dict()
+
+    for folder, subject, semester, group in members:
+        semesters.setdefault(semester, dict()).setdefault(group, list()).append(
+            {
+                "abbreviation": subject["abbreviation"],
+                "name": subject["name"],
+                "folder": folder,
+            }
+        )
+
+    group_order = {group: i for i, group in enumerate(Subject.groups)}
+
+    return {
+        "program": program,
+        "study": study,
+        "course": course,
+        "module": module,
+        "semesters": [
+            {
+                "semester": semester,
+                "label": (
+                    Subject.semester(int(semester)) if semester.isdigit() else semester
+                ),
+                "groups": [
+                    {
+                        "group": group,
+                        "label": Subject.groups.get(group, group),
+                        "subjects": sorted(
+                            subjects_in_group,
+                            key=lambda x: (str(x["name"]), x["folder"]),
+                        ),
+                    }
+                    for group, subjects_in_group in sorted(
+                        semesters[semester].items(),
+                        key=lambda x: (group_order.get(x[0], len(group_order)), x[0]),
+                    )
+                ],
+            }
+            for semester in sorted(semesters, key=_semester_sort_key)
+        ],
+    }
+
+
+def build_index(views: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "version": VIEWS_VERSION,
+        "views": [
+            {
+                "program": view["key"][0],
+                "study": view["key"][1],
+                "course": view["key"][2],
+                "module": view["key"][3],
+                "path": name,
+                "subjects": view["subjects"],
+                "hash": view["hash"],
+            }
+            for name, view in sorted(views.items())
+        ],
+    }
+
+
+def export_views(
+    root_folder: Union[Path, str],
+    output_folder: Union[Path, str],
+    meta_file_name: str = "meta.json",
+    full: bool = False,
+) -> Dict[str, List[str]]:
+    output_folder = Path(output_folder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+    state_path = output_folder / STATE_FILE_NAME
+
+    state = _load_state(state_path)
+
+    with profiling.timer("scan"):
+        subjects = scan_subjects(
+            root_folder,
+            dict() if full else state["subjects"],
+            meta_file_name=meta_file_name,
+        )
+
+    old_keys = get_known_view_keys(_iter_rows(state["subjects"]))
+    known_keys = get_known_view_keys(_iter_rows(subjects))
+    dirty: Set[ViewKey] = set()
+
+    for folder in set(subjects) | set(state["subjects"]):
+        old = state["subjects"].get(folder)
+        new = subjects.get(folder)
+
+        if old is not new:
+            dirty |= _get_view_keys(old, old_keys) | _get_view_keys(new, known_keys)
+
+    views = dict() if full else dict(state["views"])
+    written = list()
+    removed = list()
+
+    with profiling.timer("views"):
+        members = {key: list() for key in dirty}
+
+        for folder, subject in subjects.items():
+            for row in subject["rows"]:
+                for key in get_row_view_keys(row, known_keys):
+                    if key in members:
+                        members[key].append((folder, subject, row[4], row[5]))
+
+        for key in sorted(dirty):
+            name = get_view_name(key)
+            members[key] = expand_members(members[key])
+
+            if len(members[key]) == 0:
+                views.pop(name, None)
+
+                try:
+                    os.unlink(output_folder / name)
+                    removed.append(name)
+                except FileNotFoundError:
+                    pass
+
+                continue
+
+            content = _dumps(build_view(key, members[key]))
+            content_hash = hashlib.sha256(content.encode("utf8")).hexdigest()[:16]
+
+            if (
+                views.get(name, dict()).get("hash") != content_hash
+                or not (output_folder / name).is_file()
+            ):
+                _write_atomic(output_folder / name, content)
+                written.append(name)
+
+            views[name] = {
+                "key": list(key),
+                "subjects": len({x[0] for x in members[key]}),
+                "hash": content_hash,
+            }
+
+    profiling.count("views_written", len(written))
+
+    index_path = output_folder / INDEX_FILE_NAME
+
+    if len(written) != 0 or len(removed) != 0 or not index_path.is_file():
+        _write_atomic(index_path, _dumps(build_index(views)))
+
+    state["subjects"] = subjects
+    state["views"] = views
+    _write_atomic(state_path, _dumps(state))
+
+    return {"written": written, "removed": removed}
@@ -0,0 +1,407 @@
+from concurrent.futures import ThreadPoolExecutor
+import fcntl
+import hashlib
+import os
+from pathlib import Path
+import secrets
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.manifest import (
+    hash_file,
+    iterate_files,
+    load_manifest,
+    save_manifest,
+)
+
+# From linux/fs.h, _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+_LINK_MODES = {
+    "hardlink",
+    "reflink",
+}
+
+
+def partial_hash(
+    path: Union[Path, str], algorithm: str = "sha256", sample_size: int = 1 << 16
+) -> str:
+    hasher = hashlib.new(algorithm)
+
+    with open(path, mode="rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+
+        hasher.update(size.to_bytes(8, "little"))
+        hasher.update(f.read(sample_size))
+
+        if size > sample_size:
+            f.seek(max(sample_size, size - sample_size))
+            hasher.update(f.read(sample_size))
+
+    profiling.count("files_partially_hashed")
+
+    return hasher.hexdigest()
+
+
+def _group_by(
+    items: Iterable[Dict[str, Any]],
+    key: Callable[[Dict[str, Any]], Any],
+    jobs: int = 1,
+) -> List[List[Dict[str, Any]]]:
+    items = list(items)
+
+    if jobs > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            keys = list(executor.map(key, items))
+    else:
+        keys = [key(item) for item in items]
+
+    groups = dict()
+
+    for item, item_key in zip(items, keys):
+        groups.setdefault(item_key, list()).append(item)
+
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_duplicates(
+    root_folder: Union[Path, str],
+    manifest: Optional[Dict[str, Any]] = None,
+    algorithm: str = "sha256",
+    jobs: Optional[int] = None,
+    min_size: int = 1,
+    excluded_names: Tuple[str, ...] = ("manifest.json", "meta.json"),
+    sample_size: int = 1 << 16,
+) -> List[Dict[str, Any]]:
+    root_folder = os.fspath(root_folder)
+    jobs = min(32, (os.cpu_count() or 1) + 4) if jobs is None else max(1, jobs)
+
+    cached = dict()
+
+    if manifest is not None and manifest.get("algorithm") == algorithm:
+        cached = {entry["path"]: entry for entry in manifest["files"]}
+
+    with profiling.timer("scan"):
+        by_size = dict()
+
+        for relative_path, stat in iterate_files(
+            root_folder, excluded_names=excluded_names
+        ):
+            if stat.st_size < min_size:
+                continue
+
+            by_size.setdefault((stat.st_dev, stat.st_size), list()).append(
+                {
+                    "path": relative_path,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "inode": (stat.st_dev, stat.st_ino),
+                }
+            )
+
+    candidates = list()
+
+    for group in by_size.values():
+        # Paths that are already links of one inode need to be hashed only once
+        inodes = dict()
+
+        for entry in group:
+            inodes.setdefault(entry["inode"], list()).append(entry)
+
+        if len(inodes) > 1:
+            candidates.append(list(inodes.values()))
+
+    profiling.count("size_candidates", sum(len(x) for x in candidates))
+
+    def get_cached_hash(inode_group: List[Dict[str, Any]]) -> Optional[str]:
+        for entry in inode_group:
+            cached_entry = cached.get(entry["path"])
+
+            if (
+                cached_entry is not None
+                and cached_entry["size"] == entry["size"]
+                and cached_entry["mtime_ns"] == entry["mtime_ns"]
+            ):
+                return cached_entry["hash"]
+
+        return None
+
+    def get_full_hash(inode_group: List[Dict[str, Any]]) -> str:
+        cached_hash = get_cached_hash(inode_group)
+
+        if cached_hash is not None:
+            profiling.count("files_reused")
+
+            return cached_hash
+
+        return hash_file(
+            os.path.join(root_folder, inode_group[0]["path"]), algorithm=algorithm
+        )
+
+    def get_partial_hash(inode_group: List[Dict[str, Any]]) -> str:
+        return partial_hash(
+            os.path.join(root_folder, inode_group[0]["path"]),
+            algorithm=algorithm,
+            sample_size=sample_size,
+        )
+
+    with profiling.timer("partial_hash"):
+        partial_groups = list()
+
+        for candidate in candidates:
+            # Small files and fully cached groups skip straight to the full hash
+            if candidate[0][0]["size"] <= 2 * sample_size or all(
+                get_cached_hash(x) is not None for x in candidate
+            ):
+                partial_groups.append(candidate)
+            else:
+                partial_groups.extend(
+                    _group_by(candidate, get_partial_hash, jobs=jobs)
+                )
+
+    profiling.count("partial_candidates", sum(len(x) for x in partial_groups))
+
+    to_return = list()
+
+    with profiling.timer("full_hash"):
+        hashes = dict()
+
+        def remember_full_hash(inode_group: List[Dict[str, Any]]) -> str:
+            full_hash = get_full_hash(inode_group)
+
+            for entry in inode_group:
+                hashes[entry["path"]] = full_hash
+
+            return full_hash
+
+        for partial_group in partial_groups:
+            for full_group in _group_by(partial_group, remember_full_hash, jobs=jobs):
+                full_group.sort(key=lambda x: (-len(x), x[0]["mtime_ns"], x[0]["path"]))
+                keep, *duplicates = [entry for x in full_group for entry in x]
+
+                to_return.append(
+                    {
+                        "hash": hashes[keep["path"]],
+                        "size": keep["size"],
+                        "keep": keep,
+                        "duplicates": [
+                            entry
+                            for entry in duplicates
+                            if entry["inode"] != keep["inode"]
+                        ],
+                    }
+                )
+
+    to_return.sort(
+        key=lambda x: x["size"] * len(x["duplicates"]),
+        reverse=True,
+    )
+
+    return to_return
+
+
+def _replace_with_hardlink(source: str, target: str):
+    # os.link won't overwrite, so a taken name is just retried instead of raced
+    for _ in range(tempfile.TMP_MAX):
+        temporary_path = os.path.join(
+            os.path.dirname(target),
+            f".{os.path.basename(target)}.{secrets.token_hex(4)}",
+        )
+
+        try:
+            os.link(source, temporary_path)
+            break
+        except FileExistsError:
+            continue
+    else:
+        raise FileExistsError(f"No free temporary name to link {target} through")
+
+    try:
+        os.replace(temporary_path, target)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def _replace_with_reflink(source: str, target: str):
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}."
+    )
+
+    try:
+        with open(source, mode="rb") as source_file:
+            fcntl.ioctl(file_descriptor, FICLONE, source_file.fileno())
+
+        os.close(file_descriptor)
+        file_descriptor = None
+
+        shutil.copystat(target, temporary_path)
+        os.replace(temporary_path, target)
+    except BaseException:
+        if file_descriptor is not None:
+            os.close(file_descriptor)
+
+        os.unlink(temporary_path)
+        raise
+
+
+def link_duplicates(
+    root_folder: Union[Path, str],
+    duplicates: List[Dict[str, Any]],
+    mode: str = "hardlink",
+) -> Dict[str, Any]:
+    if mode not in _LINK_MODES:
+        modes = list(sorted(_LINK_MODES))
+        error_string = ", ".join((f"`{x}`" for x in modes[:-1])) + f" or {modes[-1]}"
+
+        raise KeyError(f"Dedup mode must be one of: {error_string}")
+
+    replace = _replace_with_hardlink if mode == "hardlink" else _replace_with_reflink
+    root_folder = os.fspath(root_folder)
+
+    linked = list()
+    failed = dict()
+    bytes_saved = 0
+    freed_inodes = set()
+
+    with profiling.timer("link"):
+        for group in duplicates:
+            keep = group["keep"]
+            source = os.path.join(root_folder, keep["path"])
+
+            # Linking to a source edited since hashing would spread its new content
+            try:
+                stat = os.stat(source, follow_symlinks=False)
+
+                if (stat.st_size, stat.st_mtime_ns, (stat.st_dev, stat.st_ino)) != (
+                    keep["size"],
+                    keep["mtime_ns"],
+                    tuple(keep["inode"]),
+                ):
+                    raise RuntimeError(f"{keep['path']} changed since it was hashed")
+            except (OSError, RuntimeError) as e:
+                for entry in group["duplicates"]:
+                    failed[entry["path"]] = str(e)
+
+                continue
+
+            for entry in group["duplicates"]:
+                target = os.path.join(root_folder, entry["path"])
+
+                try:
+                    stat = os.stat(target, follow_symlinks=False)
+
+                    if (stat.st_size, stat.st_mtime_ns) != (
+                        entry["size"],
+                        entry["mtime_ns"],
+                    ):
+                        raise RuntimeError("file changed since it was hashed")
+
+                    replace(source, target)
+                except (OSError, RuntimeError) as e:
+                    failed[entry["path"]] = str(e)
+                    continue
+
+                linked.append(entry["path"])
+
+                # Paths sharing an inode share its blocks, they're only freed once
+                if entry["inode"] not in freed_inodes:
+                    freed_inodes.add(entry["inode"])
+                    bytes_saved += entry["size"]
+
+    profiling.count("files_linked", len(linked))
+    profiling.count("bytes_saved", bytes_saved)
+
+    return {"linked": linked, "failed": failed, "bytes_saved": bytes_saved}
+
+
+def refresh_manifest(
+    root_folder: Union[Path, str],
+    manifest: Dict[str, Any],
+    duplicates: List[Dict[str, Any]],
+    path: Union[Path, str],
+):
+    hashes = {
+        entry["path"]: group["hash"]
+        for group in duplicates
+        for entry in [group["keep"]] + group["duplicates"]
+    }
+    changed = False
+
+    for entry in manifest["files"]:
+        if entry["path"] not in hashes:
+            continue
+
+        try:
+            stat = os.stat(os.path.join(root_folder, entry["path"]))
+        except OSError:
+            continue
+
+        if stat.st_size == entry["size"] and stat.st_mtime_ns != entry["mtime_ns"]:
+            entry["mtime_ns"] = stat.st_mtime_ns
+            entry["hash"] = hashes[entry["path"]]
+            changed = True
+
+    if changed:
+        save_manifest(manifest, path)
+
+
+def deduplicate(
+    root_folder: Union[Path, str],
+    mode: Optional[str] = "hardlink",
+    manifest_file_name: Optional[str] = "manifest.json",
+    **kwargs,
+) -> Dict[str, Any]:
+    manifest_path = None
+    manifest = None
+
+    if manifest_file_name is not None:
+        manifest_path = Path(root_folder) / manifest_file_name
+        manifest = load_manifest(manifest_path)
+
+    duplicates = find_duplicates(root_folder, manifest=manifest, **kwargs)
+
+    to_return = {
+        "groups": duplicates,
+        "reclaimable_bytes": sum(x["size"] * len(x["duplicates"]) for x in duplicates),
+    }
+
+    if mode is not None:
+        to_return.update(link_duplicates(root_folder, duplicates, mode=mode))
+
+        if manifest is not None:
+            refresh_manifest(root_folder, manifest, duplicates, manifest_path)
+
+    return to_return
+
+
+def render_report(result: Dict[str, Any]) -> str:
+    to_return = ""
+
+    for group in result["groups"]:
+        if len(group["duplicates"]) == 0:
+            continue
+
+        to_return += f"{group['hash'][:16]}  {group['size']} B\n"
+        to_return += f"\tkeep {group['keep']['path']}\n"
+
+        for entry in group["duplicates"]:
+            to_return += f"\tlink {entry['path']}\n"
+
+    to_return += (
+        f"{sum(len(x['duplicates']) for x in result['groups'])} duplicates, "
+        f"{result['reclaimable_bytes']} B reclaimable\n"
+    )
+
+    if "linked" in result:
+        to_return += (
+            f"{len(result['linked'])} files linked, "
+            f"{result['bytes_saved']} B saved\n"
+        )
+
+        for path, reason in result["failed"].items():
+            to_return += f"failed {path}: {reason}\n"
+
+    return to_return
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Tuple, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.catalog import CATALOG_MAGIC, Catalog, load_metas
+from studosi.materijali.curriculum import (
+    ViewKey,
+    get_known_view_keys,
+    get_row_view_keys,
+)
+from studosi.materijali.exceptions import AbbreviationCollision
+from studosi.materijali.subject import SubjectMeta
+
+CHANGE_SET_VERSION = 1
+SNAPSHOT_VERSION = 1
+
+_COMPARED_KEYS = (
+    SubjectMeta._default_name_key,
+    SubjectMeta._default_properties_key,
+    SubjectMeta._default_links_key,
+    SubjectMeta._default_related_subjects_key,
+)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(key): _normalize(inner) for key, inner in value.items()}
+
+    if isinstance(value, (set, frozenset)):
+        return sorted(_normalize(x) for x in value)
+
+    if isinstance(value, (list, tuple)):
+        return [_normalize(x) for x in value]
+
+    return value
+
+
+def hash_config(config: Dict[str, Any]) -> str:
+    dumped = json.dumps(
+        _normalize(config), ensure_ascii=False, separators=(",", ":"), sort_keys=True
+    )
+
+    return hashlib.sha256(dumped.encode("utf8")).hexdigest()
+
+
+def get_subject_key(folder: str, meta: SubjectMeta) -> str:
+    return folder if meta.abbreviation is None else str(meta.abbreviation)
+
+
+def key_metas(
+    metas: Iterable[Tuple[str, SubjectMeta]]
+) -> Dict[str, Tuple[Optional[str], SubjectMeta]]:
+    to_return = dict()
+    folders = dict()
+
+    for folder, meta in metas:
+        key = get_subject_key(folder, meta)
+
+        # Two folders with one abbreviation would silently drop a subject
+        if key in to_return:
+            raise AbbreviationCollision(key, folders=(folders[key], folder))
+
+        to_return[key] = (None, meta)
+        folders[key] = folder
+
+    return to_return
+
+
+def load_source(
+    source: Union[Path, str]
+) -> Dict[str, Tuple[Optional[str], SubjectMeta]]:
+    if os.path.isdir(source):
+        return key_metas(load_metas(source).items())
+
+    with open(source, mode="rb") as f:
+        is_catalog = f.read(len(CATALOG_MAGIC)) == CATALOG_MAGIC
+
+    if is_catalog:
+        with Catalog.open(source) as catalog:
+            return key_metas(catalog.items())
+
+    with open(source, mode="r", encoding="utf8") as f:
+        loaded = json.load(f)
+
+    # Snapshots carry precomputed hashes, plain JSON catalogs are just configs
+    if loaded.get("version") == SNAPSHOT_VERSION and "subjects" in loaded:
+        return {
+            key: (
+                subject["hash"],
+                SubjectMeta(config=subject["config"], copy_config=False),
+            )
+            for key, subject in loaded["subjects"].items()
+        }
+
+    return key_metas(
+        (folder, SubjectMeta(config=config, copy_config=False))
+        for folder, config in loaded.items()
+    )
+
+
+def _get_hash(entry: Tuple[Optional[str], SubjectMeta]) -> str:
+    subject_hash, meta = entry
+
+    return hash_config(meta.config) if subject_hash is None else subject_hash
+
+
+def save_snapshot(source: Union[Path, str], path: Union[Path, str]):
+    subjects = load_source(source)
+
+    with open(path, mode="w+", encoding="utf8") as f:
+        json.dump(
+            {
+                "version": SNAPSHOT_VERSION,
+                "subjects": {
+                    key: {
+                        "hash": _get_hash(entry),
+                        "config": _normalize(entry[1].config),
+                    }
+                    for key, entry in sorted(subjects.items())
+                },
+            },
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        f.write("\n")
+
+
+def _diff_tables(
+    old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    old = dict() if old is None else old
+    new = dict() if new is None else new
+
+    return {
+        "added": {key: new[key] for key in new if key not in old},
+        "removed": [key for key in old if key not in new],
+        "changed": {
+            key: {"old": old[key], "new": new[key]}
+            for key in new
+            if key in old and _normalize(old[key]) != _normalize(new[key])
+        },
+    }
+
+
+def diff_subject(old: SubjectMeta, new: SubjectMeta) -> Dict[str, Any]:
+    to_return = dict()
+
+    if old.name != new.name:
+        to_return["name"] = {"old": old.name, "new": new.name}
+
+    old_rows = set(old.iter_property_rows())
+    new_rows = set(new.iter_property_rows())
+
+    if old_rows != new_rows:
+        to_return["properties"] = {
+            "added": [list(x) for x in sorted(new_rows - old_rows)],
+            "removed": [list(x) for x in sorted(old_rows - new_rows)],
+        }
+
+    for key in (
+        SubjectMeta._default_links_key,
+        SubjectMeta._default_related_subjects_key,
+    ):
+        table_diff = _diff_tables(old.config.get(key), new.config.get(key))
+
+        if any(len(x) != 0 for x in table_diff.values()):
+            to_return[key] = table_diff
+
+    old_config = old.config
+    new_config = new.config
+    other_keys = [
+        key
+        for key in dict.fromkeys(list(old_config) + list(new_config))
+        if key not in _COMPARED_KEYS
+        and key != SubjectMeta._default_abbreviation_key
+        and _normalize(old_config.get(key)) != _normalize(new_config.get(key))
+    ]
+
+    for key in other_keys:
+        to_return[key] = {"old": old_config.get(key), "new": new_config.get(key)}
+
+    return to_return
+
+
+def _get_known_view_keys(
+    catalog: Dict[str, Tuple[Optional[str], SubjectMeta]]
+) -> Set[ViewKey]:
+    return get_known_view_keys(
+        row for _, meta in catalog.values() for row in meta.iter_property_rows()
+    )
+
+
+def _get_view_keys(meta: SubjectMeta, known_keys: Set[ViewKey]) -> Set[ViewKey]:
+    to_return = set()
+
+    for row in meta.iter_property_rows():
+        to_return |= get_row_view_keys(row, known_keys)
+
+    return to_return
+
+
+def diff_catalogs(
+    old: Dict[str, Tuple[Optional[str], SubjectMeta]],
+    new: Dict[str, Tuple[Optional[str], SubjectMeta]],
+) -> Dict[str, Any]:
+    added = dict()
+    removed = list()
+    modified = dict()
+    unchanged = 0
+    affected_views = set()
+
+    with profiling.timer("diff"):
+        old_keys = _get_known_view_keys(old)
+        new_keys = _get_known_view_keys(new)
+
+        for key in sorted(set(old) | set(new)):
+            if key not in old:
+                added[key] = _normalize(new[key][1].config)
+                affected_views.update(_get_view_keys(new[key][1], new_keys))
+                continue
+
+            if key not in new:
+                removed.append(key)
+                affected_views.update(_get_view_keys(old[key][1], old_keys))
+                continue
+
+            if _get_hash(old[key]) == _get_hash(new[key]):
+                unchanged += 1
+                continue
+
+            changes = diff_subject(old[key][1], new[key][1])
+
+            # Equal content can hash differently, e.g. keys in another order
+            if len(changes) == 0:
+                unchanged += 1
+                continue
+
+            modified[key] = {
+                "config": _normalize(new[key][1].config),
+                "changes": changes,
+            }
+
+            if "properties" in changes or "name" in changes:
+                affected_views.update(_get_view_keys(old[key][1], old_keys))
+                affected_views.update(_get_view_keys(new[key][1], new_keys))
+
+    profiling.count("subjects_added", len(added))
+    profiling.count("subjects_removed", len(removed))
+    profiling.count("subjects_modified", len(modified))
+    profiling.count("subjects_unchanged", unchanged)
+
+    return {
+        "version": CHANGE_SET_VERSION,
+        "added": added,
+        "removed": removed,
+        "modified": modified,
+        "unchanged": unchanged,
+        "affected_views": [list(x) for x in sorted(affected_views)],
+    }
+
+
+def render_change_set(change_set: Dict[str, Any]) -> str:
+    to_return = ""
+
+    for key in change_set["added"]:
+        to_return += f"+ {key}\n"
+
+    for key in change_set["removed"]:
+        to_return += f"- {key}\n"
+
+    for key, modification in change_set["modified"].items():
+        to_return += f"~ {key}\n"
+
+        for field, change in modification["changes"].items():
+            if field == SubjectMeta._default_properties_key:
+                for row in change["added"]:
+                    to_return += f"\tproperties + {'/'.join(row)}\n"
+
+                for row in change["removed"]:
+                    to_return += f"\tproperties - {'/'.join(row)}\n"
+            elif field in (
+                SubjectMeta._default_links_key,
+                SubjectMeta._default_related_subjects_key,
+            ):
+                for identifier in change["added"]:
+                    to_return += f"\t{field} + {identifier}\n"
+
+                for identifier in change["removed"]:
+                    to_return += f"\t{field} - {identifier}\n"
+
+                for identifier in change["changed"]:
+                    to_return += f"\t{field} ~ {identifier}\n"
+            else:
+                to_return += f"\t{field}: {change['old']!r} -> {change['new']!r}\n"
+
+    to_return += (
+        f"{len(change_set['added'])} added, {len(change_set['removed'])} removed, "
+        f"{len(change_set['modified'])} modified, "
+        f"{change_set['unchanged']} unchanged\n"
+    )
+
+    return to_return
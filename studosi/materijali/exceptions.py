@@ -1,11 +1,31 @@
-from typing import Optional
+from typing import Any, Optional, Sequence
 
 
 class AbbreviationCollision(Exception):
-    def __init__(self, subject_name: Optional[str] = None):
+    def __init__(
+        self, subject_name: Optional[str] = None, folders: Sequence[str] = ()
+    ):
         message = "Collision during abbreviation resolution"
 
         if subject_name is not None:
             message += f" for subject `{subject_name}`"
 
+        if len(folders) != 0:
+            message += " between folders " + " and ".join(f"`{x}`" for x in folders)
+
         super().__init__(message)
+
+
+class CatalogFormatError(Exception):
+    pass
+
+
+class MergeConflict(Exception):
+    def __init__(self, path: Sequence[str], values: Sequence[Any]):
+        self.path = list(path)
+        self.values = list(values)
+
+        super().__init__(
+            f"Conflicting values for `{'.'.join(self.path)}`: "
+            + ", ".join(repr(x) for x in self.values)
+        )
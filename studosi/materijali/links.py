@@ -0,0 +1,388 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+import ssl
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin, urlsplit
+
+from studosi.materijali import profiling
+from studosi.materijali.subject import SubjectMeta
+
+USER_AGENT = "studosi-link-checker/1.0"
+
+# Servers that don't implement HEAD properly tend to answer with one of these
+_GET_FALLBACK_STATUSES = {
+    400,
+    403,
+    404,
+    405,
+    406,
+    500,
+    501,
+}
+
+HostKey = Tuple[str, str, int]
+
+
+def collect_links(
+    metas: Dict[str, SubjectMeta]
+) -> Dict[str, List[Tuple[str, str]]]:
+    to_return = dict()
+
+    for key, meta in sorted(metas.items()):
+        for identifier, link in (meta.links or dict()).items():
+            url = link.get("url") if isinstance(link, dict) else None
+
+            if url is None or len(str(url).strip()) == 0:
+                continue
+
+            to_return.setdefault(str(url).strip(), list()).append((key, identifier))
+
+    profiling.count("links_found", sum(len(x) for x in to_return.values()))
+    profiling.count("links_unique", len(to_return))
+
+    return to_return
+
+
+def _get_host_key(url: str) -> HostKey:
+    parts = urlsplit(url)
+
+    if parts.scheme not in ("http", "https") or parts.hostname is None:
+        raise ValueError(f"Only absolute http and https URLs can be checked: {url}")
+
+    return (
+        parts.scheme,
+        parts.hostname,
+        parts.port or (443 if parts.scheme == "https" else 80),
+    )
+
+
+class _HostPool:
+    def __init__(self, host_key: HostKey, limit: int):
+        self.host_key = host_key
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = list()
+
+    async def connect(
+        self, ssl_context: ssl.SSLContext
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        while len(self.idle) != 0:
+            reader, writer = self.idle.pop()
+
+            if not writer.is_closing() and not reader.at_eof():
+                profiling.count("connections_reused")
+
+                return reader, writer, True
+
+            writer.close()
+
+        scheme, host, port = self.host_key
+        reader, writer = await asyncio.open_connection(
+            host,
+            port,
+            ssl=ssl_context if scheme == "https" else None,
+            server_hostname=host if scheme == "https" else None,
+        )
+        profiling.count("connections_opened")
+
+        return reader, writer, False
+
+    def release(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.idle.append((reader, writer))
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+
+        self.idle.clear()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    status_line = await reader.readline()
+
+    if len(status_line) == 0:
+        raise ConnectionResetError("Connection closed before a response")
+
+    parts = status_line.decode("latin1").split(None, 2)
+
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ValueError(f"Malformed status line: {status_line!r}")
+
+    headers = dict()
+
+    while True:
+        line = await reader.readline()
+
+        if line in (b"\r\n", b"\n", b""):
+            break
+
+        name, _, value = line.decode("latin1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    return int(parts[1]), headers
+
+
+class LinkChecker:
+    def __init__(
+        self,
+        concurrency: int = 64,
+        per_host: int = 4,
+        timeout: float = 10.0,
+        max_redirects: int = 5,
+        verify_tls: bool = True,
+    ):
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.per_host = max(1, per_host)
+
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._pools: Dict[HostKey, _HostPool] = dict()
+        self._ssl_context = ssl.create_default_context()
+
+        if not verify_tls:
+            self._ssl_context.check_hostname = False
+            self._ssl_context.verify_mode = ssl.CERT_NONE
+
+    def _get_pool(self, host_key: HostKey) -> _HostPool:
+        pool = self._pools.get(host_key)
+
+        if pool is None:
+            pool = _HostPool(host_key, self.per_host)
+            self._pools[host_key] = pool
+
+        return pool
+
+    async def _exchange(
+        self, pool: _HostPool, method: str, url: str
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, int, Dict[str, str]]:
+        parts = urlsplit(url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        keep_alive = method == "HEAD"
+
+        # A pooled connection may have been closed by the server meanwhile
+        for attempt in range(2):
+            reader, writer, reused = await pool.connect(self._ssl_context)
+
+            try:
+                writer.write(
+                    (
+                        f"{method} {target} HTTP/1.1\r\n"
+                        f"Host: {parts.netloc}\r\n"
+                        f"User-Agent: {USER_AGENT}\r\n"
+                        "Accept: */*\r\n"
+                        "Connection: "
+                        f"{'keep-alive' if keep_alive else 'close'}\r\n"
+                        "\r\n"
+                    ).encode("latin1")
+                )
+                await writer.drain()
+                status, headers = await _read_head(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+
+                if reused and attempt == 0:
+                    continue
+
+                raise
+            except BaseException:
+                writer.close()
+                raise
+
+            return reader, writer, status, headers
+
+        raise ConnectionResetError("Connection closed before a response")
+
+    async def _request_once(
+        self, method: str, url: str
+    ) -> Tuple[int, Dict[str, str]]:
+        pool = self._get_pool(_get_host_key(url))
+
+        # Waiting for a busy host isn't the host being slow, so the clock starts later
+        async with pool.semaphore, self._semaphore:
+            reader, writer, status, headers = await asyncio.wait_for(
+                self._exchange(pool, method, url), timeout=self.timeout
+            )
+
+            if (
+                method == "HEAD"
+                and headers.get("connection", "").lower() != "close"
+                and not (100 <= status < 200)
+            ):
+                pool.release(reader, writer)
+            else:
+                writer.close()
+
+        profiling.count(f"requests_{method.lower()}")
+
+        return status, headers
+
+    async def _request(self, method: str, url: str) -> Tuple[int, str]:
+        for _ in range(self.max_redirects + 1):
+            status, headers = await self._request_once(method, url)
+
+            if status in (301, 302, 303, 307, 308) and "location" in headers:
+                url = urljoin(url, headers["location"])
+                continue
+
+            return status, url
+
+        raise ValueError(f"More than {self.max_redirects} redirects")
+
+    async def check(self, url: str) -> Dict[str, Any]:
+        to_return = {
+            "url": url,
+            "status": None,
+            "final_url": None,
+            "error": None,
+            "checked_at": time.time(),
+        }
+
+        try:
+            status, final_url = await self._request("HEAD", url)
+
+            if status in _GET_FALLBACK_STATUSES:
+                profiling.count("get_fallbacks")
+                status, final_url = await self._request("GET", url)
+
+            to_return["status"] = status
+            to_return["final_url"] = final_url
+        except asyncio.TimeoutError:
+            to_return["error"] = f"timed out after {self.timeout} s"
+        except (OSError, ValueError, ssl.SSLError) as e:
+            to_return["error"] = f"{type(e).__name__}: {e}"
+
+        to_return["ok"] = (
+            to_return["status"] is not None and 200 <= to_return["status"] < 400
+        )
+
+        return to_return
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+
+
+def _load_cache(path: Optional[Union[Path, str]]) -> Dict[str, Dict[str, Any]]:
+    if path is None or not os.path.isfile(path):
+        return dict()
+
+    with open(path, mode="r", encoding="utf8") as f:
+        return dict(json.load(f))
+
+
+def _save_cache(path: Union[Path, str], cache: Dict[str, Dict[str, Any]]):
+    path = Path(path)
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}."
+    )
+
+    try:
+        with os.fdopen(file_descriptor, mode="w", encoding="utf8") as f:
+            json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+            f.write("\n")
+
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def _is_fresh(
+    result: Optional[Dict[str, Any]], now: float, ttl: float, error_ttl: float
+) -> bool:
+    if result is None:
+        return False
+
+    return now - result.get("checked_at", 0) < (ttl if result.get("ok") else error_ttl)
+
+
+async def _check_all(urls: List[str], **kwargs) -> List[Dict[str, Any]]:
+    checker = LinkChecker(**kwargs)
+
+    try:
+        return list(await asyncio.gather(*(checker.check(url) for url in urls)))
+    finally:
+        checker.close()
+
+
+def check_links(
+    urls: List[str],
+    cache_path: Optional[Union[Path, str]] = None,
+    ttl: float = 24 * 60 * 60,
+    error_ttl: float = 60 * 60,
+    **kwargs,
+) -> Dict[str, Dict[str, Any]]:
+    cache = _load_cache(cache_path)
+    now = time.time()
+
+    to_check = [
+        url
+        for url in dict.fromkeys(urls)
+        if not _is_fresh(cache.get(url), now, ttl, error_ttl)
+    ]
+
+    profiling.count("links_cached", len(set(urls)) - len(to_check))
+
+    if len(to_check) != 0:
+        with profiling.timer("check"):
+            results = asyncio.run(_check_all(to_check, **kwargs))
+
+        for result in results:
+            cache[result["url"]] = result
+
+    if cache_path is not None:
+        _save_cache(
+            cache_path,
+            {
+                url: result
+                for url, result in cache.items()
+                if _is_fresh(result, now, ttl, error_ttl) or url in to_check
+            },
+        )
+
+    return {url: cache[url] for url in urls}
+
+
+def get_broken_links(
+    usages: Dict[str, List[Tuple[str, str]]], results: Dict[str, Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    to_return = dict()
+
+    for url, subjects in usages.items():
+        result = results[url]
+
+        if result["ok"]:
+            continue
+
+        for key, identifier in subjects:
+            to_return.setdefault(key, list()).append(
+                {
+                    "identifier": identifier,
+                    "url": url,
+                    "status": result["status"],
+                    "error": result["error"],
+                }
+            )
+
+    return dict(sorted(to_return.items()))
+
+
+def render_report(broken: Dict[str, List[Dict[str, Any]]], checked: int) -> str:
+    to_return = ""
+
+    for key, links in broken.items():
+        to_return += f"{key}\n"
+
+        for link in links:
+            reason = link["error"] if link["status"] is None else link["status"]
+            to_return += f"\t{link['identifier']}: {link['url']} ({reason})\n"
+
+    to_return += (
+        f"{sum(len(x) for x in broken.values())} broken links in "
+        f"{len(broken)} subjects, {checked} unique URLs checked\n"
+    )
+
+    return to_return
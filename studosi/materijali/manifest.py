@@ -0,0 +1,261 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.subject import SubjectMeta
+
+MANIFEST_VERSION = 1
+
+_local = threading.local()
+
+
+def iterate_files(
+    root_folder: Union[Path, str],
+    excluded_names: Tuple[str, ...] = (),
+) -> Iterator[Tuple[str, os.stat_result]]:
+    root_folder = os.fspath(root_folder)
+    stack = [""]
+
+    while len(stack) != 0:
+        relative_folder = stack.pop()
+
+        with os.scandir(os.path.join(root_folder, relative_folder)) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or entry.name in excluded_names:
+                    continue
+
+                relative_path = (
+                    entry.name
+                    if len(relative_folder) == 0
+                    else f"{relative_folder}/{entry.name}"
+                )
+
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(relative_path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield relative_path, entry.stat(follow_symlinks=False)
+
+
+def _get_buffer(chunk_size: int) -> bytearray:
+    buffer = getattr(_local, "buffer", None)
+
+    if buffer is None or len(buffer) != chunk_size:
+        buffer = bytearray(chunk_size)
+        _local.buffer = buffer
+
+    return buffer
+
+
+def hash_file(
+    path: Union[Path, str],
+    algorithm: str = "sha256",
+    chunk_size: int = 1 << 20,
+    mmap_threshold: Optional[int] = 64 << 20,
+) -> str:
+    hasher = hashlib.new(algorithm)
+
+    with open(path, mode="rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+
+        if mmap_threshold is not None and 0 < mmap_threshold <= size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+
+                try:
+                    for start in range(0, size, chunk_size):
+                        hasher.update(view[start : start + chunk_size])
+                finally:
+                    view.release()
+        else:
+            buffer = _get_buffer(chunk_size)
+            view = memoryview(buffer)
+
+            while True:
+                read = f.readinto(buffer)
+
+                if not read:
+                    break
+
+                hasher.update(view[:read])
+
+    profiling.count("files_hashed")
+    profiling.count("bytes_hashed", size)
+
+    return hasher.hexdigest()
+
+
+def get_subject_abbreviations(
+    root_folder: Union[Path, str], meta_file_name: str = "meta.json"
+) -> Dict[str, str]:
+    to_return = dict()
+
+    with os.scandir(root_folder) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False) or entry.name.startswith("."):
+                continue
+
+            abbreviation = entry.name
+            meta_path = os.path.join(entry.path, meta_file_name)
+
+            if os.path.isfile(meta_path):
+                try:
+                    with open(meta_path, mode="r", encoding="utf8") as f:
+                        meta = SubjectMeta.loads(f.read())
+
+                    if meta.abbreviation is not None:
+                        abbreviation = str(meta.abbreviation)
+                except (OSError, ValueError):
+                    pass
+
+            to_return[entry.name] = abbreviation
+
+    return to_return
+
+
+def load_manifest(path: Union[Path, str]) -> Optional[Dict[str, Any]]:
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, mode="r", encoding="utf8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+
+    return manifest
+
+
+def build_manifest(
+    root_folder: Union[Path, str],
+    previous: Optional[Dict[str, Any]] = None,
+    algorithm: str = "sha256",
+    jobs: Optional[int] = None,
+    meta_file_name: str = "meta.json",
+    excluded_names: Tuple[str, ...] = ("manifest.json",),
+    chunk_size: int = 1 << 20,
+    mmap_threshold: Optional[int] = 64 << 20,
+) -> Dict[str, Any]:
+    jobs = min(32, (os.cpu_count() or 1) + 4) if jobs is None else max(1, jobs)
+
+    previous_files = dict()
+
+    if previous is not None and previous.get("algorithm") == algorithm:
+        previous_files = {entry["path"]: entry for entry in previous["files"]}
+
+    with profiling.timer("scan"):
+        abbreviations = get_subject_abbreviations(
+            root_folder, meta_file_name=meta_file_name
+        )
+        scanned = list(iterate_files(root_folder, excluded_names=excluded_names))
+
+    files: List[Dict[str, Any]] = list()
+    to_hash: List[Dict[str, Any]] = list()
+
+    for relative_path, stat in scanned:
+        folder_name = relative_path.split("/", 1)[0]
+        entry = {
+            "path": relative_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": None,
+            "subject": abbreviations.get(folder_name) if "/" in relative_path else None,
+        }
+        previous_entry = previous_files.get(relative_path)
+
+        if (
+            previous_entry is not None
+            and previous_entry["size"] == entry["size"]
+            and previous_entry["mtime_ns"] == entry["mtime_ns"]
+        ):
+            entry["hash"] = previous_entry["hash"]
+            profiling.count("files_reused")
+        else:
+            to_hash.append(entry)
+
+        files.append(entry)
+
+    def hash_entry(entry: Dict[str, Any]):
+        entry["hash"] = hash_file(
+            os.path.join(root_folder, entry["path"]),
+            algorithm=algorithm,
+            chunk_size=chunk_size,
+            mmap_threshold=mmap_threshold,
+        )
+
+    with profiling.timer("hash"):
+        # Largest files first so a big file doesn't end up alone in the last batch
+        to_hash.sort(key=lambda x: x["size"], reverse=True)
+
+        if jobs == 1 or len(to_hash) < 2:
+            for entry in to_hash:
+                hash_entry(entry)
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                for _ in executor.map(hash_entry, to_hash):
+                    pass
+
+    files.sort(key=lambda x: x["path"])
+
+    return {
+        "version": MANIFEST_VERSION,
+        "algorithm": algorithm,
+        "files": files,
+    }
+
+
+def dumps_manifest(manifest: Dict[str, Any]) -> str:
+    return (
+        json.dumps(
+            manifest,
+            ensure_ascii=False,
+            indent=None,
+            separators=(",", ":"),
+            sort_keys=False,
+        )
+        + "\n"
+    )
+
+
+def save_manifest(manifest: Dict[str, Any], path: Union[Path, str]):
+    path = Path(path)
+    dumped = dumps_manifest(manifest)
+
+    with profiling.timer("write"):
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}."
+        )
+
+        try:
+            with os.fdopen(file_descriptor, mode="w", encoding="utf8") as f:
+                profiling.count("bytes_written", f.write(dumped))
+
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+
+def update_manifest(
+    root_folder: Union[Path, str],
+    file_name: str = "manifest.json",
+    full: bool = False,
+    save: bool = True,
+    **kwargs,
+) -> Dict[str, Any]:
+    manifest_path = Path(root_folder) / file_name
+    previous = None if full else load_manifest(manifest_path)
+
+    kwargs.setdefault("excluded_names", (file_name,))
+    manifest = build_manifest(root_folder, previous=previous, **kwargs)
+
+    if save and (previous is None or previous.get("files") != manifest["files"]):
+        save_manifest(manifest, manifest_path)
+
+    return manifest
@@ -0,0 +1,212 @@
+import hashlib
+import os
+from pathlib import Path
+import re
+import tempfile
+from typing import Any, Dict, List, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.subject import SubjectMeta
+
+CATALOG_FILE_NAME = "catalog.php"
+INDEX_FILE_NAME = "index.php"
+PRELOAD_FILE_NAME = "preload.php"
+SUBJECTS_FOLDER_NAME = "subjects"
+
+_UNSAFE_FILE_NAME_REGEX = re.compile(r"[^A-Za-z0-9_.-]")
+
+_MODES = {
+    "catalog",
+    "subjects",
+    "both",
+}
+
+
+def quote_php_string(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def render_php_value(value: Any, indent: int = 0) -> str:
+    if value is None:
+        return "null"
+
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    if isinstance(value, (int, float)):
+        return repr(value)
+
+    if isinstance(value, str):
+        return quote_php_string(value)
+
+    if isinstance(value, (set, frozenset)):
+        value = sorted(value)
+
+    padding = "    " * (indent + 1)
+
+    if isinstance(value, dict):
+        if len(value) == 0:
+            return "[]"
+
+        items = (
+            f"{padding}{quote_php_string(str(key))} => "
+            f"{render_php_value(inner, indent=indent + 1)},\n"
+            for key, inner in value.items()
+        )
+    elif isinstance(value, (list, tuple)):
+        if len(value) == 0:
+            return "[]"
+
+        items = (
+            f"{padding}{render_php_value(inner, indent=indent + 1)},\n"
+            for inner in value
+        )
+    else:
+        raise TypeError(f"Can't render {type(value).__name__} as a PHP value")
+
+    return "[\n" + "".join(items) + "    " * indent + "]"
+
+
+def render_php_file(value: Any) -> str:
+    to_return = ""
+    to_return += "<?php\n\n"
+    to_return += "// Generated by studosi, don't edit\n\n"
+    to_return += "declare(strict_types=1);\n\n"
+    to_return += f"return {render_php_value(value)};\n"
+
+    return to_return
+
+
+def get_subject_file_name(key: str) -> str:
+    safe_key = _UNSAFE_FILE_NAME_REGEX.sub("_", key)
+
+    # Keys that had to be changed get a hash so they can't collide
+    if safe_key != key or safe_key.startswith("."):
+        safe_key += "-" + hashlib.sha256(key.encode("utf8")).hexdigest()[:8]
+
+    return f"{safe_key}.php"
+
+
+def render_preload(file_names: List[str]) -> str:
+    to_return = ""
+    to_return += "<?php\n\n"
+    to_return += "// Generated by studosi, don't edit\n\n"
+    to_return += "declare(strict_types=1);\n\n"
+    to_return += "foreach ([\n"
+
+    for file_name in file_names:
+        to_return += f"    {quote_php_string(file_name)},\n"
+
+    to_return += "] as $file) {\n"
+    to_return += "    opcache_compile_file(__DIR__ . '/' . $file);\n"
+    to_return += "}\n"
+
+    return to_return
+
+
+def _write_if_changed(path: Path, content: str) -> bool:
+    encoded = content.encode("utf8")
+
+    try:
+        with open(path, mode="rb") as f:
+            if f.read() == encoded:
+                return False
+    except FileNotFoundError:
+        pass
+
+    # OPcache may read the file at any moment, so it's swapped in atomically
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}."
+    )
+
+    try:
+        with os.fdopen(file_descriptor, mode="wb") as f:
+            f.write(encoded)
+
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+    profiling.count("bytes_written", len(encoded))
+
+    return True
+
+
+def export_php(
+    metas: Dict[str, SubjectMeta],
+    output_folder: Union[Path, str],
+    mode: str = "both",
+    preload: bool = True,
+) -> Dict[str, Any]:
+    if mode not in _MODES:
+        modes = list(sorted(_MODES))
+        error_string = ", ".join((f"`{x}`" for x in modes[:-1])) + f" or {modes[-1]}"
+
+        raise KeyError(f"PHP export mode must be one of: {error_string}")
+
+    output_folder = Path(output_folder)
+    subjects_folder = output_folder / SUBJECTS_FOLDER_NAME
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    files: Dict[str, str] = dict()
+
+    with profiling.timer("render"):
+        configs = {key: metas[key].config for key in sorted(metas)}
+
+        if mode in ("catalog", "both"):
+            files[CATALOG_FILE_NAME] = render_php_file(configs)
+
+        if mode in ("subjects", "both"):
+            subject_files = {
+                key: f"{SUBJECTS_FOLDER_NAME}/{get_subject_file_name(key)}"
+                for key in configs
+            }
+
+            files[INDEX_FILE_NAME] = render_php_file(subject_files)
+
+            for key, config in configs.items():
+                files[subject_files[key]] = render_php_file(config)
+
+        if preload:
+            files[PRELOAD_FILE_NAME] = render_preload(list(files))
+
+    written = list()
+
+    with profiling.timer("write"):
+        if mode in ("subjects", "both"):
+            subjects_folder.mkdir(exist_ok=True)
+
+        for relative_path, content in files.items():
+            if _write_if_changed(output_folder / relative_path, content):
+                written.append(relative_path)
+
+    removed = list()
+    stale = [
+        x
+        for x in (CATALOG_FILE_NAME, INDEX_FILE_NAME, PRELOAD_FILE_NAME)
+        if x not in files and (output_folder / x).is_file()
+    ]
+
+    if subjects_folder.is_dir():
+        with os.scandir(subjects_folder) as entries:
+            stale.extend(
+                f"{SUBJECTS_FOLDER_NAME}/{entry.name}"
+                for entry in entries
+                if entry.name.endswith(".php")
+                and f"{SUBJECTS_FOLDER_NAME}/{entry.name}" not in files
+            )
+
+    for relative_path in sorted(stale):
+        os.unlink(output_folder / relative_path)
+        removed.append(relative_path)
+
+    profiling.count("php_files_written", len(written))
+    profiling.count("php_files_unchanged", len(files) - len(written))
+
+    return {
+        "written": written,
+        "unchanged": len(files) - len(written),
+        "removed": removed,
+    }
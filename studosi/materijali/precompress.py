@@ -0,0 +1,224 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.manifest import iterate_files
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    ".json",
+    ".txt",
+    ".md",
+    ".html",
+    ".htm",
+    ".css",
+    ".js",
+    ".svg",
+    ".xml",
+    ".csv",
+    ".tex",
+    ".ps",
+    ".eps",
+)
+
+_FORMATS = {
+    "gz",
+    "br",
+}
+
+STATE_FILE_NAME = ".precompressed.json"
+
+
+def get_available_formats() -> Tuple[str, ...]:
+    return ("gz", "br") if brotli is not None else ("gz",)
+
+
+def check_format(file_format: str):
+    if file_format not in _FORMATS:
+        formats = list(sorted(_FORMATS))
+        error_string = (
+            ", ".join((f"`{x}`" for x in formats[:-1])) + f" or {formats[-1]}"
+        )
+
+        raise KeyError(f"Precompression format must be one of: {error_string}")
+
+    if file_format == "br" and brotli is None:
+        raise ImportError(
+            "Brotli precompression requires the brotli package, install it with "
+            "`pip install brotli`"
+        )
+
+
+def compress(
+    data: bytes, file_format: str = "gz", level: Optional[int] = None
+) -> bytes:
+    check_format(file_format)
+
+    if file_format == "gz":
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+
+    return brotli.compress(
+        data,
+        mode=brotli.MODE_TEXT,
+        quality=11 if level is None else level,
+    )
+
+
+def _is_up_to_date(sibling_path: str, source_stat: os.stat_result) -> bool:
+    try:
+        return os.stat(sibling_path).st_mtime_ns == source_stat.st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _write_sibling(sibling_path: str, data: bytes, source_stat: os.stat_result):
+    folder, name = os.path.split(sibling_path)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=folder, prefix=f".{name}.")
+
+    try:
+        with os.fdopen(file_descriptor, mode="wb") as f:
+            f.write(data)
+
+        os.chmod(temporary_path, source_stat.st_mode & 0o7777)
+        os.utime(
+            temporary_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns)
+        )
+        os.replace(temporary_path, sibling_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def precompress_file(
+    path: str,
+    source_stat: os.stat_result,
+    formats: Iterable[str] = ("gz",),
+    level: Optional[int] = None,
+    max_ratio: float = 0.95,
+    dry_run: bool = False,
+) -> Dict[str, str]:
+    to_return = dict()
+    data = None
+
+    for file_format in formats:
+        sibling_path = f"{path}.{file_format}"
+
+        if _is_up_to_date(sibling_path, source_stat):
+            to_return[file_format] = "fresh"
+            continue
+
+        if data is None:
+            with open(path, mode="rb") as f:
+                data = f.read()
+
+        compressed = compress(data, file_format=file_format, level=level)
+        profiling.count(f"{file_format}_bytes_in", len(data))
+
+        # Siblings that don't save enough would only cost nginx a stat
+        if len(compressed) > max_ratio * len(data):
+            if os.path.exists(sibling_path) and not dry_run:
+                os.unlink(sibling_path)
+
+            to_return[file_format] = "skipped"
+            continue
+
+        if not dry_run:
+            _write_sibling(sibling_path, compressed, source_stat)
+
+        profiling.count(f"{file_format}_bytes_out", len(compressed))
+        to_return[file_format] = "written"
+
+    return to_return
+
+
+def _load_state(path: Path) -> List[str]:
+    if not os.path.isfile(path):
+        return list()
+
+    with open(path, mode="r", encoding="utf8") as f:
+        return list(json.load(f).get("siblings", list()))
+
+
+def _save_state(path: Path, siblings: List[str]):
+    with open(path, mode="w+", encoding="utf8") as f:
+        json.dump({"siblings": sorted(siblings)}, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def precompress(
+    root_folder: Union[Path, str],
+    formats: Optional[Iterable[str]] = None,
+    level: Optional[int] = None,
+    jobs: Optional[int] = None,
+    min_size: int = 256,
+    extensions: Tuple[str, ...] = COMPRESSIBLE_EXTENSIONS,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    root_folder = os.fspath(root_folder)
+    formats = get_available_formats() if formats is None else tuple(formats)
+    jobs = min(32, (os.cpu_count() or 1) + 4) if jobs is None else max(1, jobs)
+    state_path = Path(root_folder) / STATE_FILE_NAME
+
+    for file_format in formats:
+        check_format(file_format)
+
+    with profiling.timer("scan"):
+        sources = [
+            (relative_path, stat)
+            for relative_path, stat in iterate_files(root_folder)
+            if relative_path.lower().endswith(extensions) and stat.st_size >= min_size
+        ]
+
+    def precompress_source(source: Tuple[str, os.stat_result]) -> Dict[str, str]:
+        return precompress_file(
+            os.path.join(root_folder, source[0]),
+            source[1],
+            formats=formats,
+            level=level,
+            dry_run=dry_run,
+        )
+
+    with profiling.timer("compress"):
+        # Largest files first so a big file doesn't end up alone in the last batch
+        sources.sort(key=lambda x: x[1].st_size, reverse=True)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(precompress_source, sources))
+
+    siblings = set()
+    counts = dict()
+
+    for (relative_path, _), result in zip(sources, results):
+        for file_format, status in result.items():
+            counts[status] = counts.get(status, 0) + 1
+
+            if status != "skipped":
+                siblings.add(f"{relative_path}.{file_format}")
+
+    with profiling.timer("prune"):
+        pruned = [x for x in _load_state(state_path) if x not in siblings]
+
+        if not dry_run:
+            for relative_path in pruned:
+                try:
+                    os.unlink(os.path.join(root_folder, relative_path))
+                except FileNotFoundError:
+                    pass
+
+            _save_state(state_path, list(siblings))
+
+    counts["pruned"] = len(pruned)
+
+    for status, count in counts.items():
+        profiling.count(f"siblings_{status}", count)
+
+    return {"counts": counts, "pruned": pruned}
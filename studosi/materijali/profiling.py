@@ -0,0 +1,199 @@
+import contextlib
+import cProfile
+import functools
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+
+class _Timer:
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self._profiler = profiler
+        self._name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.record(self._name, time.perf_counter() - self._start)
+
+        return False
+
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Profiler:
+    _report_formats = {
+        "text",
+        "json",
+    }
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._seconds: Dict[str, float] = dict()
+        self._calls: Dict[str, int] = dict()
+        self._counters: Dict[str, int] = dict()
+
+    def timer(self, name: str):
+        if not self.enabled:
+            return _NULL_TIMER
+
+        return _Timer(self, name)
+
+    def record(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+            self._calls[name] = self._calls.get(name, 0) + 1
+
+    def count(self, name: str, amount: int = 1):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._seconds.clear()
+            self._calls.clear()
+            self._counters.clear()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {"seconds": seconds, "calls": self._calls[name]}
+                for name, seconds in self._seconds.items()
+            }
+            counters = dict(self._counters)
+
+        return {
+            "stages": stages,
+            "counters": counters,
+            "total_seconds": sum(stage["seconds"] for stage in stages.values()),
+        }
+
+    def dumps(self, report_format: str = "text") -> str:
+        report_format = str(report_format).lower()
+
+        if report_format not in Profiler._report_formats:
+            formats = list(sorted(Profiler._report_formats))
+            error_string = (
+                ", ".join((f"`{x}`" for x in formats[:-1])) + f" or {formats[-1]}"
+            )
+
+            raise KeyError(f"Profiler report format must be one of: {error_string}")
+
+        report = self.report()
+
+        if report_format == "json":
+            return (
+                json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+            )
+
+        total = report["total_seconds"]
+        name_width = max((len(x) for x in report["stages"]), default=5)
+        name_width = max(name_width, len("total"))
+
+        to_return = ""
+
+        for name, stage in sorted(
+            report["stages"].items(), key=lambda x: x[1]["seconds"], reverse=True
+        ):
+            share = 100 * stage["seconds"] / total if total > 0 else 0.0
+            to_return += (
+                f"{name:<{name_width}}  {stage['seconds'] * 1000:10.3f} ms"
+                f"  {share:6.2f} %  {stage['calls']} call(s)\n"
+            )
+
+        to_return += f"{'total':<{name_width}}  {total * 1000:10.3f} ms\n"
+
+        for name, value in sorted(report["counters"].items()):
+            to_return += f"{name}: {value}\n"
+
+        return to_return
+
+
+PROFILER = Profiler(enabled=False)
+
+
+def get_profiler() -> Profiler:
+    return PROFILER
+
+
+def timer(name: str):
+    return PROFILER.timer(name)
+
+
+def timed(name: str):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with PROFILER.timer(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record(name: str, seconds: float):
+    PROFILER.record(name, seconds)
+
+
+def count(name: str, amount: int = 1):
+    PROFILER.count(name, amount)
+
+
+@contextlib.contextmanager
+def profile_session(
+    report_format: Optional[str] = None,
+    report_path: Optional[Union[Path, str]] = None,
+    cprofile_path: Optional[Union[Path, str]] = None,
+    profiler: Optional[Profiler] = None,
+) -> Iterator[Profiler]:
+    if profiler is None:
+        profiler = PROFILER
+
+    if report_format is None and cprofile_path is None:
+        yield profiler
+        return
+
+    was_enabled = profiler.enabled
+    profiler.enabled = report_format is not None
+
+    c_profile = None if cprofile_path is None else cProfile.Profile()
+
+    try:
+        if c_profile is not None:
+            c_profile.enable()
+
+        yield profiler
+    finally:
+        if c_profile is not None:
+            c_profile.disable()
+            c_profile.dump_stats(str(cprofile_path))
+
+        if report_format is not None:
+            report = profiler.dumps(report_format=report_format)
+
+            if report_path is None:
+                print(report, file=sys.stderr, end="")
+            else:
+                with open(report_path, mode="w+", encoding="utf8") as f:
+                    f.write(report)
+
+        profiler.enabled = was_enabled
@@ -0,0 +1,284 @@
+import hashlib
+import random
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from unidecode import unidecode
+
+from studosi.constants import regex as regex_constants
+from studosi.materijali import profiling
+from studosi.materijali.curriculum import (
+    ViewKey,
+    get_known_view_keys,
+    resolve_property_rows,
+)
+from studosi.materijali.subject import SubjectMeta
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Too common to say anything about how related two subjects are
+_STOPWORDS = {
+    "do",
+    "i",
+    "ili",
+    "iz",
+    "na",
+    "o",
+    "od",
+    "s",
+    "sa",
+    "te",
+    "u",
+    "uz",
+    "za",
+}
+
+Suggestion = Tuple[str, float, str]
+
+
+def get_name_tokens(name: Optional[str], stem_length: int = 6) -> Set[str]:
+    if name is None:
+        return set()
+
+    to_return = set()
+
+    for token in regex_constants.WHITESPACE_REGEX.split(str(name)):
+        for word in regex_constants.UNICODE_ALPHA_REGEX.findall(
+            unidecode(token).lower()
+        ):
+            if word not in _STOPWORDS:
+                # Croatian inflects heavily, a prefix is a cheap stem
+                to_return.add(word[:stem_length] if stem_length > 0 else word)
+
+    return to_return
+
+
+def get_features(
+    meta: SubjectMeta,
+    stem_length: int = 6,
+    name_weight: int = 2,
+    known_keys: Optional[Set[ViewKey]] = None,
+) -> Set[str]:
+    to_return = {
+        f"name:{i}:{token}"
+        for token in get_name_tokens(meta.name, stem_length=stem_length)
+        for i in range(max(1, name_weight))
+    }
+    to_return.update(
+        f"row:{':'.join(row)}" for row in resolve_property_rows(meta, known_keys)
+    )
+
+    return to_return
+
+
+def _hash_feature(feature: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(feature.encode("utf8"), digest_size=8).digest(), "little"
+    )
+
+
+def get_permutations(num_perm: int = 128, seed: int = 1) -> List[Tuple[int, int]]:
+    generator = random.Random(seed)
+
+    return [
+        (
+            generator.randrange(1, _MERSENNE_PRIME),
+            generator.randrange(0, _MERSENNE_PRIME),
+        )
+        for _ in range(num_perm)
+    ]
+
+
+def get_signature(
+    feature_hashes: Iterable[int], permutations: List[Tuple[int, int]]
+) -> Tuple[int, ...]:
+    feature_hashes = list(feature_hashes)
+
+    return tuple(
+        min((a * x + b) % _MERSENNE_PRIME for x in feature_hashes)
+        for a, b in permutations
+    )
+
+
+def get_candidates(
+    signatures: Dict[str, Tuple[int, ...]], bands: int = 32
+) -> Set[Tuple[str, str]]:
+    buckets = dict()
+
+    for key, signature in signatures.items():
+        rows = len(signature) // bands
+
+        for band in range(bands):
+            buckets.setdefault(
+                (band, signature[band * rows : (band + 1) * rows]), list()
+            ).append(key)
+
+    to_return = set()
+
+    for keys in buckets.values():
+        for i, first in enumerate(keys):
+            for second in keys[i + 1 :]:
+                to_return.add((first, second) if first < second else (second, first))
+
+    profiling.count("related_buckets", len(buckets))
+    profiling.count("related_candidates", len(to_return))
+
+    return to_return
+
+
+def get_reason(
+    shared_words: Set[str], shared_stems: Set[str], shared_rows: Set[Tuple[str, ...]]
+) -> str:
+    reasons = list()
+
+    if len(shared_words) != 0:
+        reasons.append(
+            f"Zajedničke riječi u nazivu ({', '.join(sorted(shared_words))})"
+        )
+    elif len(shared_stems) != 0:
+        reasons.append("Srodni nazivi")
+
+    if len(shared_rows) != 0:
+        reasons.append(f"Isti smjer i semestar ({len({x[:5] for x in shared_rows})}x)")
+
+    # The reason is the part after the delimiter in `abbreviation:reason`
+    return regex_constants.RELATED_SUBJECT_STRING_DELIMITER_REGEX.sub(
+        " ", "; ".join(reasons)
+    )
+
+
+def suggest_related(
+    metas: Dict[str, SubjectMeta],
+    threshold: float = 0.3,
+    num_perm: int = 128,
+    bands: int = 32,
+    max_suggestions: int = 5,
+    stem_length: int = 6,
+    name_weight: int = 2,
+    seed: int = 1,
+    include_existing: bool = False,
+) -> Dict[str, List[Suggestion]]:
+    if num_perm <= 0 or bands <= 0 or num_perm % bands != 0:
+        raise ValueError(
+            f"num_perm ({num_perm}) must be a positive multiple of bands ({bands})"
+        )
+
+    with profiling.timer("features"):
+        known_keys = get_known_view_keys(
+            row for meta in metas.values() for row in meta.iter_property_rows()
+        )
+        features = {
+            key: get_features(
+                meta,
+                stem_length=stem_length,
+                name_weight=name_weight,
+                known_keys=known_keys,
+            )
+            for key, meta in metas.items()
+        }
+        features = {key: x for key, x in features.items() if len(x) != 0}
+
+        hashes = dict()
+
+        for key_features in features.values():
+            for feature in key_features:
+                if feature not in hashes:
+                    hashes[feature] = _hash_feature(feature)
+
+    with profiling.timer("minhash"):
+        permutations = get_permutations(num_perm=num_perm, seed=seed)
+        signatures = {
+            key: get_signature((hashes[x] for x in key_features), permutations)
+            for key, key_features in features.items()
+        }
+
+    with profiling.timer("lsh"):
+        candidates = get_candidates(signatures, bands=bands)
+
+    to_return: Dict[str, List[Suggestion]] = dict()
+    details = dict()
+
+    def get_details(key: str) -> Tuple[Set[str], Set[str], Set[Tuple[str, ...]]]:
+        if key not in details:
+            details[key] = (
+                get_name_tokens(metas[key].name, stem_length=0),
+                get_name_tokens(metas[key].name, stem_length=stem_length),
+                resolve_property_rows(metas[key], known_keys),
+            )
+
+        return details[key]
+
+    with profiling.timer("score"):
+        for first, second in sorted(candidates):
+            score = len(features[first] & features[second]) / len(
+                features[first] | features[second]
+            )
+
+            if score < threshold:
+                continue
+
+            first_meta, second_meta = metas[first], metas[second]
+            reason = get_reason(
+                *(x & y for x, y in zip(get_details(first), get_details(second)))
+            )
+
+            for key, meta, other_key, other_meta in (
+                (first, first_meta, second, second_meta),
+                (second, second_meta, first, first_meta),
+            ):
+                abbreviation = (
+                    other_key
+                    if other_meta.abbreviation is None
+                    else str(other_meta.abbreviation)
+                )
+
+                if not include_existing and abbreviation in (
+                    meta.related_subjects or dict()
+                ):
+                    continue
+
+                to_return.setdefault(key, list()).append((abbreviation, score, reason))
+
+    for key in to_return:
+        to_return[key] = sorted(to_return[key], key=lambda x: (-x[1], x[0]))[
+            :max_suggestions
+        ]
+
+    profiling.count("related_suggestions", sum(len(x) for x in to_return.values()))
+
+    return dict(sorted(to_return.items()))
+
+
+def to_related_subject_strings(suggestions: List[Suggestion]) -> List[str]:
+    return [
+        f"{abbreviation}:{reason}" if len(reason) != 0 else abbreviation
+        for abbreviation, _, reason in suggestions
+    ]
+
+
+def render_suggestions(suggestions: Dict[str, List[Suggestion]]) -> str:
+    to_return = ""
+
+    for key, subject_suggestions in suggestions.items():
+        to_return += f"{key}\n"
+
+        for abbreviation, score, reason in subject_suggestions:
+            to_return += f"\t{score:.2f} {abbreviation}: {reason}\n"
+
+    to_return += (
+        f"{sum(len(x) for x in suggestions.values())} suggestions for "
+        f"{len(suggestions)} subjects\n"
+    )
+
+    return to_return
+
+
+def suggestions_to_json(
+    suggestions: Dict[str, List[Suggestion]]
+) -> Dict[str, Dict[str, Any]]:
+    return {
+        key: {
+            "related_subjects": to_related_subject_strings(subject_suggestions),
+            "scores": {x[0]: round(x[1], 4) for x in subject_suggestions},
+        }
+        for key, subject_suggestions in suggestions.items()
+    }
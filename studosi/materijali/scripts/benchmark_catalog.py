@@ -0,0 +1,177 @@
+import argparse
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from studosi.materijali.catalog import Catalog, dumps_catalog, load_metas
+from studosi.materijali.subject import Subject, SubjectMeta
+
+
+def generate_metas(count: int, seed: int = 0) -> Dict[str, SubjectMeta]:
+    rng = random.Random(seed)
+    to_return = dict()
+
+    for i in range(count):
+        properties = dict()
+
+        for _ in range(rng.randint(1, 6)):
+            module_dict = properties
+            vocabularies = (
+                Subject.programs,
+                Subject.studies,
+                Subject.courses,
+                Subject.modules,
+            )
+
+            for vocabulary in vocabularies:
+                module_dict = module_dict.setdefault(
+                    rng.choice(list(vocabulary)), dict()
+                )
+
+            module_dict[str(rng.randint(1, 10))] = rng.sample(
+                list(Subject.groups), rng.randint(1, 2)
+            )
+
+        to_return[f"subject-{i:05d}"] = SubjectMeta(
+            config={
+                "name": f"Predmet broj {i}",
+                "abbreviation": f"P{i}",
+                "properties": properties,
+                "links": {
+                    "fer": {
+                        "url": f"https://www.fer.unizg.hr/predmet/p{i}",
+                        "description": "Stranica predmeta",
+                    }
+                },
+                "related_subjects": {
+                    f"P{rng.randrange(count)}": {"reason": "Nastavak"}
+                },
+            }
+        )
+
+    return to_return
+
+
+def write_meta_files(metas: Dict[str, SubjectMeta], root_folder: str):
+    for key, meta in metas.items():
+        os.makedirs(os.path.join(root_folder, key), exist_ok=True)
+
+        with open(
+            os.path.join(root_folder, key, "meta.json"), mode="w+", encoding="utf8"
+        ) as f:
+            f.write(meta.dumps())
+
+
+def measure(function: Callable[[], object], repeat: int) -> float:
+    timings: List[float] = list()
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def get_benchmark_string(root_folder: str, repeat: int = 5) -> str:
+    metas = load_metas(root_folder)
+    keys = list(metas)
+
+    meta_bytes = sum(
+        os.path.getsize(os.path.join(root_folder, key, "meta.json")) for key in keys
+    )
+    compact = json.dumps(
+        {key: meta.config for key, meta in metas.items()},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf8")
+    catalog_bytes = dumps_catalog(metas)
+
+    with tempfile.NamedTemporaryFile(suffix=".bin") as f:
+        f.write(catalog_bytes)
+        f.flush()
+
+        def decode_all():
+            with Catalog.open(f.name) as catalog:
+                for _ in catalog.items():
+                    pass
+
+        def lookup_one():
+            with Catalog.open(f.name) as catalog:
+                catalog[keys[len(keys) // 2]]
+
+        timings = {
+            "meta.json files": measure(lambda: load_metas(root_folder), repeat),
+            "compact JSON": measure(lambda: json.loads(compact), repeat),
+            "catalog, all subjects": measure(decode_all, repeat),
+            "catalog, one subject": measure(lookup_one, repeat),
+        }
+
+    sizes = {
+        "meta.json files": meta_bytes,
+        "compact JSON": len(compact),
+        "compact JSON, gzip": len(gzip.compress(compact)),
+        "catalog": len(catalog_bytes),
+        "catalog, gzip": len(gzip.compress(catalog_bytes)),
+    }
+
+    width = max(len(x) for x in list(timings) + list(sizes))
+
+    to_return = ""
+    to_return += f"{len(keys)} subjects, best of {repeat}\n\n"
+
+    for name, seconds in timings.items():
+        to_return += f"{name:<{width}}  {seconds * 1000:>10.3f} ms\n"
+
+    to_return += "\n"
+
+    for name, size in sizes.items():
+        to_return += (
+            f"{name:<{width}}  {size:>10} B  {100 * size / meta_bytes:>6.1f} %\n"
+        )
+
+    return to_return
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--root_folder",
+        type=str,
+        default=None,
+        help="The root materijali folder, synthetic subjects are used if omitted",
+    )
+
+    parser.add_argument(
+        "--subjects",
+        type=int,
+        default=2000,
+        help="The number of synthetic subjects",
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="The number of runs each timing is the best of",
+    )
+
+    args = parser.parse_args()
+
+    if args.root_folder is not None:
+        print(get_benchmark_string(args.root_folder, repeat=args.repeat), end="")
+        return
+
+    with tempfile.TemporaryDirectory() as root_folder:
+        write_meta_files(generate_metas(args.subjects), root_folder)
+
+        print(get_benchmark_string(root_folder, repeat=args.repeat), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.bundle import build_bundles, get_bundle_file_name
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--root_folder",
+        type=str,
+        required=True,
+        help="The root materijali folder",
+    )
+
+    io_group.add_argument(
+        "--output_folder",
+        type=str,
+        required=True,
+        help="The folder bundles are written to, outside of the root folder",
+    )
+
+    io_group.add_argument(
+        "--manifest_file_name",
+        type=str,
+        default="manifest.json",
+        help="The name of the manifest file in the root materijali folder",
+    )
+
+    return io_group
+
+
+def decorate_bundling(parser: argparse.ArgumentParser):
+    bundling_group = parser.add_argument_group("Bundling")
+
+    bundling_group.add_argument(
+        "--compression_level",
+        type=int,
+        default=6,
+        help="The deflate level for files that aren't already compressed",
+    )
+
+    bundling_group.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of bundles built at once",
+    )
+
+    bundling_group.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild every bundle instead of only the ones whose files changed",
+    )
+
+    bundling_group.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Only report which bundles would be rebuilt and removed",
+    )
+
+    return bundling_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_bundling(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        result = build_bundles(
+            root_folder=args.root_folder,
+            output_folder=args.output_folder,
+            manifest_file_name=args.manifest_file_name,
+            compression_level=args.compression_level,
+            jobs=args.jobs,
+            full=args.full,
+            dry_run=args.dry_run,
+        )
+
+        for abbreviation in result["built"]:
+            print(f"built {get_bundle_file_name(abbreviation)}")
+
+        for abbreviation in result["removed"]:
+            print(f"removed {get_bundle_file_name(abbreviation)}")
+
+        print(f"{result['fresh']} bundles up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.catalog import (
+    Catalog,
+    catalog_to_json,
+    load_metas,
+    save_catalog,
+)
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+from studosi.materijali.subject import SubjectMeta
+from studosi.utils.json_utils import serialize_sets
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+    input_group = io_group.add_mutually_exclusive_group(required=True)
+
+    input_group.add_argument(
+        "--root_folder",
+        type=str,
+        help="The root materijali folder to build the catalog from",
+    )
+
+    input_group.add_argument(
+        "--from_json",
+        type=str,
+        help="A JSON catalog (subject folder to meta config) to build from",
+    )
+
+    input_group.add_argument(
+        "--from_catalog",
+        type=str,
+        help="A binary catalog to convert back to JSON",
+    )
+
+    io_group.add_argument(
+        "--meta_file_name",
+        type=str,
+        default="meta.json",
+        help="The name of the meta file in every subject folder",
+    )
+
+    io_group.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="The binary catalog to write, or the JSON file for --from_catalog",
+    )
+
+    return io_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        if args.from_catalog is not None:
+            with Catalog.open(args.from_catalog) as catalog:
+                dumped = catalog_to_json(catalog)
+
+            with open(args.output, mode="w+", encoding="utf8") as f:
+                json.dump(
+                    dumped, f, ensure_ascii=False, indent=2, default=serialize_sets
+                )
+                f.write("\n")
+
+            return
+
+        if args.from_json is not None:
+            with open(args.from_json, mode="r", encoding="utf8") as f:
+                metas = {
+                    key: SubjectMeta(config=config)
+                    for key, config in json.load(f).items()
+                }
+        else:
+            metas = load_metas(args.root_folder, meta_file_name=args.meta_file_name)
+
+        save_catalog(metas, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import json
+import sys
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.diff import load_source
+from studosi.materijali.links import (
+    check_links,
+    collect_links,
+    get_broken_links,
+    render_report,
+)
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--source",
+        type=str,
+        required=True,
+        help="The materijali root, snapshot, JSON or binary catalog to check",
+    )
+
+    io_group.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help="A JSON file results are cached in between runs",
+    )
+
+    io_group.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Where to write the broken links per subject as JSON",
+    )
+
+    return io_group
+
+
+def decorate_checking(parser: argparse.ArgumentParser):
+    checking_group = parser.add_argument_group("Checking")
+
+    checking_group.add_argument(
+        "--concurrency",
+        type=int,
+        default=64,
+        help="The maximum number of URLs checked at once",
+    )
+
+    checking_group.add_argument(
+        "--per_host",
+        type=int,
+        default=4,
+        help="The maximum number of connections to a single host",
+    )
+
+    checking_group.add_argument(
+        "--timeout",
+        type=float,
+        default=10.0,
+        help="The timeout of a single request in seconds",
+    )
+
+    checking_group.add_argument(
+        "--ttl",
+        type=float,
+        default=24 * 60 * 60,
+        help="How long a working link stays cached, in seconds",
+    )
+
+    checking_group.add_argument(
+        "--error_ttl",
+        type=float,
+        default=60 * 60,
+        help="How long a broken link stays cached, in seconds",
+    )
+
+    checking_group.add_argument(
+        "--insecure",
+        action="store_true",
+        help="Don't verify TLS certificates",
+    )
+
+    return checking_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_checking(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        with profiling.timer("load"):
+            metas = {key: meta for key, (_, meta) in load_source(args.source).items()}
+
+        usages = collect_links(metas)
+        results = check_links(
+            list(usages),
+            cache_path=args.cache,
+            ttl=args.ttl,
+            error_ttl=args.error_ttl,
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            timeout=args.timeout,
+            verify_tls=not args.insecure,
+        )
+        broken = get_broken_links(usages, results)
+
+        if args.output is not None:
+            with open(args.output, mode="w+", encoding="utf8") as f:
+                json.dump(broken, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+
+        print(render_report(broken, checked=len(usages)), end="")
+
+    if len(broken) != 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
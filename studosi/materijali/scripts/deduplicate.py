@@ -0,0 +1,112 @@
+import argparse
+import json
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.dedup import deduplicate, render_report
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--root_folder",
+        type=str,
+        required=True,
+        help="The root materijali folder",
+    )
+
+    io_group.add_argument(
+        "--manifest_file_name",
+        type=str,
+        default="manifest.json",
+        help="The manifest whose hashes are reused for unchanged files",
+    )
+
+    io_group.add_argument(
+        "--report_format",
+        type=str,
+        choices=("text", "json"),
+        default="text",
+        help="The format of the duplicate report",
+    )
+
+    return io_group
+
+
+def decorate_dedup(parser: argparse.ArgumentParser):
+    dedup_group = parser.add_argument_group("Dedup")
+
+    dedup_group.add_argument(
+        "--mode",
+        type=str,
+        choices=("hardlink", "reflink"),
+        default="hardlink",
+        help=(
+            "How duplicates are replaced. Hardlinked files share edits, reflinked "
+            "files (btrfs, XFS) only share blocks until one is modified"
+        ),
+    )
+
+    dedup_group.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Only report the duplicates without replacing anything",
+    )
+
+    dedup_group.add_argument(
+        "--min_size",
+        type=int,
+        default=4096,
+        help="Files smaller than this many bytes are ignored",
+    )
+
+    dedup_group.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of hashing threads",
+    )
+
+    return dedup_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_dedup(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        result = deduplicate(
+            root_folder=args.root_folder,
+            mode=None if args.dry_run else args.mode,
+            manifest_file_name=args.manifest_file_name,
+            min_size=args.min_size,
+            jobs=args.jobs,
+        )
+
+        if args.report_format == "json":
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+        else:
+            print(render_report(result), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.diff import (
+    diff_catalogs,
+    load_source,
+    render_change_set,
+    save_snapshot,
+)
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--old",
+        type=str,
+        default=None,
+        help="The old materijali root, snapshot, JSON or binary catalog",
+    )
+
+    io_group.add_argument(
+        "--new",
+        type=str,
+        required=True,
+        help="The new materijali root, snapshot, JSON or binary catalog",
+    )
+
+    io_group.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Where to write the change set as JSON",
+    )
+
+    io_group.add_argument(
+        "--save_snapshot",
+        type=str,
+        default=None,
+        help="Where to save a snapshot of the new catalog for the next diff",
+    )
+
+    io_group.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Don't print the human readable change report",
+    )
+
+    return io_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        if args.old is not None:
+            with profiling.timer("load"):
+                old = load_source(args.old)
+                new = load_source(args.new)
+
+            change_set = diff_catalogs(old, new)
+
+            if args.output is not None:
+                with open(args.output, mode="w+", encoding="utf8") as f:
+                    json.dump(change_set, f, ensure_ascii=False, indent=2)
+                    f.write("\n")
+
+            if not args.quiet:
+                print(render_change_set(change_set), end="")
+
+        if args.save_snapshot is not None:
+            save_snapshot(args.new, args.save_snapshot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.diff import load_source
+from studosi.materijali.php_export import export_php
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--source",
+        type=str,
+        required=True,
+        help="The materijali root, snapshot, JSON or binary catalog to export",
+    )
+
+    io_group.add_argument(
+        "--output_folder",
+        type=str,
+        required=True,
+        help="The folder the PHP files are written to",
+    )
+
+    return io_group
+
+
+def decorate_php(parser: argparse.ArgumentParser):
+    php_group = parser.add_argument_group("PHP")
+
+    php_group.add_argument(
+        "--mode",
+        type=str,
+        choices=("catalog", "subjects", "both"),
+        default="both",
+        help="One catalog.php, one file per subject with an index.php, or both",
+    )
+
+    php_group.add_argument(
+        "--no_preload",
+        action="store_true",
+        help="Don't write a preload.php for opcache.preload",
+    )
+
+    return php_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_php(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        with profiling.timer("load"):
+            metas = {key: meta for key, (_, meta) in load_source(args.source).items()}
+
+        result = export_php(
+            metas,
+            args.output_folder,
+            mode=args.mode,
+            preload=not args.no_preload,
+        )
+
+        for relative_path in result["written"]:
+            print(f"written {relative_path}")
+
+        for relative_path in result["removed"]:
+            print(f"removed {relative_path}")
+
+        print(f"{result['unchanged']} files unchanged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import json
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.diff import load_source
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+from studosi.materijali.sql import export_sql
+from studosi.materijali.subject import SubjectMeta
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+    input_group = io_group.add_mutually_exclusive_group(required=True)
+
+    input_group.add_argument(
+        "--source",
+        type=str,
+        help="The materijali root, snapshot, JSON or binary catalog to export",
+    )
+
+    input_group.add_argument(
+        "--change_set",
+        type=str,
+        help="A change set from diff_catalog to apply as an incremental upsert",
+    )
+
+    io_group.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="The SQL file to write, or the folder for TSV exports",
+    )
+
+    return io_group
+
+
+def decorate_sql(parser: argparse.ArgumentParser):
+    sql_group = parser.add_argument_group("SQL")
+
+    sql_group.add_argument(
+        "--format",
+        type=str,
+        choices=("inserts", "tsv"),
+        default="inserts",
+        help="Batched INSERTs in one transaction, or TSV files and a LOAD DATA script",
+    )
+
+    sql_group.add_argument(
+        "--dialect",
+        type=str,
+        choices=("mysql", "sqlite"),
+        default="mysql",
+        help="The SQL dialect to render",
+    )
+
+    sql_group.add_argument(
+        "--batch_size",
+        type=int,
+        default=500,
+        help="The number of rows per INSERT statement",
+    )
+
+    sql_group.add_argument(
+        "--upsert",
+        action="store_true",
+        help="Upsert the exported subjects instead of replacing all tables",
+    )
+
+    sql_group.add_argument(
+        "--prune",
+        action="store_true",
+        help="With --upsert, also delete subjects missing from the source",
+    )
+
+    sql_group.add_argument(
+        "--no_schema",
+        action="store_true",
+        help="Don't emit CREATE TABLE IF NOT EXISTS statements",
+    )
+
+    sql_group.add_argument(
+        "--keep_patterns",
+        action="store_true",
+        help=(
+            "Store property patterns like `*` and `1-4` verbatim instead of "
+            "expanding them into concrete rows"
+        ),
+    )
+
+    return sql_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_sql(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    if args.format == "tsv" and (args.upsert or args.change_set is not None):
+        parser.error("TSV exports always replace the tables, use --format inserts")
+
+    # A change set only holds what changed, pruning would delete everything else
+    if args.prune and args.change_set is not None:
+        parser.error(
+            "--prune needs the full catalog, it can't be used with --change_set"
+        )
+
+    if args.prune and not args.upsert:
+        parser.error(
+            "--prune only applies to --upsert, a full load replaces the tables"
+        )
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        kwargs = dict()
+
+        if args.format == "inserts":
+            kwargs.update(
+                batch_size=args.batch_size,
+                upsert=args.upsert or args.change_set is not None,
+                prune=args.prune,
+            )
+
+        if args.change_set is not None:
+            with open(args.change_set, mode="r", encoding="utf8") as f:
+                change_set = json.load(f)
+
+            metas = {
+                key: SubjectMeta(config=config, copy_config=False)
+                for key, config in change_set["added"].items()
+            }
+            metas.update(
+                {
+                    key: SubjectMeta(config=modified["config"], copy_config=False)
+                    for key, modified in change_set["modified"].items()
+                }
+            )
+            kwargs["removed"] = change_set["removed"]
+        else:
+            with profiling.timer("load"):
+                metas = {
+                    key: meta for key, (_, meta) in load_source(args.source).items()
+                }
+
+        export_sql(
+            metas,
+            args.output,
+            file_format=args.format,
+            dialect=args.dialect,
+            schema=not args.no_schema,
+            expand=not args.keep_patterns,
+            **kwargs,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.curriculum import export_views
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--root_folder",
+        type=str,
+        required=True,
+        help="The root materijali folder",
+    )
+
+    io_group.add_argument(
+        "--output_folder",
+        type=str,
+        required=True,
+        help="The folder the view shards and their index are written to",
+    )
+
+    io_group.add_argument(
+        "--meta_file_name",
+        type=str,
+        default="meta.json",
+        help="The name of the meta file in every subject folder",
+    )
+
+    io_group.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild every view instead of only the ones whose subjects changed",
+    )
+
+    return io_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        result = export_views(
+            root_folder=args.root_folder,
+            output_folder=args.output_folder,
+            meta_file_name=args.meta_file_name,
+            full=args.full,
+        )
+
+        for name in result["written"]:
+            print(f"written {name}")
+
+        for name in result["removed"]:
+            print(f"removed {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.manifest import update_manifest
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--root_folder",
+        type=str,
+        required=True,
+        help="The root materijali folder",
+    )
+
+    io_group.add_argument(
+        "--file_name",
+        type=str,
+        default="manifest.json",
+        help="The name of the manifest file in the root materijali folder",
+    )
+
+    return io_group
+
+
+def decorate_hashing(parser: argparse.ArgumentParser):
+    hashing_group = parser.add_argument_group("Hashing")
+
+    hashing_group.add_argument(
+        "--algorithm",
+        type=str,
+        default="sha256",
+        help="The hashlib algorithm files are hashed with",
+    )
+
+    hashing_group.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of hashing threads",
+    )
+
+    hashing_group.add_argument(
+        "--full",
+        action="store_true",
+        help="Rehash every file instead of only new and changed ones",
+    )
+
+    return hashing_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_hashing(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        update_manifest(
+            root_folder=args.root_folder,
+            file_name=args.file_name,
+            full=args.full,
+            algorithm=args.algorithm,
+            jobs=args.jobs,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -50,3 +50,56 @@ def decorate_parser_io(
         )
 
     return group
+
+
+def decorate_parser_profile(
+    parser: argparse.ArgumentParser,
+    group_name: Optional[str] = "Profiling",
+    group_description: Optional[str] = None,
+    prefix: Optional[str] = None,
+    suffix: Optional[str] = None,
+    profile_argname: Optional[str] = "profile",
+    profile_output_argname: Optional[str] = "profile_output",
+    cprofile_output_argname: Optional[str] = "cprofile_output",
+):
+    if group_name is None:
+        group = parser
+    else:
+        group = parser.add_argument_group(group_name, group_description)
+
+    if prefix is None:
+        prefix = ""
+    if suffix is None:
+        suffix = ""
+
+    def get_full_argname(argname):
+        return f"--{prefix}{argname}{suffix}"
+
+    if profile_argname is not None:
+        group.add_argument(
+            get_full_argname(profile_argname),
+            type=str,
+            nargs="?",
+            const="text",
+            default=None,
+            choices=("text", "json"),
+            help="Print a per-stage timing breakdown in the given format",
+        )
+
+    if profile_output_argname is not None:
+        group.add_argument(
+            get_full_argname(profile_output_argname),
+            type=str,
+            default=None,
+            help="The file the stage breakdown will be written to, stderr if omitted",
+        )
+
+    if cprofile_output_argname is not None:
+        group.add_argument(
+            get_full_argname(cprofile_output_argname),
+            type=str,
+            default=None,
+            help="The file a cProfile dump of the run will be written to",
+        )
+
+    return group
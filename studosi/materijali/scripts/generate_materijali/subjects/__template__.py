@@ -2,9 +2,14 @@ import argparse
 import os
 from pathlib import Path
 import sys
+import time
 from typing import Any, Dict
 
-from studosi.materijali.scripts.generate_materijali.parsing import decorate_parser_io
+from studosi.materijali import profiling
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_io,
+    decorate_parser_profile,
+)
 from studosi.materijali.subject import SubjectMeta
 from studosi.materijali.scripts.generate_meta import save_meta
 
@@ -39,27 +44,42 @@ config = {
 
 
 def main():
+    parse_start = time.perf_counter()
+
     parser = argparse.ArgumentParser()
 
     decorate_parser_io(parser=parser)
+    decorate_parser_profile(parser=parser)
 
     args = parser.parse_args()
     args_dict = vars(args)
 
-    meta = SubjectMeta(config=config)
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args_dict.get("profile"),
+        report_path=args_dict.get("profile_output"),
+        cprofile_path=args_dict.get("cprofile_output"),
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        meta = SubjectMeta(config=config)
 
-    root_folder = args_dict.get("root_folder", os.path.abspath("./"))
-    folder_name = args_dict.get("folder_name", meta.abbreviation)
-    file_name = args_dict.get("file_name", "meta.json")
+        root_folder = args_dict.get("root_folder", os.path.abspath("./"))
+        folder_name = args_dict.get("folder_name", meta.abbreviation)
+        file_name = args_dict.get("file_name", "meta.json")
 
-    validation_result = SubjectMeta.is_valid(meta.config)
+        validation_result = SubjectMeta.is_valid(meta.config)
 
-    if validation_result is not None:
-        print(validation_result, file=sys.stderr)
+        if validation_result is not None:
+            print(validation_result, file=sys.stderr)
 
-    save_meta(
-        meta=meta, root_folder=root_folder, folder_name=folder_name, file_name=file_name
-    )
+        save_meta(
+            meta=meta,
+            root_folder=root_folder,
+            folder_name=folder_name,
+            file_name=file_name,
+        )
 
 
 if __name__ == "__main__":
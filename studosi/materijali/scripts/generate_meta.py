@@ -1,8 +1,15 @@
 import argparse
+import importlib
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
-
+import time
+import sys
+from typing import Any, Dict, List, Optional, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
 from studosi.materijali.subject import SubjectMeta
 
 
@@ -33,14 +40,67 @@ def decorate_io(parser: argparse.ArgumentParser):
     return io_group
 
 
+def decorate_merge(parser: argparse.ArgumentParser):
+    merge_group = parser.add_argument_group("merge")
+
+    merge_group.add_argument(
+        "--merge_sources",
+        type=str,
+        nargs="*",
+        default=None,
+        help=(
+            "Meta JSON files or names of modules in generate_materijali.subjects to "
+            "merge, in order. The subject arguments are merged in last"
+        ),
+    )
+
+    merge_group.add_argument(
+        "--merge_policy",
+        type=str,
+        choices=("first", "last", "raise"),
+        default="last",
+        help="Which value wins when sources disagree, or raise on any conflict",
+    )
+
+    return merge_group
+
+
+def load_merge_source(source: str) -> SubjectMeta:
+    if source.endswith(".json"):
+        with open(source, mode="r", encoding="utf8") as f:
+            return SubjectMeta.loads(f.read())
+
+    module = importlib.import_module(
+        f"studosi.materijali.scripts.generate_materijali.subjects.{source}"
+    )
+
+    return SubjectMeta(config=module.get_config(), copy_config=False)
+
+
+def merge_metas(metas: List[SubjectMeta], policy: str = "last") -> SubjectMeta:
+    meta, conflicts = SubjectMeta.merge(metas, policy=policy)
+
+    for conflict in conflicts:
+        print(
+            f"Merge conflict at `{'.'.join(conflict['path'])}`, "
+            f"using {conflict['chosen']!r}",
+            file=sys.stderr,
+        )
+
+    return meta
+
+
 def save_meta(
     meta: SubjectMeta,
     root_folder: Optional[Union[Path, str]] = None,
     folder_name: Optional[str] = None,
     file_name: Optional[str] = None,
 ):
+    with profiling.timer("serialize"):
+        dumped = meta.dumps()
+
     if root_folder is None:
-        print(meta.dumps())
+        print(dumped)
     else:
         root_path = Path(root_folder)
 
@@ -53,36 +113,68 @@ def save_meta(
         save_folder = root_path / folder_name
         save_path = save_folder / file_name
 
-        if not os.path.exists(save_folder):
-            os.makedirs(save_folder)
+        with profiling.timer("write"):
+            if not os.path.exists(save_folder):
+                os.makedirs(save_folder)
 
-        with open(save_path, mode="w+", encoding="utf8", errors="replaces") as f:
-            f.write(meta.dumps())
+            with open(save_path, mode="w+", encoding="utf8", errors="replaces") as f:
+                profiling.count("bytes_written", f.write(dumped))
 
 
 def main():
+    parse_start = time.perf_counter()
+
     parser = argparse.ArgumentParser()
 
     decorate_io(parser=parser)
+    decorate_merge(parser=parser)
     SubjectMeta.decorate_parser(parser=parser, group_name="subject")
+    decorate_parser_profile(parser=parser)
 
     args = parser.parse_args()
 
-    meta = SubjectMeta(config=SubjectMeta.args_to_config(args=args))
-
-    args_dict = vars(args)
-
-    (root_folder, folder_name, file_name) = [
-        args_dict.get(x) for x in ("root_folder", "folder_name", "file_name")
-    ]
-
-    save_meta(
-        meta=meta,
-        abbreviation=meta.abbreviation,
-        root_folder=root_folder,
-        folder_name=folder_name,
-        file_name=file_name,
-    )
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        if args.merge_sources is None:
+            meta = SubjectMeta(config=SubjectMeta.args_to_config(args=args))
+        else:
+            with profiling.timer("load"):
+                metas = [load_merge_source(x) for x in args.merge_sources]
+
+            metas.append(
+                SubjectMeta(
+                    config=SubjectMeta.args_to_config(
+                        args=args, action_on_wrong_value="nothing"
+                    ),
+                    copy_config=False,
+                )
+            )
+            meta = merge_metas(metas, policy=args.merge_policy)
+
+            validity_result = SubjectMeta.is_valid(config=meta.config)
+
+            if validity_result is not None:
+                print(validity_result, file=sys.stderr)
+
+        args_dict = vars(args)
+
+        (root_folder, folder_name, file_name) = [
+            args_dict.get(x) for x in ("root_folder", "folder_name", "file_name")
+        ]
+
+        save_meta(
+            meta=meta,
+            root_folder=root_folder,
+            folder_name=folder_name,
+            file_name=file_name,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+import argparse
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.precompress import get_available_formats, precompress
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--root_folder",
+        type=str,
+        required=True,
+        help="The root materijali folder",
+    )
+
+    return io_group
+
+
+def decorate_compression(parser: argparse.ArgumentParser):
+    compression_group = parser.add_argument_group("Compression")
+
+    compression_group.add_argument(
+        "--formats",
+        type=str,
+        nargs="+",
+        choices=("gz", "br"),
+        default=None,
+        help=(
+            "The sibling formats to generate. Defaults to "
+            + " and ".join(f"`{x}`" for x in get_available_formats())
+        ),
+    )
+
+    compression_group.add_argument(
+        "--level",
+        type=int,
+        default=None,
+        help="The compression level, defaults to the maximum of each format",
+    )
+
+    compression_group.add_argument(
+        "--min_size",
+        type=int,
+        default=256,
+        help="Files smaller than this many bytes aren't precompressed",
+    )
+
+    compression_group.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of compression threads",
+    )
+
+    compression_group.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Only report what would be written and pruned",
+    )
+
+    return compression_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_compression(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        result = precompress(
+            root_folder=args.root_folder,
+            formats=args.formats,
+            level=args.level,
+            jobs=args.jobs,
+            min_size=args.min_size,
+            dry_run=args.dry_run,
+        )
+
+        print(
+            ", ".join(
+                f"{count} {status}"
+                for status, count in sorted(result["counts"].items())
+            )
+        )
+
+        for relative_path in result["pruned"]:
+            print(f"pruned {relative_path}")
+
+
+if __name__ == "__main__":
+    main()
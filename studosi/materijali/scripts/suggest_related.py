@@ -0,0 +1,143 @@
+import argparse
+import json
+import time
+
+from studosi.materijali import profiling
+from studosi.materijali.diff import load_source
+from studosi.materijali.related import (
+    render_suggestions,
+    suggest_related,
+    suggestions_to_json,
+)
+from studosi.materijali.scripts.generate_materijali.parsing import (
+    decorate_parser_profile,
+)
+
+
+def decorate_io(parser: argparse.ArgumentParser):
+    io_group = parser.add_argument_group("IO")
+
+    io_group.add_argument(
+        "--source",
+        type=str,
+        required=True,
+        help="The materijali root, snapshot, JSON or binary catalog to scan",
+    )
+
+    io_group.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Where to write the suggestions as JSON in the --related_subjects format",
+    )
+
+    io_group.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Don't print the human readable suggestions",
+    )
+
+    return io_group
+
+
+def decorate_lsh(parser: argparse.ArgumentParser):
+    lsh_group = parser.add_argument_group("LSH")
+
+    lsh_group.add_argument(
+        "--threshold",
+        type=float,
+        default=0.3,
+        help="The minimum exact Jaccard similarity of a suggested pair",
+    )
+
+    lsh_group.add_argument(
+        "--num_perm",
+        type=int,
+        default=128,
+        help="The number of MinHash permutations",
+    )
+
+    lsh_group.add_argument(
+        "--bands",
+        type=int,
+        default=32,
+        help="The number of LSH bands, more bands find less similar candidates",
+    )
+
+    lsh_group.add_argument(
+        "--max_suggestions",
+        type=int,
+        default=5,
+        help="The maximum number of suggestions per subject",
+    )
+
+    lsh_group.add_argument(
+        "--stem_length",
+        type=int,
+        default=6,
+        help="Name tokens are cut to this many letters, 0 keeps whole words",
+    )
+
+    lsh_group.add_argument(
+        "--name_weight",
+        type=int,
+        default=2,
+        help="How many times a name token counts compared to a properties row",
+    )
+
+    lsh_group.add_argument(
+        "--include_existing",
+        action="store_true",
+        help="Also suggest subjects that are already related",
+    )
+
+    return lsh_group
+
+
+def main():
+    parse_start = time.perf_counter()
+
+    parser = argparse.ArgumentParser()
+
+    decorate_io(parser=parser)
+    decorate_lsh(parser=parser)
+    decorate_parser_profile(parser=parser)
+
+    args = parser.parse_args()
+
+    parse_seconds = time.perf_counter() - parse_start
+
+    with profiling.profile_session(
+        report_format=args.profile,
+        report_path=args.profile_output,
+        cprofile_path=args.cprofile_output,
+    ) as profiler:
+        profiler.record("parse", parse_seconds)
+
+        with profiling.timer("load"):
+            metas = {key: meta for key, (_, meta) in load_source(args.source).items()}
+
+        suggestions = suggest_related(
+            metas,
+            threshold=args.threshold,
+            num_perm=args.num_perm,
+            bands=args.bands,
+            max_suggestions=args.max_suggestions,
+            stem_length=args.stem_length,
+            name_weight=args.name_weight,
+            include_existing=args.include_existing,
+        )
+
+        if args.output is not None:
+            with open(args.output, mode="w+", encoding="utf8") as f:
+                json.dump(
+                    suggestions_to_json(suggestions), f, ensure_ascii=False, indent=2
+                )
+                f.write("\n")
+
+        if not args.quiet:
+            print(render_suggestions(suggestions), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+import os
+from pathlib import Path
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from studosi.materijali import profiling
+from studosi.materijali.curriculum import get_known_view_keys, resolve_property_rows
+from studosi.materijali.diff import hash_config
+from studosi.materijali.subject import SubjectMeta
+
+Row = Tuple[Optional[str], ...]
+
+TABLES = {
+    "subjects": (
+        ("subject_key", "VARCHAR(255) NOT NULL"),
+        ("abbreviation", "VARCHAR(64) NULL"),
+        ("name", "VARCHAR(255) NULL"),
+        ("content_hash", "CHAR(64) NOT NULL"),
+    ),
+    "subject_properties": (
+        ("subject_key", "VARCHAR(255) NOT NULL"),
+        ("program", "VARCHAR(32) NOT NULL"),
+        ("study", "VARCHAR(32) NOT NULL"),
+        ("course", "VARCHAR(32) NOT NULL"),
+        ("module", "VARCHAR(64) NOT NULL"),
+        ("semester", "VARCHAR(8) NOT NULL"),
+        ("group_name", "VARCHAR(64) NOT NULL"),
+    ),
+    "subject_links": (
+        ("subject_key", "VARCHAR(255) NOT NULL"),
+        ("identifier", "VARCHAR(255) NOT NULL"),
+        ("url", "VARCHAR(2048) NULL"),
+        ("description", "VARCHAR(1024) NULL"),
+    ),
+    "related_subjects": (
+        ("subject_key", "VARCHAR(255) NOT NULL"),
+        ("related_key", "VARCHAR(255) NOT NULL"),
+        ("reason", "VARCHAR(1024) NULL"),
+    ),
+}
+
+_PRIMARY_KEYS = {
+    "subjects": ("subject_key",),
+    "subject_properties": (
+        "subject_key",
+        "program",
+        "study",
+        "course",
+        "module",
+        "semester",
+        "group_name",
+    ),
+    "subject_links": ("subject_key", "identifier"),
+    "related_subjects": ("subject_key", "related_key"),
+}
+
+_INDEXES = {
+    "subjects": (("abbreviation",),),
+    "subject_properties": (("program", "study", "course", "module", "semester"),),
+    "subject_links": (),
+    "related_subjects": (("related_key",),),
+}
+
+_COLUMN_LENGTH_REGEX = re.compile(r"(?:VAR)?CHAR\((\d+)\)")
+
+_DIALECTS = {
+    "mysql",
+    "sqlite",
+}
+
+_FORMATS = {
+    "inserts",
+    "tsv",
+}
+
+
+def _check_choice(value: str, choices: Iterable[str], description: str):
+    choices = list(sorted(choices))
+
+    if value not in choices:
+        error_string = (
+            ", ".join((f"`{x}`" for x in choices[:-1])) + f" or {choices[-1]}"
+        )
+
+        raise KeyError(f"{description} must be one of: {error_string}")
+
+
+def quote_identifier(identifier: str, dialect: str = "mysql") -> str:
+    if dialect == "mysql":
+        return "`" + identifier.replace("`", "``") + "`"
+
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def quote_value(value: Optional[str], dialect: str = "mysql") -> str:
+    if value is None:
+        return "NULL"
+
+    value = str(value)
+
+    if dialect == "mysql":
+        # MySQL treats backslashes as escapes unless NO_BACKSLASH_ESCAPES is set
+        value = (
+            value.replace("\\", "\\\\")
+            .replace("\0", "\\0")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+            .replace("\x1a", "\\Z")
+        )
+
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _check_lengths(table: str, row: Row):
+    for (column, column_type), value in zip(TABLES[table], row):
+        match = _COLUMN_LENGTH_REGEX.match(column_type)
+
+        # sqlite ignores the lengths, MySQL in strict mode rejects the whole export
+        if match is not None and value is not None and len(value) > int(match[1]):
+            raise ValueError(
+                f"`{value}` doesn't fit {table}.{column} ({match[1]} characters) "
+                f"for subject `{row[0]}`"
+            )
+
+
+def get_rows(
+    metas: Dict[str, SubjectMeta], expand: bool = True
+) -> Dict[str, List[Row]]:
+    to_return = {table: list() for table in TABLES}
+
+    # Rows keep patterns verbatim otherwise, and `module = 'zop'` won't match `*`
+    known_keys = (
+        get_known_view_keys(
+            row for meta in metas.values() for row in meta.iter_property_rows()
+        )
+        if expand
+        else set()
+    )
+
+    for key, meta in sorted(metas.items()):
+        to_return["subjects"].append(
+            (
+                key,
+                None if meta.abbreviation is None else str(meta.abbreviation),
+                None if meta.name is None else str(meta.name),
+                hash_config(meta.config),
+            )
+        )
+
+        if expand:
+            rows = sorted(resolve_property_rows(meta, known_keys))
+        else:
+            rows = list(dict.fromkeys(meta.iter_property_rows()))
+
+        for row in rows:
+            to_return["subject_properties"].append((key, *(str(x) for x in row)))
+
+        for identifier, link in (meta.links or dict()).items():
+            to_return["subject_links"].append(
+                (key, identifier, link.get("url"), link.get("description"))
+            )
+
+        for related_key, related in (meta.related_subjects or dict()).items():
+            to_return["related_subjects"].append(
+                (
+                    key,
+                    related_key,
+                    related.get("reason") if isinstance(related, dict) else related,
+                )
+            )
+
+    for table, rows in to_return.items():
+        for row in rows:
+            _check_lengths(table, row)
+
+    profiling.count("sql_rows", sum(len(x) for x in to_return.values()))
+
+    return to_return
+
+
+def render_schema(dialect: str = "mysql") -> str:
+    _check_choice(dialect, _DIALECTS, "SQL dialect")
+
+    def q(identifier: str) -> str:
+        return quote_identifier(identifier, dialect=dialect)
+
+    to_return = ""
+
+    for table, columns in TABLES.items():
+        lines = [f"\t{q(name)} {definition}" for name, definition in columns]
+        lines.append(
+            f"\tPRIMARY KEY ({', '.join(q(x) for x in _PRIMARY_KEYS[table])})"
+        )
+
+        if dialect == "mysql":
+            lines.extend(
+                f"\tINDEX {q(table + '_' + '_'.join(index))} "
+                f"({', '.join(q(x) for x in index)})"
+                for index in _INDEXES[table]
+            )
+
+        to_return += f"CREATE TABLE IF NOT EXISTS {q(table)} (\n"
+        to_return += ",\n".join(lines) + "\n"
+        to_return += (
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;\n"
+            if dialect == "mysql"
+            else ");\n"
+        )
+
+        if dialect == "sqlite":
+            for index in _INDEXES[table]:
+                to_return += (
+                    f"CREATE INDEX IF NOT EXISTS {q(table + '_' + '_'.join(index))} "
+                    f"ON {q(table)} ({', '.join(q(x) for x in index)});\n"
+                )
+
+        to_return += "\n"
+
+    return to_return
+
+
+def _render_insert(
+    table: str,
+    rows: List[Row],
+    dialect: str = "mysql",
+    batch_size: int = 500,
+    upsert: bool = False,
+) -> str:
+    def q(identifier: str) -> str:
+        return quote_identifier(identifier, dialect=dialect)
+
+    columns = [name for name, _ in TABLES[table]]
+    updated = [x for x in columns if x not in _PRIMARY_KEYS[table]]
+
+    suffix = ""
+
+    if upsert and dialect == "mysql":
+        suffix = "\nON DUPLICATE KEY UPDATE " + (
+            ", ".join(f"{q(x)} = VALUES({q(x)})" for x in updated)
+            if len(updated) != 0
+            else f"{q(columns[0])} = {q(columns[0])}"
+        )
+    elif upsert:
+        suffix = (
+            f"\nON CONFLICT ({', '.join(q(x) for x in _PRIMARY_KEYS[table])}) "
+            + (
+                "DO UPDATE SET "
+                + ", ".join(f"{q(x)} = excluded.{q(x)}" for x in updated)
+                if len(updated) != 0
+                else "DO NOTHING"
+            )
+        )
+
+    to_return = ""
+    batch_size = max(1, batch_size)
+
+    for start in range(0, len(rows), batch_size):
+        to_return += (
+            f"INSERT INTO {q(table)} ({', '.join(q(x) for x in columns)}) VALUES\n"
+        )
+        to_return += ",\n".join(
+            "(" + ", ".join(quote_value(x, dialect=dialect) for x in row) + ")"
+            for row in rows[start : start + batch_size]
+        )
+        to_return += suffix + ";\n"
+
+    return to_return
+
+
+def _render_delete(
+    table: str,
+    keys: Optional[List[str]],
+    dialect: str = "mysql",
+    batch_size: int = 500,
+) -> str:
+    q_table = quote_identifier(table, dialect=dialect)
+
+    if keys is None:
+        return f"DELETE FROM {q_table};\n"
+
+    to_return = ""
+
+    for start in range(0, len(keys), max(1, batch_size)):
+        to_return += (
+            f"DELETE FROM {q_table} WHERE "
+            f"{quote_identifier('subject_key', dialect=dialect)} IN ("
+            + ", ".join(
+                quote_value(x, dialect=dialect)
+                for x in keys[start : start + batch_size]
+            )
+            + ");\n"
+        )
+
+    return to_return
+
+
+def render_inserts(
+    metas: Dict[str, SubjectMeta],
+    dialect: str = "mysql",
+    batch_size: int = 500,
+    upsert: bool = False,
+    removed: Optional[Iterable[str]] = None,
+    prune: bool = False,
+    schema: bool = True,
+    expand: bool = True,
+) -> str:
+    _check_choice(dialect, _DIALECTS, "SQL dialect")
+
+    if prune and not upsert:
+        raise ValueError("Pruning only applies to upserts")
+
+    rows = get_rows(metas, expand=expand)
+    keys = sorted(metas)
+    removed = sorted(() if removed is None else removed)
+
+    to_return = ""
+
+    if schema:
+        to_return += render_schema(dialect=dialect)
+
+    to_return += "START TRANSACTION;\n" if dialect == "mysql" else "BEGIN;\n"
+
+    # Child rows are replaced per subject, a row that disappeared can't be upserted
+    for table in reversed(list(TABLES)):
+        if not upsert:
+            to_return += _render_delete(table, None, dialect=dialect)
+            continue
+
+        if prune and len(keys) == 0:
+            to_return += _render_delete(table, None, dialect=dialect)
+        elif prune:
+            to_return += (
+                f"DELETE FROM {quote_identifier(table, dialect=dialect)} WHERE "
+                f"{quote_identifier('subject_key', dialect=dialect)} NOT IN ("
+                + ", ".join(quote_value(x, dialect=dialect) for x in keys)
+                + ");\n"
+            )
+
+        if table != "subjects":
+            to_return += _render_delete(
+                table, keys + removed, dialect=dialect, batch_size=batch_size
+            )
+        elif len(removed) != 0:
+            to_return += _render_delete(
+                table, removed, dialect=dialect, batch_size=batch_size
+            )
+
+    for table in TABLES:
+        to_return += _render_insert(
+            table,
+            rows[table],
+            dialect=dialect,
+            batch_size=batch_size,
+            upsert=upsert and table == "subjects",
+        )
+
+    to_return += "COMMIT;\n"
+
+    return to_return
+
+
+def escape_tsv(value: Optional[str]) -> str:
+    if value is None:
+        return "\\N"
+
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\0", "\\0")
+    )
+
+
+def write_tsv(
+    metas: Dict[str, SubjectMeta],
+    output_folder: Union[Path, str],
+    schema: bool = True,
+    expand: bool = True,
+) -> List[Path]:
+    output_folder = Path(output_folder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    rows = get_rows(metas, expand=expand)
+    written = list()
+
+    load_script = ""
+
+    if schema:
+        load_script += render_schema(dialect="mysql")
+
+    load_script += "START TRANSACTION;\n"
+
+    for table in reversed(list(TABLES)):
+        load_script += _render_delete(table, None, dialect="mysql")
+
+    for table, columns in TABLES.items():
+        path = output_folder / f"{table}.tsv"
+
+        with open(path, mode="w+", encoding="utf8", newline="\n") as f:
+            for row in rows[table]:
+                f.write("\t".join(escape_tsv(x) for x in row) + "\n")
+
+        written.append(path)
+
+        load_script += (
+            f"LOAD DATA LOCAL INFILE {quote_value(os.path.abspath(path))}\n"
+            f"\tINTO TABLE {quote_identifier(table)} CHARACTER SET utf8mb4\n"
+            "\tFIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'\n"
+            "\tLINES TERMINATED BY '\\n'\n"
+            f"\t({', '.join(quote_identifier(name) for name, _ in columns)});\n"
+        )
+
+    load_script += "COMMIT;\n"
+
+    load_path = output_folder / "load.sql"
+
+    with open(load_path, mode="w+", encoding="utf8") as f:
+        f.write(load_script)
+
+    written.append(load_path)
+
+    return written
+
+
+def export_sql(
+    metas: Dict[str, SubjectMeta],
+    output: Union[Path, str],
+    file_format: str = "inserts",
+    dialect: str = "mysql",
+    **kwargs: Any,
+) -> List[Path]:
+    _check_choice(file_format, _FORMATS, "SQL export format")
+
+    if file_format == "tsv":
+        if dialect != "mysql":
+            raise ValueError("TSV exports use LOAD DATA and need the mysql dialect")
+
+        return write_tsv(
+            metas,
+            output,
+            schema=kwargs.get("schema", True),
+            expand=kwargs.get("expand", True),
+        )
+
+    with profiling.timer("render"):
+        rendered = render_inserts(metas, dialect=dialect, **kwargs)
+
+    with open(output, mode="w+", encoding="utf8") as f:
+        profiling.count("bytes_written", f.write(rendered))
+
+    return [Path(output)]
@@ -1,15 +1,55 @@
 import argparse
 import copy
+import functools
+import itertools
 import json
 import sys
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
+import time
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
 
 from unidecode import unidecode
 
 from studosi.constants import regex as regex_constants
-from studosi.materijali.exceptions import AbbreviationCollision
+from studosi.materijali import profiling
+from studosi.materijali.exceptions import AbbreviationCollision, MergeConflict
 from studosi.utils.json_utils import serialize_sets
 
+PROPERTY_WILDCARD = "*"
+
+PropertyRow = Tuple[str, str, str, str, str, str]
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_property_pattern(
+    pattern: str,
+) -> Optional[Tuple[FrozenSet[str], Tuple[Tuple[int, int], ...]]]:
+    if pattern == PROPERTY_WILDCARD:
+        return None
+
+    literals = set()
+    ranges = list()
+
+    for item in regex_constants.PROPERTY_PATTERN_LIST_DELIMITER_REGEX.split(pattern):
+        match = regex_constants.PROPERTY_PATTERN_RANGE_REGEX.fullmatch(item)
+
+        if match is None:
+            literals.add(item)
+        else:
+            ranges.append((int(match.group(1)), int(match.group(2))))
+
+    return frozenset(literals), tuple(ranges)
+
 
 class Subject:
     programs: Dict[str, str] = {
@@ -67,6 +107,8 @@ class Subject:
     def semester(number: int):
         return f"{number}. semestar"
 
+    semesters: Tuple[str, ...] = tuple(str(x) for x in range(1, 13))
+
     groups = {
         # Preddiplomski
         "obavezni": "Obavezni predmeti",
@@ -128,6 +170,7 @@ class Subject:
 
         if existing_abbreviations is not None:
             existing = set(existing_abbreviations)
+            collision_steps = 0
 
             token_pointer = 0
             letter_pointers = [
@@ -138,11 +181,15 @@ class Subject:
 
             while current_suggestion in existing:
                 if all(letter_pointer is None for letter_pointer in letter_pointers):
+                    profiling.count("abbreviation_collision_steps", collision_steps)
+                    profiling.count("abbreviation_collision_failures")
+
                     if return_on_fail:
                         break
 
                     raise AbbreviationCollision(name)
 
+                collision_steps += 1
                 token_pointer = (token_pointer - 1) % nt_length
 
                 token_to_consider = normalized_tokens[token_pointer]
@@ -163,6 +210,8 @@ class Subject:
                     current_suggestion = get_suggestion(abbreviation_tokens)
                 else:
                     letter_pointers[token_pointer] = None
+            else:
+                profiling.count("abbreviation_collision_steps", collision_steps)
 
         return current_suggestion
 
@@ -211,8 +260,23 @@ class SubjectMeta:
         "raise",
     }
 
-    def __init__(self, config: Optional[Dict[str, Any]]):
-        self._config = copy.deepcopy(config)
+    _merge_policies = {
+        "first",
+        "last",
+        "raise",
+    }
+
+    _property_vocabularies = (
+        Subject.programs,
+        Subject.studies,
+        Subject.courses,
+        Subject.modules,
+        Subject.semesters,
+        Subject.groups,
+    )
+
+    def __init__(self, config: Optional[Dict[str, Any]], copy_config: bool = True):
+        self._config = copy.deepcopy(config) if copy_config else config
 
     @staticmethod
     def decorate_parser(
@@ -268,7 +332,9 @@ class SubjectMeta:
                 default=None,
                 help=(
                     "The subject properties. List of strings in the format: "
-                    "program:study:course:module:semester:group"
+                    "program:study:course:module:semester:group. Any field can be "
+                    "`*`, a comma separated list or a range, e.g. "
+                    "`fer2:diplomski:rac:*:1-4:izborni`"
                 ),
             )
 
@@ -408,6 +474,8 @@ class SubjectMeta:
                 f"SubjectMeta action_on_wrong_value must be one of: {error_string}"
             )
 
+        conversion_start = time.perf_counter()
+
         args_dict = vars(args)
         config = dict()
 
@@ -453,6 +521,8 @@ class SubjectMeta:
                 args_dict[related_subjects_argname]
             )
 
+        profiling.record("args_to_config", time.perf_counter() - conversion_start)
+
         if action_on_wrong_value != "nothing":
             validity_result = SubjectMeta.is_valid(config=config)
 
@@ -464,6 +534,116 @@ class SubjectMeta:
 
         return config
 
+    # region Patterns
+    @staticmethod
+    def is_property_pattern(value: str) -> bool:
+        value = str(value)
+
+        return (
+            value == PROPERTY_WILDCARD
+            or regex_constants.PROPERTY_PATTERN_LIST_DELIMITER_REGEX.search(value)
+            is not None
+            or regex_constants.PROPERTY_PATTERN_RANGE_REGEX.fullmatch(value) is not None
+        )
+
+    @staticmethod
+    def property_pattern_matches(pattern: str, value: str) -> bool:
+        parsed = _parse_property_pattern(str(pattern))
+
+        if parsed is None:
+            return True
+
+        literals, ranges = parsed
+        value = str(value)
+
+        if value in literals:
+            return True
+
+        return value.isdigit() and any(
+            low <= int(value) <= high for low, high in ranges
+        )
+
+    @staticmethod
+    def property_row_matches(
+        row: Iterable[str], query: Iterable[Optional[str]]
+    ) -> bool:
+        return all(
+            value is None or SubjectMeta.property_pattern_matches(pattern, value)
+            for pattern, value in zip(row, query)
+        )
+
+    @staticmethod
+    def expand_property_pattern(
+        pattern: str, vocabulary: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        pattern = str(pattern)
+
+        if pattern == PROPERTY_WILDCARD:
+            if vocabulary is None:
+                raise ValueError("A wildcard can only be expanded over a vocabulary")
+
+            return [x for x in vocabulary if x != "_"]
+
+        to_return = list()
+
+        for item in regex_constants.PROPERTY_PATTERN_LIST_DELIMITER_REGEX.split(
+            pattern
+        ):
+            match = regex_constants.PROPERTY_PATTERN_RANGE_REGEX.fullmatch(item)
+
+            if match is None:
+                to_return.append(item)
+            else:
+                to_return.extend(
+                    str(x) for x in range(int(match.group(1)), int(match.group(2)) + 1)
+                )
+
+        return list(dict.fromkeys(to_return))
+
+    @staticmethod
+    def expand_property_row(row: PropertyRow) -> Iterator[PropertyRow]:
+        if not any(SubjectMeta.is_property_pattern(x) for x in row):
+            yield row
+            return
+
+        profiling.count("property_patterns_expanded")
+
+        yield from itertools.product(
+            *(
+                SubjectMeta.expand_property_pattern(x, vocabulary=vocabulary)
+                for x, vocabulary in zip(row, SubjectMeta._property_vocabularies)
+            )
+        )
+
+    @staticmethod
+    def _is_known_property_value(value: str, vocabulary: Iterable[str]) -> bool:
+        if not SubjectMeta.is_property_pattern(value):
+            return value in vocabulary
+
+        parsed = _parse_property_pattern(str(value))
+
+        if parsed is None:
+            return True
+
+        literals, ranges = parsed
+
+        return len(ranges) == 0 and all(x in vocabulary for x in literals)
+
+    @staticmethod
+    def _is_valid_semester_pattern(value: str) -> bool:
+        parsed = _parse_property_pattern(str(value))
+
+        if parsed is None:
+            return True
+
+        literals, ranges = parsed
+
+        return all(x.isdigit() for x in literals) and all(
+            low <= high for low, high in ranges
+        )
+
+    # endregion
+
     # region Properties
     @property
     def config(self) -> Dict[str, Any]:
@@ -491,6 +671,41 @@ class SubjectMeta:
     def related_subjects(self) -> Optional[Dict[str, str]]:
         return self._config.get(SubjectMeta._default_related_subjects_key)
 
+    def iter_property_rows(self, expand: bool = False) -> Iterator[PropertyRow]:
+        properties = self.properties
+
+        if properties is None:
+            return
+
+        for program, program_dict in properties.items():
+            for study, study_dict in program_dict.items():
+                for course, course_dict in study_dict.items():
+                    for module, module_dict in course_dict.items():
+                        for semester, groups in module_dict.items():
+                            for group in groups:
+                                row = (program, study, course, module, semester, group)
+
+                                if expand:
+                                    yield from SubjectMeta.expand_property_row(row)
+                                else:
+                                    yield row
+
+    def matches_properties(
+        self,
+        program: Optional[str] = None,
+        study: Optional[str] = None,
+        course: Optional[str] = None,
+        module: Optional[str] = None,
+        semester: Optional[str] = None,
+        group: Optional[str] = None,
+    ) -> bool:
+        query = (program, study, course, module, semester, group)
+
+        return any(
+            SubjectMeta.property_row_matches(row, query)
+            for row in self.iter_property_rows()
+        )
+
     # endregion
 
     # region Validation
@@ -533,7 +748,7 @@ class SubjectMeta:
             if program is None:
                 raise TypeError("SubjectMeta properties program can't be None")
 
-            if program not in Subject.programs:
+            if not SubjectMeta._is_known_property_value(program, Subject.programs):
                 programs = list(sorted(Subject.programs))
                 error_string = (
                     ", ".join((f"`{x}`" for x in programs[:-1])) + f" or {programs[-1]}"
@@ -549,7 +764,7 @@ class SubjectMeta:
                 if study is None:
                     raise TypeError("SubjectMeta properties study can't be None")
 
-                if study not in Subject.studies:
+                if not SubjectMeta._is_known_property_value(study, Subject.studies):
                     studies = list(sorted(Subject.studies))
                     error_string = (
                         ", ".join((f"`{x}`" for x in studies[:-1]))
@@ -566,7 +781,9 @@ class SubjectMeta:
                     if course is None:
                         raise TypeError("SubjectMeta properties course can't be None")
 
-                    if course not in Subject.courses:
+                    if not SubjectMeta._is_known_property_value(
+                        course, Subject.courses
+                    ):
                         courses = list(sorted(Subject.courses))
                         error_string = (
                             ", ".join((f"`{x}`" for x in courses[:-1]))
@@ -588,7 +805,9 @@ class SubjectMeta:
                                 "SubjectMeta properties module can't be None"
                             )
 
-                        if module not in Subject.modules:
+                        if not SubjectMeta._is_known_property_value(
+                            module, Subject.modules
+                        ):
                             modules = list(sorted(Subject.modules))
                             error_string = (
                                 ", ".join((f"`{x}`" for x in modules[:-1]))
@@ -610,10 +829,21 @@ class SubjectMeta:
                                     "SubjectMeta properties semester can't be None"
                                 )
 
-                            try:
-                                int(semester)
-                            except TypeError:
-                                raise TypeError("Semester must be convertible to int")
+                            if SubjectMeta.is_property_pattern(semester):
+                                if not SubjectMeta._is_valid_semester_pattern(
+                                    semester
+                                ):
+                                    raise ValueError(
+                                        "Semester pattern must be `*` or a comma "
+                                        "separated list of semesters and ranges"
+                                    )
+                            else:
+                                try:
+                                    int(semester)
+                                except TypeError:
+                                    raise TypeError(
+                                        "Semester must be convertible to int"
+                                    )
 
                             groups = module_dict[semester]
 
@@ -623,7 +853,9 @@ class SubjectMeta:
                                         "SubjectMeta properties group can't be None"
                                     )
 
-                                if group not in Subject.groups:
+                                if not SubjectMeta._is_known_property_value(
+                                    group, Subject.groups
+                                ):
                                     groups = list(sorted(Subject.groups))
                                     error_string = (
                                         ", ".join((f"`{x}`" for x in groups[:-1]))
@@ -682,6 +914,7 @@ class SubjectMeta:
                     )
 
     @staticmethod
+    @profiling.timed("validate")
     def is_valid(config: Dict[str, Any]):
         failed = dict()
 
@@ -721,6 +954,106 @@ class SubjectMeta:
 
     # endregion
 
+    # region Merging
+    @staticmethod
+    def _check_merge_policy(policy: str):
+        if policy not in SubjectMeta._merge_policies:
+            policies = list(sorted(SubjectMeta._merge_policies))
+            error_string = (
+                ", ".join((f"`{x}`" for x in policies[:-1])) + f" or {policies[-1]}"
+            )
+
+            raise KeyError(f"SubjectMeta merge policy must be one of: {error_string}")
+
+    @staticmethod
+    def _merge_values(
+        values: List[Tuple[int, Any]],
+        path: Tuple[str, ...],
+        policy: str,
+        conflicts: List[Dict[str, Any]],
+    ) -> Any:
+        # Values taken whole are copied, so editing the result can't touch a source
+        if len(values) == 1:
+            return copy.deepcopy(values[0][1])
+
+        if all(isinstance(x, dict) for _, x in values):
+            grouped = dict()
+
+            for i, value in values:
+                for key, inner in value.items():
+                    if inner is not None:
+                        grouped.setdefault(key, list()).append((i, inner))
+
+            return {
+                key: SubjectMeta._merge_values(
+                    inner_values, path + (str(key),), policy, conflicts
+                )
+                for key, inner_values in grouped.items()
+            }
+
+        if all(isinstance(x, (list, set, tuple, frozenset)) for _, x in values):
+            try:
+                merged = list(dict.fromkeys(item for _, x in values for item in x))
+            except TypeError:
+                merged = None
+
+            if merged is not None:
+                if isinstance(values[0][1], (set, frozenset)):
+                    return set(merged)
+
+                return merged
+
+        first = values[0][1]
+
+        if all(x == first for _, x in values[1:]):
+            return copy.deepcopy(first)
+
+        if policy == "raise":
+            raise MergeConflict(path, [x for _, x in values])
+
+        chosen = first if policy == "first" else values[-1][1]
+        conflicts.append(
+            {
+                "path": list(path),
+                "values": [{"source": i, "value": x} for i, x in values],
+                "chosen": chosen,
+            }
+        )
+        profiling.count("merge_conflicts")
+
+        return copy.deepcopy(chosen)
+
+    @staticmethod
+    def merge(
+        metas: Iterable["SubjectMeta"],
+        policy: str = "last",
+        policies: Optional[Dict[str, str]] = None,
+    ) -> Tuple["SubjectMeta", List[Dict[str, Any]]]:
+        policies = dict() if policies is None else policies
+
+        for x in [policy, *policies.values()]:
+            SubjectMeta._check_merge_policy(x)
+
+        with profiling.timer("merge"):
+            grouped = dict()
+
+            for i, meta in enumerate(metas):
+                for key, value in (meta._config or dict()).items():
+                    if value is not None:
+                        grouped.setdefault(key, list()).append((i, value))
+
+            conflicts = list()
+            config = {
+                key: SubjectMeta._merge_values(
+                    values, (key,), policies.get(key, policy), conflicts
+                )
+                for key, values in grouped.items()
+            }
+
+        return SubjectMeta(config=config, copy_config=False), conflicts
+
+    # endregion
+
     def dumps(self) -> str:
         return json.dumps(
             self.config,
@@ -732,3 +1065,12 @@ class SubjectMeta:
             default=serialize_sets,
             sort_keys=False,
         )
+
+    @staticmethod
+    def loads(dumped: str) -> "SubjectMeta":
+        config = json.loads(dumped)
+
+        if not isinstance(config, dict):
+            raise ValueError("SubjectMeta config must be a JSON object")
+
+        return SubjectMeta(config=config, copy_config=False)
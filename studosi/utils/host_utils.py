@@ -0,0 +1,14 @@
+import os
+
+
+def get_memory_total() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return 1024**3
+
+
+def get_cpu_count() -> int:
+    cpu_count = os.cpu_count()
+
+    return 1 if cpu_count is None else cpu_count
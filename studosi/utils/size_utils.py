@@ -0,0 +1,34 @@
+import re
+
+_SIZE_REGEX = re.compile(r"\s*(\d+)\s*([KMGT]?)B?\s*", flags=re.IGNORECASE)
+_SIZE_MULTIPLIERS = {
+    "": 1,
+    "K": 1024,
+    "M": 1024**2,
+    "G": 1024**3,
+    "T": 1024**4,
+}
+
+
+def parse_size(size) -> int:
+    if isinstance(size, int):
+        return size
+
+    match = _SIZE_REGEX.fullmatch(str(size))
+
+    if match is None:
+        raise ValueError(f"Can't parse `{size}` as a size, expected e.g. `256M`")
+
+    return int(match.group(1)) * _SIZE_MULTIPLIERS[match.group(2).upper()]
+
+
+def format_size(size: int, unit: str = "M") -> str:
+    unit = unit.upper()
+
+    if unit not in _SIZE_MULTIPLIERS:
+        units = list(sorted(_SIZE_MULTIPLIERS))
+        error_string = ", ".join((f"`{x}`" for x in units[:-1])) + f" or {units[-1]}"
+
+        raise KeyError(f"Size unit must be one of: {error_string}")
+
+    return f"{max(0, int(size)) // _SIZE_MULTIPLIERS[unit]}{unit}"
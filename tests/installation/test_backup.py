@@ -0,0 +1,189 @@
+import os
+import re
+import subprocess
+import sys
+
+from studosi.installation.database.mysql.ubuntu.backup import (
+    generate_backup,
+    generate_restore,
+)
+
+FAKE_MYSQL = r"""
+import os
+import re
+import sys
+import time
+
+
+def log(event):
+    with open(os.environ["FAKE_LOG"], "a", encoding="utf8") as file:
+        file.write(event + "\n")
+
+
+def answer(*lines):
+    for line in lines:
+        print(line, flush=True)
+
+
+tables = [x.split(".") for x in os.environ["FAKE_TABLES"].split()]
+
+if "-e" in sys.argv:
+    query = sys.argv[sys.argv.index("-e") + 1]
+
+    if "information_schema.schemata" in query:
+        answer(*sorted({database for database, _ in tables}))
+    elif "information_schema.columns" in query:
+        for database, table in tables:
+            answer(f"{database}\t{table}\tid\tint")
+            answer(f"{database}\t{table}\tdata\tblob")
+    else:
+        answer(*(f"{database}\t{table}" for database, table in tables))
+elif "--unbuffered" in sys.argv:
+    for line in sys.stdin:
+        marker = re.fullmatch(r"SELECT '(studosi-[^']*)';", line.strip())
+
+        if marker:
+            answer(marker.group(1))
+        elif "FLUSH TABLES WITH READ LOCK" in line:
+            log("lock")
+            answer("locked")
+        elif "UNLOCK TABLES" in line:
+            log("unlock")
+        elif "CONSISTENT SNAPSHOT" in line:
+            log("snapshot")
+            answer("ready")
+        elif line.startswith("SELECT CONCAT("):
+            database, table = re.search(r"FROM `(\w+)`\.`(\w+)`;", line).groups()
+
+            if table == "broken":
+                sys.exit(1)
+            if table == "slow":
+                time.sleep(1)
+
+            log(f"dump {database}.{table}")
+            answer(f"INSERT INTO `{table}` (`id`, `data`) VALUES ('1', NULL);")
+else:
+    log(" ".join(("restore", *sys.argv[1:], *sys.stdin.read().split())))
+"""
+
+FAKE_MYSQLDUMP = r"""
+import os
+import sys
+
+with open(os.environ["FAKE_LOG"], "a", encoding="utf8") as file:
+    kind = "triggers" if "--triggers" in sys.argv else "schema"
+    file.write(f"{kind} {sys.argv[-1]}\n")
+
+print(f"-- {kind} of {sys.argv[-1]}")
+"""
+
+
+def run_script(tmp_path, script, tables, *args):
+    bin_folder = tmp_path / "bin"
+    bin_folder.mkdir(exist_ok=True)
+
+    for name, source in (("mysql", FAKE_MYSQL), ("mysqldump", FAKE_MYSQLDUMP)):
+        (bin_folder / name).write_text(f"#!{sys.executable}\n{source}", "utf8")
+        (bin_folder / name).chmod(0o755)
+
+    (tmp_path / "script.sh").write_text(script, encoding="utf8")
+
+    env = dict(os.environ)
+    env["PATH"] = f"{bin_folder}{os.pathsep}{env['PATH']}"
+    env["FAKE_LOG"] = str(tmp_path / "log.txt")
+    env["FAKE_TABLES"] = " ".join(tables)
+
+    return subprocess.run(
+        ["bash", str(tmp_path / "script.sh"), *args],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=60,
+    )
+
+
+def get_log(tmp_path):
+    return (tmp_path / "log.txt").read_text(encoding="utf8").splitlines()
+
+
+def test_backup_unlocks_once_every_worker_has_a_snapshot(tmp_path):
+    script = generate_backup(
+        str(tmp_path / "backups"), jobs=2, compression="none", lock_timeout=10
+    )
+    tables = ("app.slow", "app.fast", "app.other")
+    result = run_script(tmp_path, script, tables)
+
+    assert result.returncode == 0, result.stderr.decode()
+
+    log = get_log(tmp_path)
+    unlock = log.index("unlock")
+
+    assert log[0] == "lock"
+    assert log.count("snapshot") == 2
+    assert all(i < unlock for i, x in enumerate(log) if x == "snapshot")
+    assert log.index("schema app") < unlock
+    assert log.index("triggers app") < unlock
+    assert unlock < log.index("dump app.slow")
+
+    backup = tmp_path / "backups" / "latest"
+
+    assert sorted(x.name for x in backup.iterdir()) == [
+        "app",
+        "columns.tsv",
+        "databases.txt",
+        "tables.tsv",
+    ]
+    assert sorted(x.name for x in (backup / "app").iterdir()) == [
+        "fast.sql",
+        "other.sql",
+        "schema.sql",
+        "slow.sql",
+        "triggers.sql",
+    ]
+    assert (backup / "app" / "slow.sql").read_text(encoding="utf8") == (
+        "INSERT INTO `slow` (`id`, `data`) VALUES ('1', NULL);\n"
+    )
+
+
+def test_inconsistent_backup_skips_the_lock(tmp_path):
+    script = generate_backup(
+        str(tmp_path / "backups"), jobs=2, compression="none", consistent=False
+    )
+    result = run_script(tmp_path, script, ("app.fast",))
+
+    assert result.returncode == 0, result.stderr.decode()
+    assert "lock" not in get_log(tmp_path)
+    assert "unlock" not in get_log(tmp_path)
+    assert (tmp_path / "backups" / "latest" / "app" / "fast.sql").exists()
+
+
+def test_failed_backup_stays_partial(tmp_path):
+    script = generate_backup(
+        str(tmp_path / "backups"), jobs=2, compression="none", lock_timeout=10
+    )
+    result = run_script(tmp_path, script, ("app.fast", "app.broken"))
+
+    assert result.returncode != 0
+    assert not (tmp_path / "backups" / "latest").exists()
+    assert [x.suffix for x in (tmp_path / "backups").iterdir()] == [".partial"]
+
+
+def test_restore_loads_tables_between_schemas_and_triggers(tmp_path):
+    tables = ("app.fast", "app.other")
+    backup = generate_backup(str(tmp_path / "backups"), compression="none")
+    restore = generate_restore(str(tmp_path / "backups"), compression="none")
+
+    assert run_script(tmp_path, backup, tables).returncode == 0
+
+    (tmp_path / "log.txt").unlink()
+    result = run_script(tmp_path, restore, tables)
+
+    assert result.returncode == 0, result.stderr.decode()
+
+    log = [x for x in get_log(tmp_path) if x.startswith("restore")]
+
+    assert len(log) == 4
+    assert log[0] == "restore -- schema of app"
+    assert re.search(r"SET SESSION foreign_key_checks = 0;.*INSERT INTO", log[1])
+    assert re.search(r"SET SESSION foreign_key_checks = 0;.*INSERT INTO", log[2])
+    assert log[3] == "restore app -- triggers of app"
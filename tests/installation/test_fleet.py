@@ -0,0 +1,69 @@
+import pytest
+
+from studosi.installation.fleet import (
+    has_secrets,
+    render_fleet,
+    resolve_hosts,
+    write_fleet,
+)
+
+
+@pytest.mark.parametrize(
+    "settings",
+    (
+        {"tune_php": True, "cpu_count": 2},
+        {"tune_database": True, "memory_total": "4G"},
+        {"configure_nginx": True},
+    ),
+)
+def test_tuned_hosts_need_their_resources(settings):
+    with pytest.raises(KeyError, match="`web`"):
+        resolve_hosts({"hosts": {"web": settings}})
+
+
+def test_tuned_hosts_with_resources_resolve():
+    hosts = resolve_hosts(
+        {
+            "defaults": {"tune_php": True, "tune_database": True},
+            "hosts": {"web": {"memory_total": "4G", "cpu_count": 2}},
+        }
+    )
+
+    assert hosts["web"]["memory_total"] == "4G"
+    assert hosts["web"]["cpu_count"] == 2
+
+
+def test_limit_skips_other_hosts():
+    hosts = resolve_hosts(
+        {"hosts": {"web": {"configure_nginx": True}, "db": dict()}}, limit=["db"]
+    )
+
+    assert list(hosts) == ["db"]
+
+
+def test_secrets_stay_out_of_settings_and_other_users_files(tmp_path):
+    hosts = resolve_hosts(
+        {
+            "hosts": {
+                "db": {"secure_database": True, "database_root_password": "secret"},
+                "web": dict(),
+            }
+        }
+    )
+    rendered = render_fleet(hosts, jobs=1)
+    private_hosts = [name for name, settings in hosts.items() if has_secrets(settings)]
+
+    assert private_hosts == ["db"]
+    assert "secret" not in rendered["db"]["settings.json"]
+    assert "secret" in rendered["db"]["steps/database.sh"]
+
+    write_fleet(rendered, tmp_path, jobs=1, private_hosts=private_hosts)
+
+    def get_mode(path):
+        return (tmp_path / path).stat().st_mode & 0o777
+
+    assert get_mode("db/provision.sh") == 0o700
+    assert get_mode("db/steps/database.sh") == 0o700
+    assert get_mode("db/settings.json") == 0o600
+    assert get_mode("web/provision.sh") == 0o755
+    assert get_mode("web/settings.json") == 0o644
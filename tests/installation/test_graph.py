@@ -0,0 +1,82 @@
+import subprocess
+import sys
+
+import pytest
+
+from studosi.installation.exceptions import StepCycle
+from studosi.installation.graph import StepGraph
+from studosi.installation.scripts import generate_stack as generate_stack_script
+
+
+def get_graph() -> StepGraph:
+    graph = StepGraph()
+    graph.add_step("packages", 'echo packages >>"$STUDOSI_TEST_LOG"')
+    graph.add_step("nginx", 'echo nginx >>"$STUDOSI_TEST_LOG"', ("packages",))
+    graph.add_step("php", 'echo php >>"$STUDOSI_TEST_LOG"', ("packages",))
+    graph.add_step("site", 'echo site >>"$STUDOSI_TEST_LOG"', ("nginx", "php"))
+
+    return graph
+
+
+def test_levels_are_topological_waves():
+    assert get_graph().levels() == [["packages"], ["nginx", "php"], ["site"]]
+
+
+def test_cycles_are_rejected():
+    graph = StepGraph()
+    graph.add_step("first", ":", ("second",))
+    graph.add_step("second", ":", ("first",))
+
+    with pytest.raises(StepCycle):
+        graph.levels()
+
+
+def test_rendered_script_dry_run_and_waves(tmp_path):
+    script_path = tmp_path / "stack.sh"
+    script_path.write_text(get_graph().render(), encoding="utf8")
+    environment = {
+        "PATH": "/usr/bin:/bin",
+        "STUDOSI_TEST_LOG": str(tmp_path / "steps.log"),
+        "STUDOSI_STEP_LOG_DIR": str(tmp_path / "logs"),
+    }
+
+    dry_run = subprocess.run(
+        ["bash", str(script_path), "--dry-run"],
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert dry_run.stdout == (
+        "wave 1:\n"
+        "\tpackages\n"
+        "wave 2:\n"
+        "\tnginx <- packages\n"
+        "\tphp <- packages\n"
+        "wave 3:\n"
+        "\tsite <- nginx, php\n"
+    )
+    assert not (tmp_path / "steps.log").exists()
+
+    subprocess.run(["bash", str(script_path)], env=environment, check=True)
+    steps = (tmp_path / "steps.log").read_text(encoding="utf8").split()
+
+    assert steps[0] == "packages"
+    assert sorted(steps[1:3]) == ["nginx", "php"]
+    assert steps[3] == "site"
+
+
+def test_generate_stack_dry_run(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["generate_stack", "--dry_run"])
+
+    generate_stack_script.main()
+
+    assert capsys.readouterr().out == (
+        "wave 1:\n"
+        "\tpackages\n"
+        "wave 2:\n"
+        "\tnginx <- packages\n"
+        "\tphp <- packages\n"
+        "\tdatabase <- packages\n"
+    )
@@ -0,0 +1,124 @@
+from studosi.installation.server.nginx.ubuntu.configuration import (
+    render_nginx_conf,
+    render_site,
+)
+
+NGINX_CONF = (
+    "user www-data;\n"
+    "worker_processes 2;\n"
+    "worker_rlimit_nofile 8192;\n"
+    "pid /run/nginx.pid;\n"
+    "error_log /var/log/nginx/error.log;\n"
+    "\n"
+    "events {\n"
+    "\tworker_connections 4096;\n"
+    "\tmulti_accept on;\n"
+    "}\n"
+    "\n"
+    "http {\n"
+    "\tsendfile on;\n"
+    "\tsendfile_max_chunk 1m;\n"
+    "\ttcp_nopush on;\n"
+    "\ttcp_nodelay on;\n"
+    "\tkeepalive_timeout 30;\n"
+    "\tkeepalive_requests 1000;\n"
+    "\ttypes_hash_max_size 2048;\n"
+    "\tserver_tokens off;\n"
+    "\tclient_max_body_size 100m;\n"
+    "\n"
+    "\tinclude /etc/nginx/mime.types;\n"
+    "\tdefault_type application/octet-stream;\n"
+    "\n"
+    "\taccess_log /var/log/nginx/access.log;\n"
+    "\n"
+    "\tgzip on;\n"
+    "\tgzip_static on;\n"
+    "\tgzip_vary on;\n"
+    "\tgzip_proxied any;\n"
+    "\tgzip_comp_level 5;\n"
+    "\tgzip_min_length 256;\n"
+    "\tgzip_types text/plain text/css text/xml application/json "
+    "application/javascript application/xml image/svg+xml;\n"
+    "\n"
+    "\topen_file_cache max=10000 inactive=60s;\n"
+    "\topen_file_cache_valid 120s;\n"
+    "\topen_file_cache_min_uses 2;\n"
+    "\topen_file_cache_errors on;\n"
+    "\n"
+    "\tfastcgi_cache_path /var/cache/nginx/fastcgi levels=1:2 "
+    "keys_zone=studosi:64m max_size=256m inactive=60m use_temp_path=off;\n"
+    '\tfastcgi_cache_key "$scheme$request_method$host$request_uri";\n'
+    "\n"
+    "\tinclude /etc/nginx/conf.d/*.conf;\n"
+    "\tinclude /etc/nginx/sites-enabled/*;\n"
+    "}\n"
+)
+
+SITE = (
+    "server {\n"
+    "\tlisten 80;\n"
+    "\tlisten [::]:80;\n"
+    "\tserver_name studosi.example;\n"
+    "\n"
+    "\troot /var/www/studosi/public;\n"
+    "\tindex index.php index.html;\n"
+    "\n"
+    "\tset $skip_cache 0;\n"
+    "\n"
+    "\tif ($request_method !~ ^(GET|HEAD)$) {\n"
+    "\t\tset $skip_cache 1;\n"
+    "\t}\n"
+    "\n"
+    '\tif ($http_cookie ~* "PHPSESSID") {\n'
+    "\t\tset $skip_cache 1;\n"
+    "\t}\n"
+    "\n"
+    "\tlocation /materijali/ {\n"
+    "\t\talias /var/www/materijali/;\n"
+    '\t\tadd_header Cache-Control "public, max-age=2592000";\n'
+    "\n"
+    "\t\tlocation ~ /meta\\.json$ {\n"
+    '\t\t\tadd_header Cache-Control "public, max-age=3600";\n'
+    "\t\t}\n"
+    "\t}\n"
+    "\n"
+    "\tlocation / {\n"
+    "\t\ttry_files $uri $uri/ /index.php?$query_string;\n"
+    "\t}\n"
+    "\n"
+    "\tlocation ~ \\.php$ {\n"
+    "\t\ttry_files $uri =404;\n"
+    "\t\tinclude fastcgi_params;\n"
+    "\t\tfastcgi_param SCRIPT_FILENAME $realpath_root$fastcgi_script_name;\n"
+    "\t\tfastcgi_pass unix:/run/php/php8.1-fpm.sock;\n"
+    "\t\tfastcgi_keep_conn on;\n"
+    "\n"
+    "\t\tfastcgi_cache studosi;\n"
+    "\t\tfastcgi_cache_valid 200 301 302 10m;\n"
+    "\t\tfastcgi_cache_bypass $skip_cache;\n"
+    "\t\tfastcgi_no_cache $skip_cache;\n"
+    "\t\tfastcgi_cache_use_stale error timeout updating http_500;\n"
+    "\t\tfastcgi_cache_lock on;\n"
+    "\t\tadd_header X-Cache-Status $upstream_cache_status;\n"
+    "\t}\n"
+    "\n"
+    "\tlocation ~ /\\.(?!well-known) {\n"
+    "\t\tdeny all;\n"
+    "\t}\n"
+    "}\n"
+)
+
+
+def test_nginx_conf_matches_the_snapshot():
+    assert render_nginx_conf(cpu_count=2) == NGINX_CONF
+
+
+def test_site_matches_the_snapshot():
+    assert render_site(php_version="8.1", server_name="studosi.example") == SITE
+
+
+def test_materijali_send_a_single_cache_control_header():
+    site = render_site()
+
+    assert "expires" not in site
+    assert site.count("add_header Cache-Control") == 2
@@ -0,0 +1,16 @@
+from studosi.installation.backend.php.ubuntu.generation import (
+    generate_setup,
+    get_ini_edits,
+)
+
+
+def test_fix_pathinfo_follows_the_setting():
+    assert get_ini_edits()["cgi.fix_pathinfo"] == "0"
+    assert get_ini_edits(cgi_fix_pathinfo=True)["cgi.fix_pathinfo"] == "1"
+
+
+def test_setup_patches_fpm_and_cli():
+    script = generate_setup(version="8.1")
+
+    assert "/etc/php/8.1/fpm/php.ini" in script
+    assert "/etc/php/8.1/cli/php.ini" in script
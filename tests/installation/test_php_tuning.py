@@ -0,0 +1,24 @@
+import pytest
+
+from studosi.installation.backend.php.ubuntu.tuning import compute_pool_settings
+
+
+def test_unlimited_memory_limit_uses_the_estimate():
+    settings = compute_pool_settings(
+        memory_total="4G",
+        cpu_count=2,
+        memory_limit="-1",
+        unlimited_process_memory="128M",
+    )
+
+    assert settings == compute_pool_settings(
+        memory_total="4G", cpu_count=2, memory_limit="128M"
+    )
+
+
+@pytest.mark.parametrize("memory_limit", ("0", 0, "0M", "-2"))
+def test_non_positive_memory_limit_is_rejected(memory_limit):
+    with pytest.raises(ValueError, match="memory_limit"):
+        compute_pool_settings(
+            memory_total="4G", cpu_count=2, memory_limit=memory_limit
+        )
@@ -0,0 +1,25 @@
+from studosi.constants.installation.database.mysql.ubuntu import ROOT_DEFAULTS_FILE
+from studosi.installation.database.mysql.ubuntu.generation import (
+    generate_secure_setup,
+    generate_secure_setup_sql,
+)
+
+
+def test_old_mariadb_gets_a_password_it_can_parse():
+    sql = generate_secure_setup_sql(
+        new_root_password="secret", before_mariadb_10_4=True
+    )
+
+    assert "IDENTIFIED VIA" not in sql
+    assert "SET PASSWORD FOR 'root'@'localhost' = PASSWORD('secret');" in sql
+
+
+def test_mariadb_setup_branches_on_the_server_version():
+    script = generate_secure_setup(new_root_password="secret")
+    _, branches = script.split("SELECT VERSION()")
+    modern, legacy = branches.split("\nelse\n", 1)
+    legacy, rest = legacy.split("\nfi\n", 1)
+
+    assert "IDENTIFIED VIA unix_socket OR mysql_native_password" in modern
+    assert "IDENTIFIED VIA" not in legacy
+    assert f"tee {ROOT_DEFAULTS_FILE}" in rest
@@ -0,0 +1,76 @@
+import zipfile
+
+from studosi.materijali.bundle import build_bundles
+
+
+def make_root(root):
+    (root / "ANA").mkdir(parents=True)
+    (root / "ANA" / "meta.json").write_text(
+        '{"name": "Analiza", "abbreviation": "ANA"}', encoding="utf8"
+    )
+    (root / "ANA" / "notes.txt").write_text("integral " * 1000, encoding="utf8")
+    (root / "ANA" / "scan.pdf").write_bytes(b"%PDF-1.4\n" * 100)
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    make_root(tmp_path / "root")
+
+    result = build_bundles(tmp_path / "root", tmp_path / "bundles", dry_run=True)
+
+    assert result["built"] == ["ANA"]
+    assert not (tmp_path / "root" / "manifest.json").exists()
+    assert not (tmp_path / "bundles").exists()
+
+
+def test_bundles_use_the_compression_level(tmp_path):
+    make_root(tmp_path / "root")
+    sizes = dict()
+
+    for compression_level in (0, 9):
+        build_bundles(
+            tmp_path / "root",
+            tmp_path / "bundles",
+            compression_level=compression_level,
+            full=True,
+        )
+
+        with zipfile.ZipFile(tmp_path / "bundles" / "ANA.zip") as archive:
+            infos = {x.filename: x for x in archive.infolist()}
+
+            assert archive.read("ANA/notes.txt") == ("integral " * 1000).encode(
+                "utf8"
+            )
+
+        assert infos["ANA/notes.txt"].compress_type == zipfile.ZIP_DEFLATED
+        assert infos["ANA/scan.pdf"].compress_type == zipfile.ZIP_STORED
+        sizes[compression_level] = infos["ANA/notes.txt"].compress_size
+
+    assert sizes[9] < sizes[0]
+    assert (tmp_path / "root" / "manifest.json").is_file()
+
+
+def test_unsafe_abbreviations_stay_in_the_output_folder(tmp_path):
+    (tmp_path / "root" / "ANA").mkdir(parents=True)
+    (tmp_path / "root" / "ANA" / "meta.json").write_text(
+        '{"name": "Analiza", "abbreviation": "../escaped"}', encoding="utf8"
+    )
+    (tmp_path / "root" / "ANA" / "notes.txt").write_text("integral", encoding="utf8")
+    (tmp_path / "bundles").mkdir()
+    (tmp_path / "bundles" / "bundles.json").write_text(
+        '{"bundles": {"../victim": "0"}}', encoding="utf8"
+    )
+    (tmp_path / "victim.zip").write_bytes(b"keep me")
+
+    result = build_bundles(tmp_path / "root", tmp_path / "bundles")
+
+    assert result["built"] == ["../escaped"]
+    assert result["removed"] == ["../victim"]
+    assert not (tmp_path / "escaped.zip").exists()
+    assert (tmp_path / "victim.zip").read_bytes() == b"keep me"
+
+    (bundle,) = [x for x in (tmp_path / "bundles").iterdir() if x.suffix == ".zip"]
+
+    assert bundle.name.startswith("_escaped-")
+
+    with zipfile.ZipFile(bundle) as archive:
+        assert all(x.startswith(f"{bundle.stem}/") for x in archive.namelist())
@@ -0,0 +1,107 @@
+import pytest
+
+from studosi.materijali.catalog import (
+    Catalog,
+    catalog_to_json,
+    dumps_catalog,
+    json_to_catalog,
+    save_catalog,
+)
+from studosi.materijali.exceptions import CatalogFormatError
+from studosi.materijali.subject import SubjectMeta
+
+
+def get_configs():
+    return {
+        "ANA": {
+            "name": "Analiza",
+            "abbreviation": "ANA",
+            "properties": {
+                "fer2": {"diplomski": {"rac": {"zop": {"1": ["obavezni"]}}}}
+            },
+            "links": {"fer": {"web": "https://www.fer.unizg.hr/predmet/ana"}},
+            "related_subjects": {"fer2": {"BAZ": "prerequisite"}},
+            "tags": ["math"],
+            "credits": 5,
+        },
+        "BAZ": {
+            "name": None,
+            "abbreviation": "BAZ",
+            "properties": {
+                "fer2": {"diplomski": {"rac": {"zom": {"2": ["obavezni"]}}}}
+            },
+        },
+        "FMUOS": {
+            "name": "Formalne metode",
+            "abbreviation": "FMUOS",
+            "properties": {"fer2": {"diplomski": {"rac": {"*": {"1-3": ["izborni"]}}}}},
+        },
+        "OLD": {"abbreviation": "OLD", "properties": dict()},
+    }
+
+
+def get_catalog():
+    return Catalog(
+        dumps_catalog(
+            {key: SubjectMeta(config=config) for key, config in get_configs().items()}
+        )
+    )
+
+
+def test_catalog_round_trips_every_config():
+    catalog = get_catalog()
+
+    assert len(catalog) == 4
+    assert catalog.keys() == ["ANA", "BAZ", "FMUOS", "OLD"]
+
+    for key, config in get_configs().items():
+        assert catalog[key].config == config
+
+
+def test_json_round_trips_through_the_catalog():
+    configs = get_configs()
+
+    assert catalog_to_json(Catalog(json_to_catalog(configs))) == configs
+
+
+def test_select_matches_patterns():
+    catalog = get_catalog()
+
+    assert catalog.select(module="zop") == ["ANA", "FMUOS"]
+    assert catalog.select(module="zom", semester="2") == ["BAZ", "FMUOS"]
+    assert catalog.select(semester="3", group="izborni") == ["FMUOS"]
+    assert catalog.select(program="fer3") == list()
+
+
+def test_open_reads_a_saved_catalog(tmp_path):
+    configs = get_configs()
+    save_catalog(
+        {key: SubjectMeta(config=config) for key, config in configs.items()},
+        tmp_path / "catalog.bin",
+    )
+
+    with Catalog.open(tmp_path / "catalog.bin") as catalog:
+        assert "FMUOS" in catalog
+        assert "MISSING" not in catalog
+        assert catalog.get("MISSING") is None
+        assert catalog.get("BAZ").config == configs["BAZ"]
+
+        with pytest.raises(KeyError):
+            catalog["MISSING"]
+
+
+@pytest.mark.parametrize(
+    "mangle",
+    (
+        lambda x: b"",
+        lambda x: x[:10],
+        lambda x: x[: len(x) // 2],
+        lambda x: x[:-1],
+        lambda x: b"NOTCATLG" + x[8:],
+    ),
+)
+def test_broken_catalogs_are_rejected(tmp_path, mangle):
+    (tmp_path / "catalog.bin").write_bytes(mangle(json_to_catalog(get_configs())))
+
+    with pytest.raises(CatalogFormatError):
+        Catalog.open(tmp_path / "catalog.bin")
@@ -0,0 +1,60 @@
+import os
+
+from studosi.materijali import dedup
+from studosi.materijali.dedup import find_duplicates, link_duplicates
+
+
+def make_root(root):
+    (root / "ANA").mkdir(parents=True)
+
+    for name in ("a.pdf", "c.pdf", "e.pdf"):
+        (root / "ANA" / name).write_bytes(b"skripta" * 100)
+
+    os.link(root / "ANA" / "a.pdf", root / "ANA" / "b.pdf")
+    os.link(root / "ANA" / "c.pdf", root / "ANA" / "d.pdf")
+
+
+def test_bytes_saved_counts_each_inode_once(tmp_path):
+    make_root(tmp_path)
+
+    result = link_duplicates(tmp_path, find_duplicates(tmp_path))
+
+    assert sorted(result["linked"]) == ["ANA/c.pdf", "ANA/d.pdf", "ANA/e.pdf"]
+    assert result["bytes_saved"] == 2 * 700
+    assert len({os.stat(x).st_ino for x in (tmp_path / "ANA").iterdir()}) == 1
+
+
+def test_hardlink_retries_taken_temporary_names(tmp_path, monkeypatch):
+    (tmp_path / "source").write_bytes(b"a")
+    (tmp_path / "target").write_bytes(b"b")
+    (tmp_path / ".target.taken").write_bytes(b"c")
+
+    names = iter(("taken", "free"))
+    monkeypatch.setattr(dedup.secrets, "token_hex", lambda _: next(names))
+
+    dedup._replace_with_hardlink(str(tmp_path / "source"), str(tmp_path / "target"))
+
+    assert (tmp_path / "target").read_bytes() == b"a"
+    assert (tmp_path / ".target.taken").read_bytes() == b"c"
+    assert not (tmp_path / ".target.free").exists()
+
+
+def test_changed_keep_file_fails_the_group(tmp_path):
+    (tmp_path / "ANA").mkdir()
+
+    for name in ("a.pdf", "b.pdf"):
+        (tmp_path / "ANA" / name).write_bytes(b"skripta" * 100)
+
+    duplicates = find_duplicates(tmp_path)
+    keep_path = tmp_path / duplicates[0]["keep"]["path"]
+    keep_path.write_bytes(b"nova skripta" * 100)
+
+    result = link_duplicates(tmp_path, duplicates)
+
+    assert result["linked"] == []
+    assert result["bytes_saved"] == 0
+    assert list(result["failed"]) == [duplicates[0]["duplicates"][0]["path"]]
+    assert {x.read_bytes() for x in (tmp_path / "ANA").iterdir()} == {
+        b"skripta" * 100,
+        b"nova skripta" * 100,
+    }
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from studosi.materijali.diff import load_source
+from studosi.materijali.exceptions import AbbreviationCollision
+
+
+def test_duplicate_abbreviations_are_rejected(tmp_path):
+    (tmp_path / "catalog.json").write_text(
+        json.dumps(
+            {
+                "Analiza": {"name": "Analiza 1", "abbreviation": "ANA"},
+                "Analiza2": {"name": "Analiza 2", "abbreviation": "ANA"},
+            }
+        ),
+        encoding="utf8",
+    )
+
+    with pytest.raises(AbbreviationCollision, match="`Analiza` and `Analiza2`"):
+        load_source(tmp_path / "catalog.json")
+
+
+def test_folders_without_abbreviations_keep_their_names(tmp_path):
+    for folder in ("ANA", "Baze"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "meta.json").write_text(
+            json.dumps({"name": folder}), encoding="utf8"
+        )
+
+    assert sorted(load_source(tmp_path)) == ["ANA", "Baze"]
@@ -0,0 +1,137 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+
+from studosi.materijali.links import check_links
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self, status: int, headers=()):
+        server = self.server
+
+        with server.lock:
+            server.requests.append((self.command, self.path))
+            server.hosts.append(self.headers["Host"].split(":", 1)[0])
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+
+        try:
+            if self.path.startswith("/slower"):
+                time.sleep(0.2)
+            elif self.path.startswith("/slow"):
+                time.sleep(0.05)
+
+            self.send_response(status)
+
+            for name, value in headers:
+                self.send_header(name, value)
+
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def route(self):
+        path = self.path.split("?", 1)[0]
+
+        if path in ("/ok", "/slow", "/slower"):
+            self.respond(200)
+        elif path == "/no_head":
+            self.respond(405 if self.command == "HEAD" else 200)
+        elif path == "/redirect":
+            self.respond(302, (("Location", "/ok"),))
+        elif path == "/loop":
+            self.respond(301, (("Location", "/loop"),))
+        else:
+            self.respond(404)
+
+    do_HEAD = route
+    do_GET = route
+
+
+@pytest.fixture()
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = list()
+    server.hosts = list()
+    server.active = 0
+    server.max_active = 0
+
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def get_url(server, path: str, host: str = "127.0.0.1") -> str:
+    return f"http://{host}:{server.server_address[1]}{path}"
+
+
+def test_head_falls_back_to_get(server):
+    url = get_url(server, "/no_head")
+    result = check_links([url], timeout=5)[url]
+
+    assert result["ok"] and result["status"] == 200
+    assert server.requests == [("HEAD", "/no_head"), ("GET", "/no_head")]
+
+
+def test_redirects_are_followed(server):
+    url = get_url(server, "/redirect")
+    result = check_links([url], timeout=5)[url]
+
+    assert result["ok"]
+    assert result["final_url"] == get_url(server, "/ok")
+
+
+def test_redirect_loops_and_missing_pages_are_broken(server):
+    loop_url, missing_url = get_url(server, "/loop"), get_url(server, "/missing")
+    results = check_links([loop_url, missing_url], timeout=5, max_redirects=3)
+
+    assert not results[loop_url]["ok"]
+    assert "redirects" in results[loop_url]["error"]
+    assert not results[missing_url]["ok"]
+    assert results[missing_url]["status"] == 404
+    assert ("GET", "/missing") in server.requests
+
+
+def test_concurrent_urls_respect_the_per_host_limit(server):
+    urls = [get_url(server, f"/slow?i={i}") for i in range(20)]
+    results = check_links(urls, timeout=5, per_host=4)
+
+    assert list(results) == urls
+    assert all(x["ok"] for x in results.values())
+    assert len(server.requests) == 20
+    assert 1 < server.max_active <= 4
+
+
+def test_waiting_for_a_busy_host_does_not_time_out(server):
+    urls = [get_url(server, f"/slower?i={i}") for i in range(8)]
+    results = check_links(urls, timeout=0.5, per_host=1)
+
+    assert [x["error"] for x in results.values()] == [None] * 8
+    assert all(x["ok"] for x in results.values())
+
+
+def test_a_busy_host_does_not_starve_other_hosts(server):
+    urls = [get_url(server, f"/slower?i={i}") for i in range(6)]
+    urls.append(get_url(server, "/ok", host="localhost"))
+    results = check_links(urls, timeout=5, concurrency=2, per_host=1)
+
+    assert all(x["ok"] for x in results.values())
+    assert server.hosts.index("localhost") < 2
@@ -0,0 +1,17 @@
+from studosi.materijali.subject import SubjectMeta
+
+
+def test_merged_meta_doesnt_share_values_with_its_sources():
+    properties = {"fer2": {"diplomski": {"rac": {"zop": {"1": ["obavezni"]}}}}}
+    first = SubjectMeta(config={"abbreviation": "ANA", "properties": properties})
+    second = SubjectMeta(
+        config={"abbreviation": "ANA", "tags": {"levels": ["diplomski"]}}
+    )
+
+    merged, conflicts = SubjectMeta.merge((first, second))
+    merged._config["properties"]["fer2"]["diplomski"]["rac"]["zop"]["1"].append("x")
+    merged._config["tags"]["levels"].append("x")
+
+    assert conflicts == list()
+    assert first.config["properties"] == properties
+    assert second.config["tags"] == {"levels": ["diplomski"]}
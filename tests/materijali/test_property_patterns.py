@@ -0,0 +1,92 @@
+import json
+
+from studosi.materijali.curriculum import export_views, get_known_view_keys
+from studosi.materijali.diff import diff_catalogs
+from studosi.materijali.related import get_features
+from studosi.materijali.subject import SubjectMeta
+
+
+def get_meta(abbreviation: str, properties):
+    return SubjectMeta(
+        config={
+            "name": f"Predmet {abbreviation}",
+            "abbreviation": abbreviation,
+            "properties": properties,
+        }
+    )
+
+
+def get_metas():
+    return {
+        "ANA": get_meta(
+            "ANA", {"fer2": {"diplomski": {"rac": {"zop": {"1": ["obavezni"]}}}}}
+        ),
+        "BAZ": get_meta(
+            "BAZ", {"fer2": {"diplomski": {"rac": {"zom": {"2": ["obavezni"]}}}}}
+        ),
+        "FMUOS": get_meta(
+            "FMUOS", {"fer2": {"diplomski": {"rac": {"*": {"1-3": ["izborni"]}}}}}
+        ),
+    }
+
+
+def get_groups(view):
+    return {
+        semester["semester"]: {
+            group["group"]: [x["abbreviation"] for x in group["subjects"]]
+            for group in semester["groups"]
+        }
+        for semester in view["semesters"]
+    }
+
+
+def test_views_expand_semester_and_group_patterns(tmp_path):
+    for key, meta in get_metas().items():
+        (tmp_path / "root" / key).mkdir(parents=True)
+        (tmp_path / "root" / key / "meta.json").write_text(
+            json.dumps(meta.config), encoding="utf8"
+        )
+
+    export_views(tmp_path / "root", tmp_path / "views")
+
+    view = json.loads(
+        (tmp_path / "views" / "fer2.diplomski.rac.zop.json").read_text(
+            encoding="utf8"
+        )
+    )
+
+    assert get_groups(view) == {
+        "1": {"obavezni": ["ANA"], "izborni": ["FMUOS"]},
+        "2": {"izborni": ["FMUOS"]},
+        "3": {"izborni": ["FMUOS"]},
+    }
+
+
+def test_diff_resolves_wildcard_view_keys():
+    old = {key: (None, meta) for key, meta in get_metas().items()}
+    new = dict(old)
+    new["FMUOS"] = (
+        None,
+        get_meta(
+            "FMUOS", {"fer2": {"diplomski": {"rac": {"*": {"1-3": ["obavezni"]}}}}}
+        ),
+    )
+
+    assert diff_catalogs(old, new)["affected_views"] == [
+        ["fer2", "diplomski", "rac", "zom"],
+        ["fer2", "diplomski", "rac", "zop"],
+    ]
+
+
+def test_related_features_expand_patterns():
+    metas = get_metas()
+    known_keys = get_known_view_keys(
+        row for meta in metas.values() for row in meta.iter_property_rows()
+    )
+    features = get_features(metas["FMUOS"], known_keys=known_keys)
+
+    assert {x for x in features if x.startswith("row:")} == {
+        f"row:fer2:diplomski:rac:{module}:{semester}:izborni"
+        for module in ("zom", "zop")
+        for semester in ("1", "2", "3")
+    }
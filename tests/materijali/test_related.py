@@ -0,0 +1,75 @@
+import argparse
+
+from studosi.materijali.related import suggest_related, to_related_subject_strings
+from studosi.materijali.subject import SubjectMeta
+
+
+def get_meta(abbreviation: str, name: str, semester: str, related=None):
+    config = {
+        "name": name,
+        "abbreviation": abbreviation,
+        "properties": {
+            "fer2": {"preddiplomski": {"rac": {"*": {semester: ["obavezni"]}}}}
+        },
+    }
+
+    if related is not None:
+        config["related_subjects"] = related
+
+    return SubjectMeta(config=config)
+
+
+def get_metas(related=None):
+    return {
+        "ANA1": get_meta("ANA1", "Matematička analiza 1", "1", related=related),
+        "ANA2": get_meta("ANA2", "Matematička analiza 2", "2"),
+        "ANA3": get_meta("ANA3", "Matematička analiza 3", "3"),
+        "BAZ": get_meta("BAZ", "Baze podataka", "4"),
+    }
+
+
+def test_suggestions_are_symmetric():
+    suggestions = suggest_related(get_metas(), threshold=0.1, include_existing=True)
+
+    assert sorted(suggestions) == ["ANA1", "ANA2", "ANA3"]
+
+    for key, subject_suggestions in suggestions.items():
+        for abbreviation, score, reason in subject_suggestions:
+            assert (key, score, reason) in suggestions[abbreviation]
+
+
+def test_threshold_and_max_suggestions_are_respected():
+    suggestions = suggest_related(get_metas(), threshold=0.1, max_suggestions=1)
+
+    assert all(len(x) == 1 for x in suggestions.values())
+    assert suggest_related(get_metas(), threshold=1.01) == dict()
+
+    for subject_suggestions in suggest_related(get_metas(), threshold=0.5).values():
+        assert all(score >= 0.5 for _, score, _ in subject_suggestions)
+
+
+def test_existing_related_subjects_are_skipped():
+    metas = get_metas(related={"ANA2": {"reason": "Nastavak"}})
+
+    existing = suggest_related(metas, threshold=0.1, include_existing=True)
+    new = suggest_related(metas, threshold=0.1)
+
+    assert "ANA2" in [x[0] for x in existing["ANA1"]]
+    assert "ANA2" not in [x[0] for x in new["ANA1"]]
+    assert "ANA1" in [x[0] for x in new["ANA2"]]
+
+
+def test_strings_parse_back_through_the_argument():
+    parser = argparse.ArgumentParser()
+    SubjectMeta.decorate_parser(parser)
+
+    for subject_suggestions in suggest_related(get_metas(), threshold=0.1).values():
+        strings = to_related_subject_strings(subject_suggestions)
+        args = parser.parse_args(["--related_subjects", *strings])
+        config = SubjectMeta.args_to_config(args, action_on_wrong_value="nothing")
+
+        SubjectMeta.validate_related_subjects(config["related_subjects"])
+        assert config["related_subjects"] == {
+            abbreviation: {"reason": reason}
+            for abbreviation, _, reason in subject_suggestions
+        }
@@ -0,0 +1,155 @@
+import json
+import sqlite3
+import sys
+
+import pytest
+
+from studosi.materijali.diff import diff_catalogs
+from studosi.materijali.scripts import export_sql as export_sql_script
+from studosi.materijali.sql import render_inserts
+from studosi.materijali.subject import SubjectMeta
+
+
+def get_metas(*abbreviations: str, name_suffix: str = ""):
+    return {
+        abbreviation: SubjectMeta(
+            config={
+                "name": f"Predmet {abbreviation}{name_suffix}",
+                "abbreviation": abbreviation,
+                "properties": {
+                    "fer2": {"preddiplomski": {"rac": {"_": {"1": ["obavezni"]}}}}
+                },
+                "links": {"fer": {"url": f"https://www.fer.hr/{abbreviation}"}},
+            }
+        )
+        for abbreviation in abbreviations
+    }
+
+
+def get_subject_keys(connection: sqlite3.Connection):
+    return [
+        x[0]
+        for x in connection.execute(
+            'SELECT "subject_key" FROM "subjects" ORDER BY "subject_key"'
+        )
+    ]
+
+
+def test_change_set_upsert_keeps_untouched_subjects():
+    connection = sqlite3.connect(":memory:")
+    old = get_metas("ANA", "BAZ", "DIS")
+    connection.executescript(render_inserts(old, dialect="sqlite"))
+
+    new = {**old, **get_metas("BAZ", name_suffix=" 2")}
+    change_set = diff_catalogs(
+        {key: (None, meta) for key, meta in old.items()},
+        {key: (None, meta) for key, meta in new.items()},
+    )
+    changed = {
+        key: SubjectMeta(config=modified["config"])
+        for key, modified in change_set["modified"].items()
+    }
+
+    connection.executescript(
+        render_inserts(changed, dialect="sqlite", upsert=True, schema=False)
+    )
+
+    assert get_subject_keys(connection) == ["ANA", "BAZ", "DIS"]
+    assert connection.execute(
+        'SELECT "name" FROM "subjects" WHERE "subject_key" = \'BAZ\''
+    ).fetchone() == ("Predmet BAZ 2",)
+    assert connection.execute('SELECT COUNT(*) FROM "subject_links"').fetchone() == (
+        3,
+    )
+
+
+def test_upsert_prune_removes_missing_subjects():
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        render_inserts(get_metas("ANA", "BAZ", "DIS"), dialect="sqlite")
+    )
+    connection.executescript(
+        render_inserts(
+            get_metas("ANA"), dialect="sqlite", upsert=True, prune=True, schema=False
+        )
+    )
+
+    assert get_subject_keys(connection) == ["ANA"]
+    assert connection.execute(
+        'SELECT COUNT(*) FROM "subject_properties"'
+    ).fetchone() == (1,)
+
+
+def test_prune_without_upsert_is_rejected():
+    with pytest.raises(ValueError):
+        render_inserts(get_metas("ANA"), dialect="sqlite", prune=True)
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    (
+        ["--change_set", "change_set.json", "--prune"],
+        ["--source", "catalog.json", "--prune"],
+    ),
+)
+def test_script_rejects_unsafe_prune(tmp_path, monkeypatch, capsys, arguments):
+    (tmp_path / "change_set.json").write_text(
+        json.dumps({"added": {}, "removed": [], "modified": {}}), encoding="utf8"
+    )
+    (tmp_path / "catalog.json").write_text("{}", encoding="utf8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys, "argv", ["export_sql", *arguments, "--output", "out.sql"]
+    )
+
+    with pytest.raises(SystemExit) as e:
+        export_sql_script.main()
+
+    assert e.value.code == 2
+    assert "--prune" in capsys.readouterr().err
+    assert not (tmp_path / "out.sql").exists()
+
+
+def get_pattern_metas():
+    return {
+        "ANA": SubjectMeta(
+            config={
+                "name": "Analiza",
+                "properties": {
+                    "fer2": {"diplomski": {"rac": {"zop": {"1": ["obavezni"]}}}}
+                },
+            }
+        ),
+        "FMUOS": SubjectMeta(
+            config={
+                "name": "Fizika",
+                "properties": {
+                    "fer2": {
+                        "diplomski": {"rac": {"*": {"1,2,3,4,5": ["izborni"]}}}
+                    }
+                },
+            }
+        ),
+    }
+
+
+def test_patterns_are_exported_as_concrete_rows():
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(render_inserts(get_pattern_metas(), dialect="sqlite"))
+
+    assert connection.execute(
+        'SELECT "semester" FROM "subject_properties" '
+        "WHERE \"subject_key\" = 'FMUOS' AND \"module\" = 'zop' "
+        'ORDER BY "semester"'
+    ).fetchall() == [(str(x),) for x in range(1, 6)]
+    assert connection.execute(
+        "SELECT COUNT(*) FROM \"subject_properties\" WHERE \"module\" = '*'"
+    ).fetchone() == (0,)
+
+
+def test_values_longer_than_their_columns_are_rejected():
+    with pytest.raises(ValueError, match="subject_properties.semester"):
+        render_inserts(get_pattern_metas(), dialect="sqlite", expand=False)
+
+    with pytest.raises(ValueError, match="subjects.name"):
+        render_inserts(get_metas("ANA", name_suffix="x" * 255), dialect="sqlite")